@@ -0,0 +1,39 @@
+'''
+Compare the size and the rx_obj() decode time (best of 5 runs) of a status dict with the
+JSON and binary codecs
+
+usage (from the repository root): python -m benchmarks.bench_binpack [iterations]
+'''
+
+import sys
+import timeit
+
+from pySerialTransfer.pySerialTransfer import SerialTransfer
+
+
+STATUS = {'mode': 'run', 'temp': 23.5, 'rpm': 1200, 'ok': True, 'err': 0, 'seq': 42}
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    print('{} iterations'.format(iterations))
+    print('{:<16}{:>8}{:>22}'.format('codec', 'bytes', 'rx_obj (us/decode)'))
+
+    for name, codec, shared in (('json', 'json', None),
+                                ('binary', 'binary', None),
+                                ('binary, shared', 'binary', list(STATUS) + ['run'])):
+        link = SerialTransfer('bench', restrict_ports=False, debug=False, obj_codec=codec, shared_strings=shared)
+        size = link.tx_obj(STATUS)
+
+        link.rx_buff[:size] = link.tx_buff[:size]
+        link.bytes_read = size
+
+        assert link.rx_obj(dict, obj_byte_size=size) == STATUS
+        seconds = min(timeit.repeat(lambda: link.rx_obj(dict, obj_byte_size=size), number=iterations, repeat=5))
+
+        print('{:<16}{:>8}{:>22.2f}'.format(name, size, seconds / iterations * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+'''
+Estimate the payload throughput of a compressed packet ID at a given baud
+rate: the frame sizes on the wire with and without compression, and the
+CPU time compressing and decompressing each packet costs (best of 5 runs)
+
+usage (from the repository root): python -m benchmarks.bench_compression [baud] [iterations]
+'''
+
+import json
+import random
+import sys
+import timeit
+
+from pySerialTransfer.pySerialTransfer import SerialTransfer
+
+
+# Serial frames carry 10 bits per byte (start bit, 8 data bits, stop bit)
+BITS_PER_BYTE = 10
+
+SAMPLE = {'device': 'pump-controller-03', 'state': 'running', 'temperature_c': 41.25, 'pressure_kpa': 212.7,
+          'flow_lpm': 18.4, 'alarms': [], 'uptime_s': 86231, 'firmware': '2.4.1', 'mode': 'automatic'}
+
+
+def payloads():
+    rng = random.Random(1)
+    text = json.dumps(SAMPLE).encode()
+    other = json.dumps(dict(SAMPLE, temperature_c=39.5, uptime_s=86240)).encode()
+
+    return (('json text', text, b''),
+            ('json text, zdict', text, other),
+            ('random bytes', bytes(rng.getrandbits(8) for _ in range(len(text))), b''))
+
+
+def frame_len(link, payload, packet_id):
+    link.tx_buff[:len(payload)] = payload
+    return len(link.build_frame(len(payload), packet_id))
+
+
+def main():
+    baud       = int(sys.argv[1]) if len(sys.argv) > 1 else 115200
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    print('{} baud, {} iterations'.format(baud, iterations))
+    print('{:<18}{:>8}{:>8}{:>10}{:>12}{:>14}{:>14}'.format('payload', 'bytes', 'frame', 'frame (z)', 'cpu (us)',
+                                                            'plain (B/s)', 'zlib (B/s)'))
+
+    for name, payload, zdict in payloads():
+        link = SerialTransfer('bench', restrict_ports=False, debug=False)
+        plain = frame_len(link, payload, 1)
+
+        comp = link.enable_compression(1, zdict)
+        packed = comp.compress(payload)
+        compressed = frame_len(link, payload, 1)
+
+        cpu = min(timeit.repeat(lambda: comp.decompress(comp.compress(payload), len(payload)),
+                                number=iterations, repeat=5)) / iterations
+
+        # Packets per second are limited by the line or, if slower, by the CPU
+        line_rate = baud / BITS_PER_BYTE
+        plain_rate = len(payload) * line_rate / plain
+        zlib_rate = len(payload) * min(line_rate / compressed, 1 / cpu)
+
+        assert comp.decompress(packed, len(payload)) == payload
+        print('{:<18}{:>8}{:>8}{:>10}{:>12.1f}{:>14.0f}{:>14.0f}'.format(name, len(payload), plain, compressed,
+                                                                        cpu * 1e6, plain_rate, zlib_rate))
+
+
+if __name__ == '__main__':
+    main()
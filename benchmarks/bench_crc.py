@@ -0,0 +1,34 @@
+'''
+Compare the cost per frame of the 8, 16 and 32-bit frame CRCs
+
+usage (from the repository root): python -m benchmarks.bench_crc [payload_len] [iterations]
+'''
+
+import sys
+import timeit
+
+from pySerialTransfer.CRC import CRC
+
+
+def main():
+    payload_len = int(sys.argv[1]) if len(sys.argv) > 1 else 254
+    iterations  = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    payload_bytes = bytes(i & 0xFF for i in range(payload_len))
+    payload_list  = list(payload_bytes)
+
+    print('payload: {} bytes, {} iterations'.format(payload_len, iterations))
+    print('{:<8}{:>18}{:>18}'.format('crc_len', 'list (us/frame)', 'bytes (us/frame)'))
+
+    for crc_len in (8, 16, 32):
+        crc = CRC(crc_len=crc_len)
+        list_time  = timeit.timeit(lambda: crc.calculate(payload_list, payload_len), number=iterations)
+        bytes_time = timeit.timeit(lambda: crc.calculate(payload_bytes, payload_len), number=iterations)
+
+        print('{:<8}{:>18.2f}{:>18.2f}'.format(crc_len,
+                                               list_time  / iterations * 1e6,
+                                               bytes_time / iterations * 1e6))
+
+
+if __name__ == '__main__':
+    main()
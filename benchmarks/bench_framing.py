@@ -0,0 +1,49 @@
+'''
+Measure the throughput of the sans-IO frame codec on its own, without any
+port I/O
+
+usage (from the repository root): python -m benchmarks.bench_framing [payload_len] [frames] [crc_len]
+'''
+
+import sys
+import time
+
+from pySerialTransfer.framing import FrameDecoder, FrameEncoder
+
+
+def main():
+    payload_len = int(sys.argv[1]) if len(sys.argv) > 1 else 254
+    num_frames  = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    crc_len     = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    encoder = FrameEncoder(crc_len, extended=True)
+    payload = bytes(i & 0xFF for i in range(payload_len))
+
+    start = time.perf_counter()
+    frames = [encoder.encode(payload, i & 0xFF) for i in range(num_frames)]
+    encode_time = time.perf_counter() - start
+
+    stream = b''.join(frames)
+
+    print('payload: {} bytes, {} frames, crc_len {}'.format(payload_len, num_frames, crc_len))
+    print('{:<16}{:>14}{:>14}'.format('', 'us/frame', 'MB/s'))
+    print('{:<16}{:>14.2f}{:>14.2f}'.format('encode', encode_time / num_frames * 1e6, len(stream) / encode_time / 1e6))
+
+    for chunk in (1, 64, 4096):
+        decoder = FrameDecoder(crc_len, extended=True)
+        chunks = [stream[i:i + chunk] for i in range(0, len(stream), chunk)]
+
+        start = time.perf_counter()
+        decoded = 0
+        for data in chunks:
+            decoded += len(decoder.feed(data, 0))
+        decode_time = time.perf_counter() - start
+
+        assert decoded == num_frames
+        print('{:<16}{:>14.2f}{:>14.2f}'.format('decode ({} B)'.format(chunk),
+                                                decode_time / num_frames * 1e6,
+                                                len(stream) / decode_time / 1e6))
+
+
+if __name__ == '__main__':
+    main()
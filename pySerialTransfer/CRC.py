@@ -1,31 +1,143 @@
 import sys
-from functools import lru_cache
+import zlib
+import binascii
+
+
+DEFAULT_POLYNOMIALS = {8:  0x9B,
+                       16: 0x1021,      # CRC-16/XMODEM, matches binascii.crc_hqx
+                       32: 0x04C11DB7}  # CRC-32 (IEEE 802.3), matches zlib.crc32
+
+# Default (reflect, init, xorout) of each width. 8 and 16-bit CRCs are
+# unreflected with zero init/xorout, 32-bit CRCs follow the CRC-32 family
+# (reflected, init and xorout 0xFFFFFFFF) so e.g. CRC(0x1EDC6F41, 32) is
+# CRC-32C
+DEFAULT_PARAMS = {8:  (False, 0, 0),
+                  16: (False, 0, 0),
+                  32: (True, 0xFFFFFFFF, 0xFFFFFFFF)}
+
+
+def reflect_bits(value, width):
+    result = 0
+    for _ in range(width):
+        result = (result << 1) | (value & 1)
+        value >>= 1
+    return result
 
 
 class CRC:
-    def __init__(self, polynomial=0x9B, crc_len=8):
-        self.poly      = polynomial & 0xFF
+    def __init__(self, polynomial=None, crc_len=8, reflect=None, init=None, xorout=None):
+        '''
+        Description:
+        ------------
+        Table driven CRC calculator. Any CRC of the Rocksoft model (as
+        catalogued by reveng) with refin == refout can be described by the
+        polynomial, reflect, init and xorout parameters
+
+        :param polynomial: int  - generator polynomial (without the leading
+                                  bit, unreflected), defaults to the entry in
+                                  DEFAULT_POLYNOMIALS for crc_len
+        :param crc_len:    int  - width of the CRC in bits: 8, 16 or 32
+        :param reflect:    bool - process bytes LSB first, defaults to the
+                                  entry in DEFAULT_PARAMS for crc_len
+        :param init:       int  - initial CRC register value, defaults to the
+                                  entry in DEFAULT_PARAMS for crc_len
+        :param xorout:     int  - value XORed into the final CRC, defaults to
+                                  the entry in DEFAULT_PARAMS for crc_len
+        :return: void
+        :raises ValueError: if crc_len is not 8, 16 or 32
+        '''
+
+        if crc_len not in DEFAULT_PARAMS:
+            raise ValueError('crc_len must be 8, 16 or 32, got {}'.format(crc_len))
+
+        default_reflect, default_init, default_xorout = DEFAULT_PARAMS[crc_len]
+
+        if polynomial is None:
+            polynomial = DEFAULT_POLYNOMIALS[crc_len]
+
+        self.width     = crc_len
+        self.mask      = (1 << self.width) - 1
+        self.poly      = polynomial & self.mask
+        self.reflect   = default_reflect if reflect is None else bool(reflect)
+        self.init      = (default_init if init is None else init) & self.mask
+        self.xorout    = (default_xorout if xorout is None else xorout) & self.mask
         self.crc_len   = crc_len
         self.table_len = pow(2, crc_len)
-        
-    @lru_cache(2 ^ 16)
+        self.num_bytes = self.width // 8
+
+        if self.reflect:
+            self.table = [self._reflected_table_entry(i) for i in range(256)]
+        else:
+            self.table = [self._table_entry(i) for i in range(256)]
+
+        params = (self.poly, self.reflect, self.init, self.xorout)
+
+        if self.width == 16 and params == (DEFAULT_POLYNOMIALS[16], False, 0, 0):
+            self.calculate_bytes = self._crc_hqx
+        elif self.width == 32 and params == (DEFAULT_POLYNOMIALS[32], True, self.mask, self.mask):
+            self.calculate_bytes = zlib.crc32
+        elif self.reflect:
+            self.calculate_bytes = self._crc_reflected
+        elif self.width == 8:
+            self.calculate_bytes = self._crc8
+        else:
+            self.calculate_bytes = self._crc_wide
+
     def calculate_checksum(self, index: int):
-        """Calculate the checksum for a given index.
-        An LRU cached version of the CRC calculation function, with an upper bound on the cache size of 2^16
-        """
-        if index > self.table_len:
+        """Look up the table entry (CRC of a single byte) for a given index."""
+        if not 0 <= index < len(self.table):
             raise ValueError('Index out of range')
+        return self.table[index]
+
+    def _table_entry(self, index):
+        top_bit = 1 << (self.width - 1)
+        curr = index << (self.width - 8)
+        for j in range(8):
+            if (curr & top_bit) != 0:
+                curr = ((curr << 1) & self.mask) ^ self.poly
+            else:
+                curr = (curr << 1) & self.mask
+        return curr
+
+    def _reflected_table_entry(self, index):
+        poly = reflect_bits(self.poly, self.width)
         curr = index
         for j in range(8):
-            if (curr & 0x80) != 0:
-                curr = ((curr << 1) & 0xFF) ^ self.poly
+            if curr & 1:
+                curr = (curr >> 1) ^ poly
             else:
-                curr <<= 1
+                curr >>= 1
         return curr
+
+    def _crc8(self, data):
+        table = self.table
+        crc = self.init
+        for byte in data:
+            crc = table[crc ^ byte]
+        return crc ^ self.xorout
+
+    def _crc_reflected(self, data):
+        table = self.table
+        crc = self.init
+        for byte in data:
+            crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+        return crc ^ self.xorout
+
+    def _crc_hqx(self, data):
+        return binascii.crc_hqx(data, 0)
+
+    def _crc_wide(self, data):
+        table = self.table
+        shift = self.width - 8
+        mask = self.mask
+        crc = self.init
+        for byte in data:
+            crc = ((crc << 8) & mask) ^ table[(crc >> shift) ^ byte]
+        return crc ^ self.xorout
     
     def print_table(self):
-        for i in range(self.table_len):
-            sys.stdout.write(hex(self.calculate_checksum(i)).upper().replace('X', 'x'))
+        for i in range(min(self.table_len, 256)):
+            sys.stdout.write(hex(self.table[i]).upper().replace('X', 'x'))
             
             if (i + 1) % 16:
                 sys.stdout.write(' ')
@@ -33,26 +145,45 @@ class CRC:
                 sys.stdout.write('\n')
     
     def calculate(self, arr, dist=None):
-        crc = 0
-        
+        '''
+        Description:
+        ------------
+        Calculate the CRC of the first dist elements of arr. Bytes-like
+        objects are handed straight to calculate_bytes(), other sequences
+        may hold ints or single characters
+
+        :param arr:  list, bytes-like or int - data to calculate the CRC of
+        :param dist: int                     - number of elements to include,
+                                               all of them if not given
+        :return: int - CRC value
+        '''
+
         try:
             if dist:
                 indicies = dist
             else:
                 indicies = len(arr)
+        except TypeError:
+            return self.calculate_bytes(bytes([arr]))
+        
+        if indicies < 0:
+            raise ValueError('dist must not be negative')
+        
+        if isinstance(arr, (bytes, bytearray, memoryview)):
+            return self.calculate_bytes(arr[:indicies])
+        
+        try:
+            data = bytes(arr[:indicies])
+        except (TypeError, ValueError):
+            data = bytearray(indicies)
             
             for i in range(indicies):
                 try:
-                    nex_el = int(arr[i])
+                    data[i] = int(arr[i])
                 except ValueError:
-                    nex_el = ord(arr[i])
-                
-                crc = self.calculate_checksum(crc ^ nex_el)
-                
-        except TypeError:
-            crc = self.calculate_checksum(arr)
+                    data[i] = ord(arr[i])
             
-        return crc
+        return self.calculate_bytes(data)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,343 @@
+'''
+Compact, self-describing binary encoding for dicts, lists and scalars
+(MessagePack-like). Every value starts with a one byte tag:
+
+    0x00 - 0x7F  positive fixint (value is the tag itself)
+    0x80 - 0x8F  fixmap   (low nibble holds the number of key/value pairs)
+    0x90 - 0x9F  fixarray (low nibble holds the number of elements)
+    0xA0 - 0xBF  fixstr   (low 5 bits hold the UTF-8 length)
+    0xC0         None
+    0xC2 / 0xC3  False / True
+    0xC4         bytes,  followed by a varint length
+    0xC5         str,    followed by a varint length
+    0xC6         array,  followed by a varint element count
+    0xC7         map,    followed by a varint pair count
+    0xCA         float32 (little-endian), used when it round-trips exactly
+    0xCB         float64 (little-endian)
+    0xCC         unsigned varint
+    0xCD         negative varint (value = -1 - n)
+    0xCE         string table reference, followed by a varint index
+    0xE0 - 0xFF  negative fixint (-32 to -1)
+
+Strings of STR_TABLE_MIN_LEN bytes or more are appended to a per-message
+string table the first time they are written, so repeated keys and values
+only cost a two byte reference afterwards. The decoder rebuilds the same
+table while it walks the message. Both ends may also agree on a list of
+shared strings (e.g. the keys of a status dict) that seeds the table, so
+those strings never have to be sent at all. Every string may only appear
+once in that list.
+
+The codec saves bytes on the wire, not CPU time: a typical status dict is
+about half the size of its JSON encoding (a third with shared strings), but
+this pure Python decoder takes roughly twice as long as the C based
+json.loads() to decode it. Where decode time matters, send fixed layouts as
+struct records (SerialTransfer.rx_records()) or enable the decode cache for
+repeated payloads.
+'''
+
+import struct
+
+
+class BinpackError(Exception):
+    pass
+
+
+def _duplicate_error(shared_strings):
+    seen = set()
+    duplicates = [string for string in shared_strings if string in seen or seen.add(string)]
+    return BinpackError('Duplicate shared strings: {}'.format(', '.join(repr(string) for string in duplicates)))
+
+
+NONE      = 0xC0
+FALSE     = 0xC2
+TRUE      = 0xC3
+BIN       = 0xC4
+STR       = 0xC5
+ARRAY     = 0xC6
+MAP       = 0xC7
+FLOAT32   = 0xCA
+FLOAT64   = 0xCB
+UINT      = 0xCC
+NINT      = 0xCD
+STR_REF   = 0xCE
+
+FIXMAP    = 0x80
+FIXARRAY  = 0x90
+FIXSTR    = 0xA0
+NEG_FIXINT_MIN = -32
+
+STR_TABLE_MIN_LEN = 2
+
+_F32 = struct.Struct('<f')
+_F64 = struct.Struct('<d')
+
+
+def _write_varint(out, val):
+    while val > 0x7F:
+        out.append((val & 0x7F) | 0x80)
+        val >>= 7
+    out.append(val)
+
+
+def _encode(out, val, table):
+    if val is None:
+        out.append(NONE)
+
+    elif val is True:
+        out.append(TRUE)
+
+    elif val is False:
+        out.append(FALSE)
+
+    elif isinstance(val, int):
+        if 0 <= val <= 0x7F:
+            out.append(val)
+        elif NEG_FIXINT_MIN <= val < 0:
+            out.append(val & 0xFF)
+        elif val > 0:
+            out.append(UINT)
+            _write_varint(out, val)
+        else:
+            out.append(NINT)
+            _write_varint(out, -1 - val)
+
+    elif isinstance(val, float):
+        packed = _F32.pack(val)
+
+        if _F32.unpack(packed)[0] == val:
+            out.append(FLOAT32)
+            out += packed
+        else:
+            out.append(FLOAT64)
+            out += _F64.pack(val)
+
+    elif isinstance(val, str):
+        index = table.get(val)
+
+        if index is not None:
+            out.append(STR_REF)
+            _write_varint(out, index)
+            return
+
+        encoded = val.encode('utf-8')
+        str_len = len(encoded)
+
+        if str_len < 32:
+            out.append(FIXSTR | str_len)
+        else:
+            out.append(STR)
+            _write_varint(out, str_len)
+        out += encoded
+
+        if str_len >= STR_TABLE_MIN_LEN:
+            table[val] = len(table)
+
+    elif isinstance(val, dict):
+        if len(val) < 16:
+            out.append(FIXMAP | len(val))
+        else:
+            out.append(MAP)
+            _write_varint(out, len(val))
+
+        for key, item in val.items():
+            _encode(out, key, table)
+            _encode(out, item, table)
+
+    elif isinstance(val, (list, tuple)):
+        if len(val) < 16:
+            out.append(FIXARRAY | len(val))
+        else:
+            out.append(ARRAY)
+            _write_varint(out, len(val))
+
+        for item in val:
+            _encode(out, item, table)
+
+    elif isinstance(val, (bytes, bytearray, memoryview)):
+        out.append(BIN)
+        _write_varint(out, len(val))
+        out += val
+
+    else:
+        raise BinpackError('Unsupported type: {}'.format(type(val).__name__))
+
+
+def pack(val, shared_strings=None):
+    '''
+    Description:
+    ------------
+    Encode a value (dict, list, tuple, str, bytes, int, float, bool or None,
+    arbitrarily nested) into the compact binary format
+
+    :param val:            n/a  - value to encode
+    :param shared_strings: list - strings known to both ends in advance,
+                                  must match the list given to unpack()
+
+    :return: bytearray - encoded value
+    :raises BinpackError: if a value can't be encoded or shared_strings
+                          contains duplicates
+    '''
+
+    out = bytearray()
+
+    if shared_strings:
+        table = {string: i for i, string in enumerate(shared_strings)}
+
+        if len(table) != len(shared_strings):
+            raise _duplicate_error(shared_strings)
+
+        _encode(out, val, table)
+    else:
+        _encode(out, val, {})
+    return out
+
+
+def _varint(buff, index):
+    byte = buff[index]
+
+    if byte < 0x80:
+        return byte, index + 1
+
+    val   = byte & 0x7F
+    shift = 7
+
+    while True:
+        index += 1
+        byte = buff[index]
+        val |= (byte & 0x7F) << shift
+
+        if byte < 0x80:
+            return val, index + 1
+        shift += 7
+
+
+def _slice(buff, start, end):
+    if end > len(buff):
+        raise IndexError('value extends past the end of the buffer')
+    return bytes(buff[start:end])
+
+
+def _decode(buff, index, table):
+    # Plain recursive function with the most common tags tested first -
+    # method calls and attribute lookups dominate the cost of a pure Python
+    # decoder
+    tag = buff[index]
+    index += 1
+
+    if tag < 0x80:
+        return tag, index
+
+    if tag >= 0xE0:
+        return tag - 0x100, index
+
+    if tag < FIXARRAY:
+        val = {}
+
+        for _ in range(tag & 0x0F):
+            key, index = _decode(buff, index, table)
+            val[key], index = _decode(buff, index, table)
+        return val, index
+
+    if tag < FIXSTR:
+        val = []
+
+        for _ in range(tag & 0x0F):
+            item, index = _decode(buff, index, table)
+            val.append(item)
+        return val, index
+
+    if tag < NONE:
+        return _string(buff, index, tag & 0x1F, table)
+
+    if tag == STR_REF:
+        ref, index = _varint(buff, index)
+        return table[ref], index
+
+    if tag == NONE:
+        return None, index
+
+    if tag == FALSE:
+        return False, index
+
+    if tag == TRUE:
+        return True, index
+
+    if tag == FLOAT32:
+        return _F32.unpack(_slice(buff, index, index + 4))[0], index + 4
+
+    if tag == FLOAT64:
+        return _F64.unpack(_slice(buff, index, index + 8))[0], index + 8
+
+    if tag == UINT:
+        return _varint(buff, index)
+
+    if tag == NINT:
+        val, index = _varint(buff, index)
+        return -1 - val, index
+
+    if tag == STR:
+        str_len, index = _varint(buff, index)
+        return _string(buff, index, str_len, table)
+
+    if tag == MAP:
+        pairs, index = _varint(buff, index)
+        val = {}
+
+        for _ in range(pairs):
+            key, index = _decode(buff, index, table)
+            val[key], index = _decode(buff, index, table)
+        return val, index
+
+    if tag == ARRAY:
+        count, index = _varint(buff, index)
+        val = []
+
+        for _ in range(count):
+            item, index = _decode(buff, index, table)
+            val.append(item)
+        return val, index
+
+    if tag == BIN:
+        bin_len, index = _varint(buff, index)
+        return _slice(buff, index, index + bin_len), index + bin_len
+
+    raise BinpackError('Unknown tag: 0x{:02X}'.format(tag))
+
+
+def _string(buff, index, str_len, table):
+    val = _slice(buff, index, index + str_len).decode('utf-8')
+
+    if str_len >= STR_TABLE_MIN_LEN:
+        table.append(val)
+    return val, index + str_len
+
+
+def unpack(buff, start_pos=0, shared_strings=None):
+    '''
+    Description:
+    ------------
+    Decode one value from a buffer encoded with pack(). The buffer may be any
+    indexable sequence of byte values (bytes, bytearray, memoryview or the
+    list based rx_buff of SerialTransfer), so no intermediate copy of the
+    whole payload is needed
+
+    :param buff:           bytes-like - buffer holding the encoded value
+    :param start_pos:      int        - index of the value's first byte
+    :param shared_strings: list       - strings known to both ends in
+                                        advance, must match the list given
+                                        to pack()
+
+    :return: tuple - (decoded value, index of the last byte of the value + 1)
+    :raises BinpackError: if the payload is malformed or shared_strings
+                          contains duplicates
+    '''
+
+    table = list(shared_strings) if shared_strings else []
+
+    if len(set(table)) != len(table):
+        raise _duplicate_error(table)
+
+    try:
+        return _decode(buff, start_pos, table)
+    except (IndexError, TypeError, UnicodeDecodeError, struct.error, RecursionError) as e:
+        raise BinpackError('Malformed payload: {}'.format(e))
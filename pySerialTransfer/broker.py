@@ -0,0 +1,433 @@
+'''
+Local port broker: owns one or more serial ports through SerialTransfer and
+shares them with any number of client processes over a Unix domain socket.
+
+    python -m pySerialTransfer.broker --socket /tmp/txfer.sock COM3 COM4
+
+Every message on the socket (in both directions) is a MSG_HEADER (body
+length, message type, port index) followed by the body:
+
+    MSG_SUBSCRIBE  client -> broker  body: packet IDs to receive (empty for all)
+    MSG_SEND       client -> broker  body: packet ID followed by the payload
+    MSG_PACKET     broker -> client  body: packet ID followed by the payload
+
+The broker parses (COBS/CRC) each frame once and forwards the payload to
+the clients subscribed to its ID, so clients never touch the serial framing.
+Every port has a reader and a writer thread, so neither a slow port nor a
+blocking write holds up the event loop that serves the clients.
+'''
+
+import argparse
+import asyncio
+import logging
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+from .pySerialTransfer import SerialTransfer
+
+
+MSG_SUBSCRIBE = 1
+MSG_SEND      = 2
+MSG_PACKET    = 3
+
+MSG_HEADER = struct.Struct('<HBB')
+
+DEFAULT_SOCKET = '/tmp/pySerialTransfer.sock'
+
+
+class BrokerError(Exception):
+    pass
+
+
+def encode_message(msg_type, port, body):
+    '''
+    Description:
+    ------------
+    Build a broker socket message
+
+    :param msg_type: int        - one of MSG_SUBSCRIBE, MSG_SEND, MSG_PACKET
+    :param port:     int        - index of the port the message refers to
+    :param body:     bytes-like - message body
+
+    :return: bytes - complete message
+    '''
+
+    return MSG_HEADER.pack(len(body), msg_type, port) + bytes(body)
+
+
+class ClientConnection:
+    def __init__(self, writer, max_queue):
+        self.writer        = writer
+        self.subscriptions = {}  # port index -> set of IDs (None for all IDs)
+        self.queue         = deque()
+        self.max_queue     = max_queue
+        self.ready         = asyncio.Event()
+        self.sent          = 0
+        self.dropped       = 0
+
+    def wants(self, port, packet_id):
+        if port not in self.subscriptions:
+            return False
+
+        ids = self.subscriptions[port]
+        return ids is None or packet_id in ids
+
+    def enqueue(self, msg):
+        # Slow clients lose their oldest messages instead of stalling the
+        # serial readers
+        if len(self.queue) >= self.max_queue:
+            self.queue.popleft()
+            self.dropped += 1
+
+        self.queue.append(msg)
+        self.ready.set()
+
+
+class Broker:
+    def __init__(self, links, socket_path=DEFAULT_SOCKET, max_queue=1024, batch_size=64, poll_interval=0.001):
+        '''
+        Description:
+        ------------
+        Serve packets from a set of SerialTransfer links to Unix socket
+        clients, filtering by packet ID on the broker side
+
+        :param links:         list  - SerialTransfer links to serve, clients
+                                      refer to them by index
+        :param socket_path:   str   - path of the Unix domain socket
+        :param max_queue:     int   - maximum number of messages buffered per
+                                      client before the oldest are dropped
+        :param batch_size:    int   - maximum number of messages written to a
+                                      client socket at once
+        :param poll_interval: float - time (in s) the serial readers sleep
+                                      when no data is available
+
+        :return: void
+        '''
+
+        self.links         = list(links)
+        self.socket_path   = socket_path
+        self.max_queue     = max_queue
+        self.batch_size    = batch_size
+        self.poll_interval = poll_interval
+
+        self.clients   = set()
+        self.loop      = None
+        self.server    = None
+        self.running   = False
+        self.readers   = []
+        self.writers   = []
+        self.received  = [0] * len(self.links)
+        self.tx_queues = [queue.Queue() for _ in self.links]
+        self.locks     = [threading.Lock() for _ in self.links]
+
+    async def start(self):
+        '''
+        Description:
+        ------------
+        Open the ports, start the serial reader and writer threads and
+        listen for clients
+
+        :return: void
+        '''
+
+        self.loop    = asyncio.get_running_loop()
+        self.running = True
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        self.server = await asyncio.start_unix_server(self.handle_client, path=self.socket_path)
+
+        for index, link in enumerate(self.links):
+            link.open()
+            reader = threading.Thread(target=self.read_link, args=(index, link),
+                                      name='BrokerReader-{}'.format(index), daemon=True)
+            reader.start()
+            self.readers.append(reader)
+
+            writer = threading.Thread(target=self.write_link, args=(index, link),
+                                      name='BrokerWriter-{}'.format(index), daemon=True)
+            writer.start()
+            self.writers.append(writer)
+
+    async def stop(self):
+        '''
+        Description:
+        ------------
+        Stop serving clients, stop the serial readers and writers (after
+        they sent the packets already queued) and close the ports
+
+        :return: void
+        '''
+
+        self.running = False
+
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+        for client in list(self.clients):
+            client.writer.close()
+
+        for tx_queue in self.tx_queues:
+            tx_queue.put(None)
+
+        for thread in self.readers + self.writers:
+            await self.loop.run_in_executor(None, thread.join)
+
+        for link in self.links:
+            link.close()
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def serve_forever(self):
+        await self.start()
+
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    def read_link(self, index, link):
+        lock = self.locks[index]
+
+        while self.running:
+            try:
+                with lock:
+                    msg = None
+
+                    if link.available():
+                        packet_id = link.id_byte
+                        msg = encode_message(MSG_PACKET, index, bytes([packet_id]) + bytes(link.rx_buff[:link.bytes_read]))
+
+                if msg is not None:
+                    self.received[index] += 1
+                    self.loop.call_soon_threadsafe(self.dispatch, index, packet_id, msg)
+                elif link.status.value > 0:
+                    time.sleep(self.poll_interval)
+            except Exception as e:
+                logging.exception(e)
+                time.sleep(self.poll_interval)
+
+    def write_link(self, index, link):
+        # Sends packets queued by clients in order. The link lock keeps the
+        # reader from using the link (shared state such as containers and
+        # the write coalescer) while a packet is built and written
+        lock = self.locks[index]
+        tx_queue = self.tx_queues[index]
+
+        while True:
+            item = tx_queue.get()
+
+            if item is None:
+                break
+
+            packet_id, payload = item
+
+            try:
+                with lock:
+                    message_len = link.tx_struct_obj(payload)
+                    link.send(message_len, packet_id)
+            except Exception as e:
+                logging.exception(e)
+
+    def dispatch(self, port, packet_id, msg):
+        for client in self.clients:
+            if client.wants(port, packet_id):
+                client.enqueue(msg)
+
+    async def handle_client(self, reader, writer):
+        client = ClientConnection(writer, self.max_queue)
+        self.clients.add(client)
+        writer_task = asyncio.create_task(self.write_client(client))
+        writer_task.add_done_callback(lambda task: self.client_writer_done(client, task))
+
+        try:
+            while True:
+                header = await reader.readexactly(MSG_HEADER.size)
+                body_len, msg_type, port = MSG_HEADER.unpack(header)
+                body = await reader.readexactly(body_len)
+
+                if port >= len(self.links):
+                    logging.error('Client referred to unknown port {}'.format(port))
+                    continue
+
+                if msg_type == MSG_SUBSCRIBE:
+                    client.subscriptions[port] = set(body) if body else None
+
+                elif msg_type == MSG_SEND and body:
+                    self.send(port, body[0], body[1:])
+
+                else:
+                    logging.error('Invalid message type {} from client'.format(msg_type))
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+        finally:
+            self.clients.discard(client)
+            writer_task.cancel()
+            writer.close()
+
+    def client_writer_done(self, client, task):
+        # Cancelled when the client disconnects - any other exit of
+        # write_client() is a failed write, so the client is dropped
+        if task.cancelled():
+            return
+
+        error = task.exception()
+
+        if error is not None and not isinstance(error, ConnectionError):
+            logging.error('Writing to client failed', exc_info=error)
+
+        client.writer.close()
+
+    async def write_client(self, client):
+        writer = client.writer
+
+        while True:
+            await client.ready.wait()
+            client.ready.clear()
+
+            while client.queue:
+                batch = []
+
+                while client.queue and len(batch) < self.batch_size:
+                    batch.append(client.queue.popleft())
+
+                writer.writelines(batch)
+                client.sent += len(batch)
+                await writer.drain()
+
+    def send(self, port, packet_id, payload):
+        # Writing blocks for as long as the port takes to take the frame, so
+        # it's left to the port's writer thread
+        max_len = len(self.links[port].tx_buff)
+
+        if len(payload) > max_len:
+            logging.error('Dropped {} byte payload for port {}, packets are limited to {} bytes'.format(
+                len(payload), port, max_len))
+            return
+
+        self.tx_queues[port].put((packet_id, bytes(payload)))
+
+
+class BrokerClient:
+    def __init__(self, socket_path=DEFAULT_SOCKET, timeout=None):
+        '''
+        Description:
+        ------------
+        Blocking client for a Broker
+
+        :param socket_path: str   - path of the broker's Unix domain socket
+        :param timeout:     float - default timeout (in s) for recv()
+
+        :return: void
+        '''
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(socket_path)
+        self.timeout = timeout
+        self.buff    = bytearray()
+
+    def subscribe(self, packet_ids=None, port=0):
+        '''
+        Description:
+        ------------
+        Receive packets with the given IDs from a port (replaces any previous
+        subscription for that port)
+
+        :param packet_ids: iterable - IDs to receive, None for all IDs
+        :param port:       int      - index of the port on the broker
+
+        :return: void
+        '''
+
+        self.sock.sendall(encode_message(MSG_SUBSCRIBE, port, bytes(packet_ids or [])))
+
+    def send(self, payload, packet_id=0, port=0):
+        '''
+        Description:
+        ------------
+        Have the broker send a packet
+
+        :param payload:   bytes-like - packet payload
+        :param packet_id: int        - ID of the packet to send
+        :param port:      int        - index of the port on the broker
+
+        :return: void
+        '''
+
+        self.sock.sendall(encode_message(MSG_SEND, port, bytes([packet_id]) + bytes(payload)))
+
+    def recv(self, timeout=-1):
+        '''
+        Description:
+        ------------
+        Receive the next packet the client is subscribed to
+
+        :param timeout: float - maximum time (in s) to wait, None to block,
+                                defaults to the timeout given to __init__
+
+        :return: tuple - (port index, packet ID, payload), None on timeout
+        '''
+
+        self.sock.settimeout(self.timeout if timeout == -1 else timeout)
+
+        try:
+            while True:
+                if len(self.buff) >= MSG_HEADER.size:
+                    body_len, msg_type, port = MSG_HEADER.unpack_from(self.buff)
+                    msg_len = MSG_HEADER.size + body_len
+
+                    if len(self.buff) >= msg_len:
+                        body = bytes(self.buff[MSG_HEADER.size:msg_len])
+                        del self.buff[:msg_len]
+
+                        if msg_type == MSG_PACKET:
+                            return port, body[0], body[1:]
+                        continue
+
+                data = self.sock.recv(65536)
+
+                if not data:
+                    raise BrokerError('Broker closed the connection')
+                self.buff += data
+
+        except socket.timeout:
+            return None
+
+    def close(self):
+        self.sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pySerialTransfer.broker',
+                                     description='Share serial ports with local processes over a Unix socket')
+    parser.add_argument('ports', nargs='+', help='serial ports to serve (clients refer to them by index)')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='path of the Unix domain socket')
+    parser.add_argument('--baud', type=int, default=115200, help='baud rate of every port')
+    parser.add_argument('--max-queue', type=int, default=1024, help='messages buffered per client')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    links  = [SerialTransfer(port, baud=args.baud, debug=False) for port in args.ports]
+    broker = Broker(links, args.socket, max_queue=args.max_queue)
+
+    logging.info('Serving {} on {}'.format(', '.join(args.ports), args.socket))
+
+    try:
+        asyncio.run(broker.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+'''
+Fixed pools of preallocated packet buffers, so received packets can be kept
+past the next available() call without a new buffer per packet.
+
+Reuse cuts allocations, it doesn't eliminate them: even with the frame
+decoder filling pooled buffers (SerialTransfer.enable_packet_pool()), every
+received packet still allocates the decoder's working bytearray, a Frame
+tuple and the memoryview slice of PacketHandle.payload.
+'''
+
+import threading
+
+from .framing import MAX_PACKET_SIZE
+
+
+POLICY_DROP  = 'drop'
+POLICY_BLOCK = 'block'
+
+
+class InvalidPolicy(Exception):
+    pass
+
+
+class PacketHandle:
+    __slots__ = ('pool', 'index', 'buffer', 'view', 'payload', 'id', 'length', 'timestamp', 'in_use')
+
+    def __init__(self, pool, index, size):
+        self.pool      = pool
+        self.index     = index
+        self.buffer    = bytearray(size)
+        self.view      = memoryview(self.buffer)
+        self.payload   = self.view[:0]  # view of the payload, set by fill()
+        self.id        = 0
+        self.length    = 0
+        self.timestamp = 0
+        self.in_use    = False
+
+    def release(self):
+        '''
+        Description:
+        ------------
+        Return the buffer to its pool
+
+        :return: void
+        '''
+
+        self.pool.release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class PacketPool:
+    def __init__(self, count=64, size=MAX_PACKET_SIZE, policy=POLICY_DROP, timeout=None):
+        '''
+        Description:
+        ------------
+        Fixed pool of preallocated packet buffers. Received packets are
+        copied into a free buffer and handed out as PacketHandle objects that
+        stay valid until released, so packets can outlive the next
+        available() call without allocating a new object per packet. A
+        handle's payload is a memoryview into its buffer that must not be
+        used after the handle is released. See
+        SerialTransfer.enable_packet_pool() to have the frame decoder fill
+        the buffers directly
+
+        :param count:   int   - number of buffers
+        :param size:    int   - size of each buffer in bytes
+        :param policy:  str   - what to do when every buffer is in use:
+                                POLICY_DROP drops the new packet,
+                                POLICY_BLOCK waits for a buffer to be
+                                released
+        :param timeout: float - maximum time (in s) to block before dropping,
+                                required with POLICY_BLOCK: a thread that
+                                holds every buffer itself would otherwise
+                                wait forever
+
+        :return: void
+        :raises InvalidPolicy: if the policy is unknown, or POLICY_BLOCK is
+                               given without a timeout
+        '''
+
+        if policy not in (POLICY_DROP, POLICY_BLOCK):
+            raise InvalidPolicy('Unknown pool exhaustion policy "{}"'.format(policy))
+
+        if policy == POLICY_BLOCK and timeout is None:
+            raise InvalidPolicy('POLICY_BLOCK needs a timeout')
+
+        self.size    = size
+        self.policy  = policy
+        self.timeout = timeout
+        self.handles = [PacketHandle(self, i, size) for i in range(count)]
+        self.free    = list(reversed(self.handles))
+        self.cond    = threading.Condition()
+
+        self.acquired   = 0
+        self.released   = 0
+        self.dropped    = 0
+        self.blocked    = 0
+        self.high_water = 0
+
+    @property
+    def in_use(self):
+        return len(self.handles) - len(self.free)
+
+    def acquire(self, if_free=False):
+        '''
+        Description:
+        ------------
+        Take a free buffer from the pool, applying the exhaustion policy if
+        there is none
+
+        :param if_free: bool - return None right away if no buffer is free,
+                               without applying the policy or counting a drop
+
+        :return: PacketHandle - free handle, None if the packet is to be
+                                dropped
+        '''
+
+        with self.cond:
+            if not self.free:
+                if if_free:
+                    return None
+
+                if self.policy == POLICY_BLOCK:
+                    self.blocked += 1
+                    self.cond.wait_for(lambda: self.free, self.timeout)
+
+                if not self.free:
+                    self.dropped += 1
+                    return None
+
+            handle = self.free.pop()
+            handle.in_use = True
+            self.acquired += 1
+
+            if self.in_use > self.high_water:
+                self.high_water = self.in_use
+            return handle
+
+    def release(self, handle):
+        '''
+        Description:
+        ------------
+        Return a handle's buffer to the pool. Releasing a handle twice has no
+        effect
+
+        :param handle: PacketHandle - handle returned by acquire()
+
+        :return: void
+        '''
+
+        with self.cond:
+            if not handle.in_use:
+                return
+
+            handle.in_use = False
+            self.free.append(handle)
+            self.released += 1
+            self.cond.notify()
+
+    def fill(self, packet_id, payload, timestamp=0, if_free=False):
+        '''
+        Description:
+        ------------
+        Copy a packet into a free buffer
+
+        :param packet_id: int        - ID of the packet
+        :param payload:   bytes-like - packet payload (truncated to the buffer
+                                       size)
+        :param timestamp: int        - receive timestamp to store with the
+                                       packet
+        :param if_free:   bool       - only use a buffer that is free right
+                                       now (see acquire())
+
+        :return: PacketHandle - handle holding the packet, None if dropped
+        '''
+
+        handle = self.acquire(if_free)
+
+        if handle is not None:
+            length = len(payload)
+
+            if length > self.size:
+                length = self.size
+                payload = payload[:length]
+
+            handle.buffer[:length] = payload
+            handle.payload   = handle.view[:length]
+            handle.id        = packet_id
+            handle.length    = length
+            handle.timestamp = timestamp
+        return handle
+
+    def capture(self, link):
+        '''
+        Description:
+        ------------
+        Copy the packet a SerialTransfer link just parsed (call after
+        available() reported new data) out of its RX buffer. Links with
+        enable_packet_pool() don't need this: their rx_handle already holds
+        the packet
+
+        :param link: SerialTransfer - link that received the packet
+
+        :return: PacketHandle - handle holding the packet, None if dropped
+        '''
+
+        return self.fill(link.id_byte, link.rx_buff[:link.bytes_read], getattr(link, 'rx_timestamp', 0))
@@ -0,0 +1,197 @@
+import struct
+import time
+
+
+CLOCK_SYNC_ID = 0xFE
+
+REQUEST = struct.Struct('<HQ')     # sequence number, host send time (t1, ns)
+REPLY   = struct.Struct('<HQQQ')   # sequence number, echoed t1, device receive time (t2), device send time (t3)
+
+
+class ClockSync:
+    def __init__(self, link, packet_id=CLOCK_SYNC_ID, device_tick_ns=1000, max_samples=32):
+        '''
+        Description:
+        ------------
+        Estimate the offset and drift of a device clock relative to the host's
+        time.monotonic_ns() clock with NTP style round trips over a reserved
+        packet ID.
+
+        The host sends REQUEST (sequence number, host send time t1). The
+        device answers on the same packet ID with REPLY (sequence number, t1
+        echoed, device time t2 when the request arrived, device time t3 when
+        the reply was sent), both in device ticks. The host receive time t4 is
+        the link's rx_timestamp of the reply - the time of the read that
+        delivered its start byte, so it runs late by however long the reply
+        waited in the OS buffer. That delay adds to the round trip, which is
+        why only samples with the smallest round trip delay are fitted with
+        a line to get offset and drift (poll the link often while syncing)
+
+        :param link:           SerialTransfer - link to the device
+        :param packet_id:      int - packet ID reserved for clock sync
+        :param device_tick_ns: int - length of one device clock tick in ns
+                                     (1000 for Arduino micros())
+        :param max_samples:    int - number of most recent samples kept
+
+        :return: void
+        '''
+
+        self.link           = link
+        self.packet_id      = packet_id
+        self.device_tick_ns = device_tick_ns
+        self.max_samples    = max_samples
+
+        self.seq     = 0
+        self.samples = []  # (host time, offset, round trip delay) in ns
+
+        self.offset_ns = None  # device - host at self.ref_ns
+        self.drift     = 0.0   # change of offset per host ns
+        self.ref_ns    = 0
+        self.error_ns  = None
+
+    def request(self):
+        '''
+        Description:
+        ------------
+        Send a clock sync request to the device
+
+        :return: bool - whether or not the request was sent
+        '''
+
+        self.seq = (self.seq + 1) & 0xFFFF
+        size = self.link.tx_struct_obj(REQUEST.pack(self.seq, time.monotonic_ns()))
+        return self.link.send(size, self.packet_id)
+
+    def handle_reply(self):
+        '''
+        Description:
+        ------------
+        Process the clock sync reply the link just received (call after
+        available() returned a packet with self.packet_id, or register it as
+        the callback for that ID)
+
+        :return: bool - True if the reply produced a new sample
+        '''
+
+        if self.link.bytes_read < REPLY.size:
+            return False
+
+        seq, t1, t2, t3 = REPLY.unpack(bytes(self.link.rx_buff[:REPLY.size]))
+        t4 = self.link.rx_timestamp or time.monotonic_ns()
+
+        if seq != self.seq:
+            return False
+
+        self.add_sample(t1, t2, t3, t4)
+        return True
+
+    def add_sample(self, t1, t2, t3, t4):
+        '''
+        Description:
+        ------------
+        Add one round trip and update the estimate
+
+        :param t1: int - host time the request was sent (ns)
+        :param t2: int - device time the request was received (device ticks)
+        :param t3: int - device time the reply was sent (device ticks)
+        :param t4: int - host time the reply was received (ns)
+
+        :return: void
+        '''
+
+        t2 *= self.device_tick_ns
+        t3 *= self.device_tick_ns
+
+        delay  = (t4 - t1) - (t3 - t2)
+        offset = ((t2 - t1) + (t3 - t4)) / 2
+        host   = (t1 + t4) // 2
+
+        self.samples.append((host, offset, delay))
+
+        if len(self.samples) > self.max_samples:
+            del self.samples[0]
+
+        self.update()
+
+    def update(self):
+        # Queueing delays only ever add to the round trip, so the fastest
+        # half of the samples carry the most accurate offsets
+        best = sorted(self.samples, key=lambda s: s[2])[:max(2, (len(self.samples) + 1) // 2)]
+        best.sort()
+
+        if len(best) < 2 or best[-1][0] == best[0][0]:
+            host, offset, delay = best[0]
+            self.ref_ns    = host
+            self.offset_ns = offset
+            self.drift     = 0.0
+            self.error_ns  = delay / 2
+            return
+
+        mean_host   = sum(s[0] for s in best) / len(best)
+        mean_offset = sum(s[1] for s in best) / len(best)
+        var  = sum((s[0] - mean_host) ** 2 for s in best)
+        cov  = sum((s[0] - mean_host) * (s[1] - mean_offset) for s in best)
+
+        self.drift     = cov / var
+        self.ref_ns    = int(mean_host)
+        self.offset_ns = mean_offset
+
+        residual = max(abs(s[1] - self.offset_at(s[0])) for s in best)
+        self.error_ns = min(s[2] for s in best) / 2 + residual
+
+    @property
+    def synced(self):
+        return self.offset_ns is not None
+
+    @property
+    def drift_ppm(self):
+        return self.drift * 1e6
+
+    def offset_at(self, host_ns):
+        '''
+        Description:
+        ------------
+        Estimated device - host clock offset at a given host time
+
+        :param host_ns: int - host time (ns)
+
+        :return: float - offset (ns)
+        '''
+
+        return self.offset_ns + self.drift * (host_ns - self.ref_ns)
+
+    def to_host(self, device_ticks):
+        '''
+        Description:
+        ------------
+        Map a device timestamp onto the host's time.monotonic_ns() clock
+
+        :param device_ticks: int - device time (device ticks)
+
+        :return: int - host time (ns), None until the first sample arrived
+        '''
+
+        if not self.synced:
+            return None
+
+        device_ns = device_ticks * self.device_tick_ns
+        # offset_at() takes a host time, one refinement step is plenty for
+        # any realistic drift
+        host_ns = device_ns - self.offset_at(device_ns - self.offset_ns)
+        return int(device_ns - self.offset_at(host_ns))
+
+    def to_device(self, host_ns):
+        '''
+        Description:
+        ------------
+        Map a host time.monotonic_ns() time onto the device clock
+
+        :param host_ns: int - host time (ns)
+
+        :return: int - device time (device ticks), None until the first
+                       sample arrived
+        '''
+
+        if not self.synced:
+            return None
+        return int((host_ns + self.offset_at(host_ns)) / self.device_tick_ns)
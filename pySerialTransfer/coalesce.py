@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+
+
+DEFAULT_MAX_BYTES = 512
+DEFAULT_MAX_DELAY = 0.0005
+
+
+class WriteCoalescer:
+    def __init__(self, link, max_bytes=DEFAULT_MAX_BYTES, max_delay=DEFAULT_MAX_DELAY, clock=time.monotonic):
+        '''
+        Description:
+        ------------
+        Nagle-style output buffer for a SerialTransfer link. Once started,
+        frames from send() (from any thread) are appended to a buffer that
+        is written to the port in one connection.write() call when it holds
+        max_bytes, or max_delay after its first frame was buffered - so
+        bursts of small frames become a few large writes (and USB
+        transfers) while no frame waits longer than max_delay. Call
+        link.flush() to write a latency-critical frame immediately.
+
+        A TxScheduler attached to the same link takes precedence: frames are
+        handed to it unbuffered (after anything already buffered is
+        written), as coalescing would defeat its priorities and pacing
+
+        :param link:      SerialTransfer - link to buffer the output of
+        :param max_bytes: int            - write as soon as this many bytes
+                                           are buffered
+        :param max_delay: float          - longest time (in s) a frame is
+                                           buffered
+        :param clock:     callable       - time source (in s)
+        :return: void
+        '''
+
+        self.link      = link
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.clock     = clock
+
+        self.buff     = bytearray()
+        self.deadline = 0
+
+        self.frames           = 0
+        self.writes           = 0
+        self.size_flushes     = 0
+        self.timer_flushes    = 0
+        self.explicit_flushes = 0
+
+        self.cond    = threading.Condition()
+        self.running = False
+        self.thread  = None
+
+    def start(self):
+        '''
+        Description:
+        ------------
+        Attach the buffer to the link and start the deadline thread
+
+        :return: void
+        '''
+
+        if self.running:
+            return
+
+        self.running = True
+        self.link.tx_coalescer = self
+        self.thread = threading.Thread(target=self.run, name='WriteCoalescer', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        '''
+        Description:
+        ------------
+        Write anything buffered, stop the deadline thread and detach the
+        buffer from the link
+
+        :return: void
+        '''
+
+        with self.cond:
+            self.running = False
+
+            if self.link.tx_coalescer is self:
+                self.link.tx_coalescer = None
+
+            self.cond.notify_all()
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+        self.flush()
+
+    def write(self, frame):
+        '''
+        Description:
+        ------------
+        Buffer a complete frame, writing the buffer if it reached max_bytes
+        or its deadline passed
+
+        :param frame: bytes-like - complete frame
+
+        :return: bool - True
+        '''
+
+        with self.cond:
+            if not self.buff:
+                self.deadline = self.clock() + self.max_delay
+                self.cond.notify()
+
+            self.buff += frame
+            self.frames += 1
+
+            if len(self.buff) >= self.max_bytes:
+                self.size_flushes += 1
+                self.write_buffer()
+
+            elif self.clock() >= self.deadline:
+                self.timer_flushes += 1
+                self.write_buffer()
+
+        return True
+
+    def flush(self):
+        '''
+        Description:
+        ------------
+        Write the buffered frames now
+
+        :return: void
+        '''
+
+        with self.cond:
+            if self.buff:
+                self.explicit_flushes += 1
+                self.write_buffer()
+
+    def write_buffer(self):
+        # Called with the lock held so buffers from different threads can't
+        # be written out of order
+        data = bytes(self.buff)
+        self.buff.clear()
+
+        if self.link.open():
+            self.link.connection.write(data)
+            self.writes += 1
+
+    def run(self):
+        with self.cond:
+            while self.running:
+                if not self.buff:
+                    self.cond.wait()
+                    continue
+
+                remaining = self.deadline - self.clock()
+
+                if remaining > 0:
+                    self.cond.wait(remaining)
+                    continue
+
+                self.timer_flushes += 1
+
+                try:
+                    self.write_buffer()
+                except Exception as e:
+                    logging.exception(e)
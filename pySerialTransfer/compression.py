@@ -0,0 +1,111 @@
+import zlib
+
+
+COMPRESSED_FLAG = 0x01
+HEADER_LEN      = 1
+
+
+class PayloadCompressor:
+    def __init__(self, zdict=b'', level=9, wbits=-9):
+        '''
+        Description:
+        ------------
+        Raw DEFLATE compressor for packet payloads. A shared dictionary
+        (zdict) primes the compressor with text typical of the stream so that
+        even single, short payloads compress well. Both ends of the link must
+        use the same zdict and wbits
+
+        :param zdict: bytes - shared dictionary, ideally made of strings that
+                              frequently appear in the payloads
+        :param level: int   - zlib compression level (0-9)
+        :param wbits: int   - negative zlib window size (raw DEFLATE), a small
+                              window keeps memory use low on the device side
+        :return: void
+        '''
+
+        self.zdict = bytes(zdict)
+        self.level = level
+        self.wbits = wbits
+
+        self.bytes_in  = 0
+        self.bytes_out = 0
+        self.skipped   = 0
+
+    def compress(self, data):
+        '''
+        Description:
+        ------------
+        Compress a payload and prepend the one byte compression header. If
+        compression doesn't shrink the payload, it is sent as is with the
+        header flag cleared
+
+        :param data: bytes - uncompressed payload
+
+        :return: bytes - header byte followed by the (possibly) compressed
+                         payload
+        '''
+
+        if self.zdict:
+            comp = zlib.compressobj(self.level, zlib.DEFLATED, self.wbits, zdict=self.zdict)
+        else:
+            comp = zlib.compressobj(self.level, zlib.DEFLATED, self.wbits)
+
+        packed = comp.compress(data) + comp.flush()
+
+        self.bytes_in += len(data)
+
+        if len(packed) < len(data):
+            self.bytes_out += len(packed) + HEADER_LEN
+            return bytes([COMPRESSED_FLAG]) + packed
+
+        self.skipped   += 1
+        self.bytes_out += len(data) + HEADER_LEN
+        return bytes([0]) + bytes(data)
+
+    def decompress(self, data, max_len):
+        '''
+        Description:
+        ------------
+        Strip the compression header from a received payload and decompress
+        it if its flag is set
+
+        :param data:    bytes - received payload including the header byte
+        :param max_len: int   - maximum allowed size of the decompressed
+                                payload
+
+        :return: bytes - original payload, None if the payload is malformed
+        '''
+
+        if len(data) < HEADER_LEN:
+            return None
+
+        if not data[0] & COMPRESSED_FLAG:
+            return bytes(data[HEADER_LEN:])
+
+        try:
+            if self.zdict:
+                decomp = zlib.decompressobj(self.wbits, zdict=self.zdict)
+            else:
+                decomp = zlib.decompressobj(self.wbits)
+
+            payload = decomp.decompress(bytes(data[HEADER_LEN:]), max_len)
+        except zlib.error:
+            return None
+
+        if decomp.unconsumed_tail or not decomp.eof:
+            return None
+        return payload
+
+    @property
+    def ratio(self):
+        '''
+        Description:
+        ------------
+        Ratio of bytes put on the wire to bytes given to compress() so far
+
+        :return: float - compression ratio (1.0 if nothing was compressed yet)
+        '''
+
+        if not self.bytes_in:
+            return 1.0
+        return self.bytes_out / self.bytes_in
@@ -0,0 +1,152 @@
+import struct
+import threading
+import time
+
+from .framing import MAX_PACKET_SIZE
+
+
+CONTAINER_ID  = 0xFD
+RECORD_HEADER = struct.Struct('<BB')  # packet ID of the record, record length
+MAX_RECORD    = MAX_PACKET_SIZE - RECORD_HEADER.size
+
+
+class InvalidContainer(Exception):
+    pass
+
+
+def unpack_records(payload):
+    '''
+    Description:
+    ------------
+    Split a container payload into its records
+
+    :param payload: bytes - container payload
+
+    :return: list - (packet ID, payload bytes) tuple per record
+    :raises InvalidContainer: if a record runs past the end of the payload
+    '''
+
+    records = []
+    index = 0
+    end = len(payload)
+
+    while index < end:
+        if index + RECORD_HEADER.size > end:
+            raise InvalidContainer('Truncated record header at byte {}'.format(index))
+
+        sub_id, length = RECORD_HEADER.unpack_from(payload, index)
+        index += RECORD_HEADER.size
+
+        if index + length > end:
+            raise InvalidContainer('Record of {} bytes runs past the end of the container'.format(length))
+
+        records.append((sub_id, bytes(payload[index:index + length])))
+        index += length
+
+    return records
+
+
+class ContainerWriter:
+    def __init__(self, max_delay=0.002, max_record=MAX_RECORD, clock=time.monotonic):
+        '''
+        Description:
+        ------------
+        Packs small messages as (packet ID, length, payload) records into a
+        container payload of up to MAX_PACKET_SIZE bytes, so many messages
+        share the framing, CRC and stuffing overhead of one frame. The
+        writer doesn't send anything itself - add() hands back a container
+        when the next record doesn't fit and take() empties it when due()
+
+        :param max_delay:  float    - longest time (in s) a record may wait
+                                      for more records before the container
+                                      is due
+        :param max_record: int      - largest message (in bytes) packed into
+                                      containers, larger ones are sent as
+                                      frames of their own
+        :param clock:      callable - time source (in s)
+        :return: void
+        '''
+
+        self.max_delay  = max_delay
+        self.max_record = min(max_record, MAX_RECORD)
+        self.clock      = clock
+
+        self.buff  = bytearray()
+        self.count = 0
+        self.first = 0
+
+        # Held by the link while it adds, takes or sends records, and waited
+        # on by its flush thread
+        self.cond = threading.Condition()
+
+        self.containers = 0
+        self.records    = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, sub_id, payload):
+        '''
+        Description:
+        ------------
+        Append a record
+
+        :param sub_id:  int        - packet ID the message is delivered with
+        :param payload: bytes-like - message, at most max_record bytes
+
+        :return: bytes - the previous container if the record didn't fit in
+                         it (it must be sent before the record), else None
+        :raises ValueError: if the message is larger than max_record
+        '''
+
+        if len(payload) > self.max_record:
+            raise ValueError('Records are limited to {} bytes, got {}'.format(self.max_record, len(payload)))
+
+        full = None
+
+        if len(self.buff) + RECORD_HEADER.size + len(payload) > MAX_PACKET_SIZE:
+            full = self.take()
+
+        if not self.count:
+            self.first = self.clock()
+
+        self.buff += RECORD_HEADER.pack(sub_id, len(payload))
+        self.buff += payload
+        self.count += 1
+        self.records += 1
+
+        return full
+
+    @property
+    def deadline(self):
+        return self.first + self.max_delay
+
+    def due(self):
+        '''
+        Description:
+        ------------
+        Whether the oldest record has waited max_delay
+
+        :return: bool - True if the container should be sent now
+        '''
+
+        return self.count > 0 and self.clock() >= self.deadline
+
+    def take(self):
+        '''
+        Description:
+        ------------
+        Empty the container
+
+        :return: bytes - container payload, None if it was empty
+        '''
+
+        if not self.count:
+            return None
+
+        payload = bytes(self.buff)
+        self.buff.clear()
+        self.count = 0
+        self.containers += 1
+
+        return payload
@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from types import MappingProxyType
+
+
+def freeze(val):
+    '''
+    Description:
+    ------------
+    Convert a decoded value into an immutable equivalent so it can be shared
+    between callers: dicts become read-only mappings (types.MappingProxyType)
+    and lists become tuples, recursively
+
+    :param val: n/a - decoded value
+
+    :return: n/a - immutable value that compares equal to the original
+    '''
+
+    if isinstance(val, dict):
+        return MappingProxyType({key: freeze(item) for key, item in val.items()})
+
+    if isinstance(val, (list, tuple)):
+        return tuple(freeze(item) for item in val)
+
+    if isinstance(val, bytearray):
+        return bytes(val)
+
+    return val
+
+
+class DecodeCache:
+    def __init__(self, size=128):
+        '''
+        Description:
+        ------------
+        Bounded LRU cache of decoded payloads. When a device keeps sending
+        the same payload, the decoded object of the first copy is returned
+        for every later copy instead of decoding (and allocating) it again
+
+        :param size: int - maximum number of decoded payloads to keep, the
+                           least recently used one is evicted first
+        :return: void
+        '''
+
+        self.size = size
+        self.entries = OrderedDict()
+
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, decode):
+        '''
+        Description:
+        ------------
+        Return the cached value for a key, calling decode() and caching its
+        frozen result on a miss. Results of None (failed decodes) are not
+        cached
+
+        :param key:    hashable - e.g. (packet ID, payload bytes)
+        :param decode: callable - takes no arguments, returns the decoded
+                                  value
+
+        :return: n/a - frozen decoded value, None if decoding failed
+        '''
+
+        try:
+            val = self.entries[key]
+        except KeyError:
+            pass
+        else:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return val
+
+        self.misses += 1
+        val = decode()
+
+        if val is None:
+            return None
+
+        val = freeze(val)
+        self.entries[key] = val
+
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+        return val
+
+    def clear(self):
+        '''
+        Description:
+        ------------
+        Drop every cached value (counters are kept)
+
+        :return: void
+        '''
+
+        self.entries.clear()
@@ -0,0 +1,253 @@
+import struct
+
+
+KEYFRAME_FLAG = 0x80
+SEQ_MASK      = 0x7F
+
+
+class InvalidSchema(Exception):
+    pass
+
+
+class Schema:
+    def __init__(self, fields, byte_format='<'):
+        '''
+        Description:
+        ------------
+        Fixed layout of a telemetry record
+
+        :param fields:      list - sequence of (name, format char) tuples where
+                                   each format char is a single value format as
+                                   defined by https://docs.python.org/3/library/struct.html#format-characters
+        :param byte_format: str  - byte order of the packed fields according to
+                                   https://docs.python.org/3/library/struct.html#struct-format-strings
+
+        :return: void
+        '''
+
+        if not fields:
+            raise InvalidSchema('Schema has no fields')
+
+        self.names   = [name for name, _ in fields]
+        self.structs = []
+
+        for name, format_char in fields:
+            try:
+                self.structs.append(struct.Struct(byte_format + format_char))
+            except struct.error:
+                raise InvalidSchema('Invalid format "{}" for field "{}"'.format(format_char, name))
+
+        self.mask_len   = (len(fields) + 7) // 8
+        self.record_len = sum(s.size for s in self.structs)
+
+
+class DeltaEncoder:
+    def __init__(self, schema, keyframe_interval=50):
+        '''
+        Description:
+        ------------
+        Encode periodic records as either keyframes (every field) or deltas (a
+        bitmask of changed fields followed by only those fields). Every
+        payload starts with a header byte holding the keyframe flag and a
+        7-bit sequence number the receiver uses to detect lost packets
+
+        :param schema:            Schema - layout of the records
+        :param keyframe_interval: int    - send a keyframe at least every
+                                           this many records
+
+        :return: void
+        '''
+
+        self.schema            = schema
+        self.keyframe_interval = keyframe_interval
+        self.last              = None
+        self.seq               = 0
+        self.since_keyframe    = 0
+
+    def force_keyframe(self):
+        '''
+        Description:
+        ------------
+        Make the next encoded record a keyframe (e.g. when the receiver asks
+        for a resync)
+
+        :return: void
+        '''
+
+        self.last = None
+
+    def encode(self, record):
+        '''
+        Description:
+        ------------
+        Encode a record against the previously encoded one
+
+        :param record: dict - field name to value for every field in the
+                              schema
+
+        :return: bytearray - encoded payload
+        '''
+
+        schema = self.schema
+        values = [record[name] for name in schema.names]
+        header = self.seq & SEQ_MASK
+
+        if self.last is None or self.since_keyframe >= self.keyframe_interval:
+            out = bytearray([header | KEYFRAME_FLAG])
+
+            for packer, val in zip(schema.structs, values):
+                out += packer.pack(val)
+
+            self.since_keyframe = 0
+
+        else:
+            out = bytearray(1 + schema.mask_len)
+            out[0] = header
+
+            for i, (packer, val, prev) in enumerate(zip(schema.structs, values, self.last)):
+                if val != prev:
+                    out[1 + (i >> 3)] |= 1 << (i & 7)
+                    out += packer.pack(val)
+
+        self.last            = values
+        self.seq             = (self.seq + 1) & SEQ_MASK
+        self.since_keyframe += 1
+        return out
+
+    def tx(self, link, record, start_pos=0):
+        '''
+        Description:
+        ------------
+        Encode a record into the TX buffer of a SerialTransfer link
+
+        :param link:      SerialTransfer - link to send the record over
+        :param record:    dict           - record to encode
+        :param start_pos: int            - index of TX buffer where the first
+                                           byte of the payload is to be stored
+
+        :return: int - index of the last byte of the payload in the TX buffer + 1
+        '''
+
+        return link.tx_struct_obj(self.encode(record), start_pos)
+
+
+class DeltaDecoder:
+    def __init__(self, schema):
+        '''
+        Description:
+        ------------
+        Reconstruct full records from keyframes and deltas produced by a
+        DeltaEncoder. After a lost packet deltas are dropped until the next
+        keyframe arrives. Losses show up as a gap in the 7-bit sequence
+        number, which misses exactly 128 lost packets - rx() also treats
+        every corrupt frame the link reported since the previous packet as
+        a lost one (callers of decode() must call invalidate() themselves)
+
+        :param schema: Schema - layout of the records
+
+        :return: void
+        '''
+
+        self.schema = schema
+        self.state  = None
+        self.seq    = None
+        self.link_errors = None
+
+        self.keyframes = 0
+        self.deltas    = 0
+        self.dropped   = 0
+        self.resyncs   = 0
+
+    def invalidate(self):
+        '''
+        Description:
+        ------------
+        Discard the reconstructed state (e.g. after a CRC error) so that
+        deltas are dropped until the next keyframe
+
+        :return: void
+        '''
+
+        if self.state is not None:
+            self.resyncs += 1
+        self.state = None
+
+    def decode(self, payload):
+        '''
+        Description:
+        ------------
+        Apply a received payload to the reconstructed state
+
+        :param payload: bytes-like - payload produced by DeltaEncoder.encode()
+
+        :return: dict - full record, None if the record can't be
+                        reconstructed until the next keyframe
+        '''
+
+        schema = self.schema
+
+        if not payload:
+            return None
+
+        header = payload[0]
+        seq    = header & SEQ_MASK
+
+        if self.seq is not None and seq != ((self.seq + 1) & SEQ_MASK):
+            self.invalidate()
+        self.seq = seq
+
+        try:
+            if header & KEYFRAME_FLAG:
+                index = 1
+                state = []
+
+                for unpacker in schema.structs:
+                    state.append(unpacker.unpack_from(payload, index)[0])
+                    index += unpacker.size
+
+                self.state      = state
+                self.keyframes += 1
+
+            elif self.state is None:
+                self.dropped += 1
+                return None
+
+            else:
+                index = 1 + schema.mask_len
+                state = self.state
+
+                for i, unpacker in enumerate(schema.structs):
+                    if payload[1 + (i >> 3)] & (1 << (i & 7)):
+                        state[i] = unpacker.unpack_from(payload, index)[0]
+                        index += unpacker.size
+
+                self.deltas += 1
+
+        except (struct.error, IndexError):
+            self.invalidate()
+            self.dropped += 1
+            return None
+
+        return dict(zip(schema.names, self.state))
+
+    def rx(self, link, start_pos=0):
+        '''
+        Description:
+        ------------
+        Decode the payload of the last packet received by a SerialTransfer
+        link, first invalidating the state if the link received a corrupt
+        frame since the previous call
+
+        :param link:      SerialTransfer - link the packet was received on
+        :param start_pos: int            - index of RX buffer where the first
+                                           byte of the payload is stored
+
+        :return: dict - full record, None if the record can't be
+                        reconstructed until the next keyframe
+        '''
+
+        if self.link_errors is not None and link.rx_errors != self.link_errors:
+            self.invalidate()
+        self.link_errors = link.rx_errors
+
+        return self.decode(bytes(link.rx_buff[start_pos:link.bytes_read]))
@@ -0,0 +1,428 @@
+'''
+Emulator of an Arduino running the SerialTransfer library, for exercising
+and load testing the Python side without boards attached. The emulated
+device speaks the same framing and can sit on the far end of a
+pseudo-terminal (so SerialTransfer opens it like any serial port) or of an
+in-memory pipe.
+
+The device:
+
+    - echoes every packet it receives (unless told otherwise)
+    - answers RPC-style requests through handlers registered per packet ID
+    - generates telemetry at a set rate with a weighted mix of payload sizes
+    - reads its port through a small RX buffer (64 bytes by default, like
+      the Arduino HardwareSerial ring buffer). Bytes that arrive while the
+      buffer is full are dropped and counted as overruns, so bursts larger
+      than the buffer between two device loop iterations corrupt frames
+      just like on real hardware
+
+usage: python -m pySerialTransfer.emulator --telemetry-rate 100 --sizes 16:3,64:1
+'''
+
+import argparse
+import os
+import random
+import struct
+import threading
+import time
+from collections import deque
+
+from .framing import FrameDecoder, FrameEncoder, MAX_PACKET_SIZE
+from .pySerialTransfer import SerialTransfer
+
+
+ARDUINO_RX_BUFFER = 64
+TELEMETRY_ID      = 0xF0
+TELEMETRY_HEADER  = struct.Struct('<IQ')  # sequence number, device time (ns)
+
+
+class PipeEnd:
+    def __init__(self, rx, tx, lock):
+        '''
+        Description:
+        ------------
+        One end of an in-memory pipe created by pipe(). Implements the part
+        of the pySerial Serial API that SerialTransfer uses
+
+        :param rx:   bytearray - buffer this end reads from
+        :param tx:   bytearray - buffer this end writes to
+        :param lock: Lock      - lock shared by both ends
+        :return: void
+        '''
+
+        self.rx   = rx
+        self.tx   = tx
+        self.lock = lock
+
+        self.port          = 'pipe'
+        self.baudrate      = None
+        self.timeout       = 0
+        self.write_timeout = None
+        self.is_open       = True
+
+    def open(self):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    @property
+    def in_waiting(self):
+        return len(self.rx)
+
+    def read(self, size=1):
+        with self.lock:
+            data = bytes(self.rx[:size])
+            del self.rx[:size]
+        return data
+
+    def write(self, data):
+        with self.lock:
+            self.tx += data
+        return len(data)
+
+
+def pipe():
+    '''
+    Description:
+    ------------
+    Create a connected pair of in-memory ports
+
+    :return: tuple - (host end, device end) PipeEnd objects
+    '''
+
+    lock = threading.Lock()
+    a_to_b = bytearray()
+    b_to_a = bytearray()
+    return PipeEnd(b_to_a, a_to_b, lock), PipeEnd(a_to_b, b_to_a, lock)
+
+
+class PtyPort:
+    def __init__(self):
+        '''
+        Description:
+        ------------
+        Master side of a pseudo-terminal. Open slave_name with
+        SerialTransfer(slave_name, restrict_ports=False) on the host side
+
+        :return: void
+        '''
+
+        import fcntl
+        import pty
+        import termios
+        import tty
+
+        self.fd, slave_fd = pty.openpty()
+        tty.setraw(slave_fd)
+        self.ioctl      = fcntl.ioctl
+        self.fionread   = termios.FIONREAD
+        self.slave_fd   = slave_fd
+        self.slave_name = os.ttyname(slave_fd)
+        self.is_open    = True
+
+    def open(self):
+        pass
+
+    def close(self):
+        if self.is_open:
+            os.close(self.fd)
+            os.close(self.slave_fd)
+            self.is_open = False
+
+    @property
+    def in_waiting(self):
+        return struct.unpack('i', self.ioctl(self.fd, self.fionread, b'\0\0\0\0'))[0]
+
+    def read(self, size=1):
+        try:
+            return os.read(self.fd, size)
+        except OSError:
+            return b''
+
+    def write(self, data):
+        return os.write(self.fd, data)
+
+
+class DeviceEmulator:
+    def __init__(self, port, crc_len=8, rx_buffer_size=ARDUINO_RX_BUFFER, echo=True, seed=None,
+                 clock=time.monotonic_ns):
+        '''
+        Description:
+        ------------
+        Emulated SerialTransfer peer
+
+        :param port:           PipeEnd, PtyPort or Serial - device side of
+                                                            the link
+        :param crc_len:        int      - CRC width, must match the host
+        :param rx_buffer_size: int      - size of the device RX buffer,
+                                          None for unlimited
+        :param echo:           bool     - send every received packet without
+                                          an RPC handler back unchanged
+        :param seed:           int      - seed for the telemetry size mix
+        :param clock:          callable - device clock in ns
+        :return: void
+        '''
+
+        self.port           = port
+        self.encoder        = FrameEncoder(crc_len)
+        self.decoder        = FrameDecoder(crc_len)
+        self.rx_buffer_size = rx_buffer_size
+        self.echo           = echo
+        self.handlers       = {}
+        self.random         = random.Random(seed)
+        self.clock          = clock
+
+        self.telemetry_rate    = 0
+        self.telemetry_id      = TELEMETRY_ID
+        self.telemetry_sizes   = [TELEMETRY_HEADER.size]
+        self.telemetry_weights = [1]
+        self.telemetry_seq     = 0
+        self.next_telemetry    = 0
+
+        self.rx_frames = 0
+        self.tx_frames = 0
+        self.rx_bytes  = 0
+        self.overruns  = 0
+
+        self.thread   = None
+        self.running  = False
+        self.received = deque(maxlen=256)
+
+    def register(self, packet_id, handler):
+        '''
+        Description:
+        ------------
+        Answer requests with the given packet ID
+
+        :param packet_id: int      - ID of the request packets
+        :param handler:   callable - called with the request payload (bytes),
+                                     returns the reply payload sent back with
+                                     the same ID, or None to not reply
+
+        :return: void
+        '''
+
+        self.handlers[packet_id] = handler
+
+    def telemetry(self, rate, sizes=None, packet_id=TELEMETRY_ID):
+        '''
+        Description:
+        ------------
+        Generate telemetry packets. Each payload starts with a sequence number
+        (uint32) and the device time in ns (uint64), padded to the chosen size
+
+        :param rate:      float - packets per second, 0 to stop
+        :param sizes:     dict  - payload size -> relative weight, e.g.
+                                  {16: 9, 200: 1}
+        :param packet_id: int   - ID of the telemetry packets
+
+        :return: void
+        '''
+
+        if sizes:
+            for size in sizes:
+                if not TELEMETRY_HEADER.size <= size <= MAX_PACKET_SIZE:
+                    raise ValueError('Telemetry sizes must be between {} and {}'.format(
+                        TELEMETRY_HEADER.size, MAX_PACKET_SIZE))
+
+            self.telemetry_sizes   = list(sizes)
+            self.telemetry_weights = list(sizes.values())
+
+        self.telemetry_rate = rate
+        self.telemetry_id   = packet_id
+        self.next_telemetry = self.clock()
+
+    def send(self, payload, packet_id=0):
+        '''
+        Description:
+        ------------
+        Send a packet from the device
+
+        :param payload:   bytes - payload
+        :param packet_id: int   - ID of the packet
+
+        :return: void
+        '''
+
+        self.port.write(self.encoder.encode(payload, packet_id))
+        self.tx_frames += 1
+
+    def read_port(self):
+        '''
+        Description:
+        ------------
+        Read what arrived since the last loop iteration through the emulated
+        RX buffer, dropping whatever doesn't fit
+
+        :return: bytes - bytes that made it into the RX buffer
+        '''
+
+        waiting = self.port.in_waiting
+
+        if not waiting:
+            return b''
+
+        data = self.port.read(waiting)
+
+        if self.rx_buffer_size is not None and len(data) > self.rx_buffer_size:
+            self.overruns += len(data) - self.rx_buffer_size
+            data = data[:self.rx_buffer_size]
+
+        self.rx_bytes += len(data)
+        return data
+
+    def poll(self):
+        '''
+        Description:
+        ------------
+        Run one iteration of the device loop: parse received bytes, answer
+        packets and send any telemetry that is due
+
+        :return: int - number of packets received
+        '''
+
+        frames = self.decoder.feed(self.read_port(), self.clock())
+
+        for frame in frames:
+            self.rx_frames += 1
+            self.received.append(frame)
+            handler = self.handlers.get(frame.id)
+
+            if handler is not None:
+                reply = handler(frame.payload)
+
+                if reply is not None:
+                    self.send(reply, frame.id)
+
+            elif self.echo:
+                self.send(frame.payload, frame.id)
+
+        if self.telemetry_rate:
+            now = self.clock()
+            interval = int(1e9 / self.telemetry_rate)
+
+            while self.next_telemetry <= now:
+                size = self.random.choices(self.telemetry_sizes, self.telemetry_weights)[0]
+                payload = TELEMETRY_HEADER.pack(self.telemetry_seq & 0xFFFFFFFF, now)
+                self.send(payload + bytes(size - len(payload)), self.telemetry_id)
+
+                self.telemetry_seq += 1
+                self.next_telemetry += interval
+
+        return len(frames)
+
+    def run(self, loop_interval=0.001):
+        '''
+        Description:
+        ------------
+        Run the device loop until stop() is called
+
+        :param loop_interval: float - time (in s) between loop iterations -
+                                      together with rx_buffer_size this sets
+                                      the input rate the device can keep up
+                                      with
+
+        :return: void
+        '''
+
+        self.running = True
+
+        while self.running:
+            self.poll()
+            time.sleep(loop_interval)
+
+    def start(self, loop_interval=0.001):
+        '''
+        Description:
+        ------------
+        Run the device loop in a background thread
+
+        :param loop_interval: float - time (in s) between loop iterations
+
+        :return: void
+        '''
+
+        self.thread = threading.Thread(target=self.run, args=(loop_interval,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        '''
+        Description:
+        ------------
+        Stop the background device loop
+
+        :return: void
+        '''
+
+        self.running = False
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+def emulated_link(device_kwargs=None, **link_kwargs):
+    '''
+    Description:
+    ------------
+    Create a SerialTransfer link connected to an emulated device through an
+    in-memory pipe. Call device.poll() (or device.start()) to run the device
+
+    :param device_kwargs: dict - keyword arguments for DeviceEmulator
+    :param link_kwargs:   dict - keyword arguments for SerialTransfer
+
+    :return: tuple - (SerialTransfer, DeviceEmulator)
+    '''
+
+    host_end, device_end = pipe()
+
+    link = SerialTransfer('pipe', restrict_ports=False, **link_kwargs)
+    link.connection = host_end
+
+    device_kwargs = dict(device_kwargs or {})
+    device_kwargs.setdefault('crc_len', link_kwargs.get('crc_len', 8))
+
+    return link, DeviceEmulator(device_end, **device_kwargs)
+
+
+def parse_sizes(text):
+    sizes = {}
+
+    for item in text.split(','):
+        size, _, weight = item.partition(':')
+        sizes[int(size)] = float(weight or 1)
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pySerialTransfer.emulator',
+                                     description='Emulate a SerialTransfer device on a pseudo-terminal')
+    parser.add_argument('--telemetry-rate', type=float, default=0, help='telemetry packets per second')
+    parser.add_argument('--sizes', type=parse_sizes, default=None,
+                        help='telemetry payload size mix as size:weight pairs, e.g. 16:9,200:1')
+    parser.add_argument('--rx-buffer', type=int, default=ARDUINO_RX_BUFFER, help='device RX buffer size (0: unlimited)')
+    parser.add_argument('--crc-len', type=int, default=8, help='CRC width in bits')
+    parser.add_argument('--no-echo', action='store_true', help='do not echo received packets')
+    parser.add_argument('--loop-interval', type=float, default=0.001, help='device loop period in s')
+    args = parser.parse_args(argv)
+
+    port = PtyPort()
+    device = DeviceEmulator(port, args.crc_len, args.rx_buffer or None, echo=not args.no_echo)
+
+    if args.telemetry_rate:
+        device.telemetry(args.telemetry_rate, args.sizes)
+
+    print('Emulated device on {}'.format(port.slave_name), flush=True)
+
+    try:
+        device.run(args.loop_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print('rx {} tx {} overruns {}'.format(device.rx_frames, device.tx_frames, device.overruns))
+        port.close()
+
+
+if __name__ == '__main__':
+    main()
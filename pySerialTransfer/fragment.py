@@ -0,0 +1,216 @@
+import struct
+import time
+
+from .compression import HEADER_LEN
+from .pySerialTransfer import MAX_PACKET_SIZE
+
+
+FRAG_HEADER   = struct.Struct('<BBB')  # message sequence number, fragment index, fragment count
+FRAG_PAYLOAD  = MAX_PACKET_SIZE - FRAG_HEADER.size
+# Fragments sent on compressed IDs leave room for the compression header, so
+# they still fit in a packet when they don't compress
+COMPRESSED_FRAG_PAYLOAD = FRAG_PAYLOAD - HEADER_LEN
+MAX_FRAGMENTS = 0xFF
+MAX_MESSAGE   = FRAG_PAYLOAD * MAX_FRAGMENTS
+
+
+class MessageTooLong(Exception):
+    pass
+
+
+def send_fragments(link, data, packet_id=0, msg_seq=0):
+    '''
+    Description:
+    ------------
+    Split a message into fragments and send each one as a packet with the
+    given ID. Every fragment starts with FRAG_HEADER (message sequence
+    number, fragment index, fragment count), all fragments but the last
+    carry FRAG_PAYLOAD bytes of the message (COMPRESSED_FRAG_PAYLOAD if the
+    link compresses the ID)
+
+    :param link:      SerialTransfer - link to send the fragments over
+    :param data:      bytes-like     - message to send
+    :param packet_id: int            - ID of the fragment packets
+    :param msg_seq:   int            - message sequence number (0-255) that
+                                       tells consecutive messages apart
+
+    :return: bool - whether or not every fragment was sent
+    '''
+
+    stride = COMPRESSED_FRAG_PAYLOAD if packet_id in getattr(link, 'compressors', ()) else FRAG_PAYLOAD
+    data   = memoryview(bytes(data))
+    count  = max(1, (len(data) + stride - 1) // stride)
+
+    if count > MAX_FRAGMENTS:
+        raise MessageTooLong('Messages are limited to {} bytes, got {}'.format(stride * MAX_FRAGMENTS, len(data)))
+
+    for index in range(count):
+        chunk = data[index * stride:(index + 1) * stride]
+        size  = link.tx_struct_obj(FRAG_HEADER.pack(msg_seq & 0xFF, index, count) + chunk)
+
+        if not link.send(size, packet_id):
+            return False
+    return True
+
+
+class _Slot:
+    __slots__ = ('buffer', 'key', 'count', 'received', 'num_received', 'length', 'started', 'stride', 'last')
+
+    def __init__(self, size):
+        self.buffer = bytearray(size)
+        self.key    = None
+
+    def reset(self, key, count, now):
+        self.key          = key
+        self.count        = count
+        self.received     = 0
+        self.num_received = 0
+        self.length       = 0
+        self.started      = now
+        self.stride       = None
+        self.last         = None
+
+
+class Reassembler:
+    def __init__(self, max_message=MAX_MESSAGE, max_pending=4, timeout=1.0, clock=time.monotonic):
+        '''
+        Description:
+        ------------
+        Reassemble messages sent with send_fragments(). Fragments may arrive
+        out of order and are written straight to their place in a
+        preallocated buffer. Messages still incomplete after timeout seconds
+        are discarded
+
+        :param max_message: int      - largest message to accept in bytes
+        :param max_pending: int      - number of messages that may be in
+                                       progress at once (one buffer each)
+        :param timeout:     float    - time (in s) a message may take to
+                                       complete
+        :param clock:       callable - time source
+
+        :return: void
+        '''
+
+        self.max_message = max_message
+        self.timeout     = timeout
+        self.clock       = clock
+        self.slots       = [_Slot(max_message) for _ in range(max_pending)]
+
+        self.completed = 0
+        self.timed_out = 0
+        self.evicted   = 0
+        self.invalid   = 0
+
+    def expire(self, now):
+        for slot in self.slots:
+            if slot.key is not None and now - slot.started > self.timeout:
+                slot.key = None
+                self.timed_out += 1
+
+    def find_slot(self, key, count, now):
+        free = None
+
+        for slot in self.slots:
+            if slot.key == key:
+                return slot
+            if slot.key is None and free is None:
+                free = slot
+
+        if free is None:
+            free = min(self.slots, key=lambda s: s.started)
+            self.evicted += 1
+
+        free.reset(key, count, now)
+        return free
+
+    def feed(self, packet_id, payload):
+        '''
+        Description:
+        ------------
+        Process one received fragment
+
+        :param packet_id: int        - ID of the packet the fragment came in
+        :param payload:   bytes-like - packet payload
+
+        :return: bytes - complete message once its last missing fragment
+                         arrived, else None
+        '''
+
+        now = self.clock()
+        self.expire(now)
+
+        if len(payload) < FRAG_HEADER.size:
+            self.invalid += 1
+            return None
+
+        msg_seq, index, count = FRAG_HEADER.unpack_from(bytes(payload[:FRAG_HEADER.size]))
+        chunk_len = len(payload) - FRAG_HEADER.size
+        last      = index == count - 1
+
+        # All fragments but the last carry the same number of bytes, which
+        # depends on whether the sender compresses the ID. The offset of the
+        # last fragment is only known once another one arrived
+        if (index >= count or (not last and chunk_len not in (FRAG_PAYLOAD, COMPRESSED_FRAG_PAYLOAD))
+                or (not last and (index + 1) * chunk_len > self.max_message)
+                or (count == 1 and chunk_len > self.max_message)):
+            self.invalid += 1
+            return None
+
+        slot = self.find_slot((packet_id, msg_seq), count, now)
+
+        if slot.count != count:
+            slot.reset(slot.key, count, now)
+
+        if slot.received & (1 << index):
+            return None
+
+        if not last:
+            if slot.stride is None:
+                slot.stride = chunk_len
+            elif slot.stride != chunk_len:
+                self.invalid += 1
+                return None
+
+            offset = index * chunk_len
+            slot.buffer[offset:offset + chunk_len] = payload[FRAG_HEADER.size:]
+        elif count == 1:
+            slot.buffer[:chunk_len] = payload[FRAG_HEADER.size:]
+            slot.length = chunk_len
+        else:
+            slot.last = bytes(payload[FRAG_HEADER.size:])
+
+        slot.received     |= 1 << index
+        slot.num_received += 1
+
+        if slot.num_received < count:
+            return None
+
+        slot.key = None
+
+        if slot.last is not None:
+            offset = (count - 1) * slot.stride
+            slot.length = offset + len(slot.last)
+
+            if slot.length > self.max_message:
+                self.invalid += 1
+                return None
+
+            slot.buffer[offset:slot.length] = slot.last
+            slot.last = None
+
+        self.completed += 1
+        return bytes(slot.buffer[:slot.length])
+
+    def rx(self, link):
+        '''
+        Description:
+        ------------
+        Process the fragment a SerialTransfer link just received
+
+        :param link: SerialTransfer - link that received the fragment
+
+        :return: bytes - complete message once its last missing fragment
+                         arrived, else None
+        '''
+
+        return self.feed(link.id_byte, bytes(link.rx_buff[:link.bytes_read]))
@@ -0,0 +1,456 @@
+'''
+Sans-IO implementation of the pySerialTransfer framing. FrameEncoder turns a
+payload into a complete frame and FrameDecoder turns any chunking of a byte
+stream back into frames - neither touches a port, so the same codec works
+over serial ports, sockets, asyncio transports or capture files.
+
+Standard frame:
+
+    START_BYTE | ID | overhead | length (1-254) | stuffed payload | CRC | STOP_BYTE
+
+Extended frame (payloads of up to MAX_EXT_PACKET_SIZE bytes):
+
+    START_BYTE | ID | 0xFF | EXT_LEN_MARKER | length (16-bit, big endian) |
+    stuffed blocks | CRC-32 (big endian) | STOP_BYTE
+
+Payloads are COBS stuffed against START_BYTE: the overhead byte holds the
+index of the first START_BYTE (0xFF if there is none), each START_BYTE is
+replaced by the distance to the next one and the last one by 0. Extended
+frames stuff every block of up to MAX_PACKET_SIZE bytes separately, each
+block preceded by its own overhead byte. CRCs cover the stuffed bytes.
+'''
+
+import time
+from collections import namedtuple
+
+from .CRC import CRC
+
+
+START_BYTE = 0x7E
+STOP_BYTE  = 0x81
+
+MAX_PACKET_SIZE = 0xFE
+
+EXT_LEN_MARKER      = 0xFF
+MAX_EXT_PACKET_SIZE = 0xFFFF
+EXT_CRC_LEN         = 32
+
+# Error codes (same values as pySerialTransfer.Status)
+CRC_ERROR       = 0
+PAYLOAD_ERROR   = -1
+STOP_BYTE_ERROR = -2
+
+# Decoder states (same values as pySerialTransfer.State)
+FIND_START_BYTE    = 0
+FIND_ID_BYTE       = 1
+FIND_OVERHEAD_BYTE = 2
+FIND_PAYLOAD_LEN   = 3
+FIND_PAYLOAD       = 4
+FIND_CRC           = 5
+FIND_END_BYTE      = 6
+FIND_EXT_LEN       = 7
+
+Frame = namedtuple('Frame', ['id', 'payload', 'timestamp'])
+FrameError = namedtuple('FrameError', ['code', 'id', 'timestamp'])
+
+
+def stuff(block):
+    '''
+    Description:
+    ------------
+    Apply the COBS ruleset to a block of up to MAX_PACKET_SIZE bytes in place
+
+    :param block: bytearray - block to stuff
+
+    :return: int - overhead byte of the block
+    '''
+
+    next_index = block.rfind(START_BYTE)
+
+    if next_index == -1:
+        return 0xFF
+
+    i = next_index
+    block[i] = 0
+
+    while True:
+        i = block.rfind(START_BYTE, 0, i)
+
+        if i == -1:
+            return next_index
+
+        block[i] = next_index - i
+        next_index = i
+
+
+def unstuff(block, overhead):
+    '''
+    Description:
+    ------------
+    Reverse stuff() in place
+
+    :param block:    bytearray - stuffed block
+    :param overhead: int       - overhead byte of the block
+
+    :return: bool - False if the stuffing is inconsistent
+    '''
+
+    if overhead == 0xFF:
+        return True
+
+    i = overhead
+    block_len = len(block)
+
+    while i < block_len:
+        delta = block[i]
+        block[i] = START_BYTE
+
+        if not delta:
+            return True
+        i += delta
+
+    return False
+
+
+def ext_wire_len(pay_len):
+    '''
+    Description:
+    ------------
+    Number of bytes the stuffed blocks of an extended frame take up
+
+    :param pay_len: int - number of bytes in the payload
+
+    :return: int - number of bytes on the wire (payload plus one overhead
+                   byte per block)
+    '''
+
+    return pay_len + (pay_len + MAX_PACKET_SIZE - 1) // MAX_PACKET_SIZE
+
+
+def stuff_blocks(payload):
+    '''
+    Description:
+    ------------
+    Split a payload into blocks of up to MAX_PACKET_SIZE bytes, stuff each
+    block and prefix it with its overhead byte
+
+    :param payload: bytes - payload of an extended frame
+
+    :return: bytearray - stuffed blocks
+    '''
+
+    out = bytearray()
+
+    for start in range(0, len(payload), MAX_PACKET_SIZE):
+        block = bytearray(payload[start:start + MAX_PACKET_SIZE])
+        out.append(stuff(block))
+        out += block
+
+    return out
+
+
+def unstuff_blocks(wire, pay_len):
+    '''
+    Description:
+    ------------
+    Reverse stuff_blocks()
+
+    :param wire:    bytes-like - stuffed blocks
+    :param pay_len: int        - number of bytes in the payload
+
+    :return: bytearray - payload, None if the stuffing is inconsistent
+    '''
+
+    out = bytearray()
+    index = 0
+
+    while len(out) < pay_len:
+        block_len = min(MAX_PACKET_SIZE, pay_len - len(out))
+        block = bytearray(wire[index + 1:index + 1 + block_len])
+
+        if not unstuff(block, wire[index]):
+            return None
+
+        index += 1 + block_len
+        out += block
+
+    return out
+
+
+class FrameEncoder:
+    __slots__ = ('crc', 'ext_crc', 'extended')
+
+    def __init__(self, crc_len=8, extended=False):
+        '''
+        Description:
+        ------------
+        Encodes payloads into complete frames
+
+        :param crc_len:  int  - CRC width of standard frames (8, 16 or 32)
+        :param extended: bool - encode payloads larger than MAX_PACKET_SIZE
+                                as extended frames
+        :return: void
+        '''
+
+        self.crc      = CRC(crc_len=crc_len)
+        self.ext_crc  = CRC(crc_len=EXT_CRC_LEN)
+        self.extended = extended
+
+    def encode(self, payload, packet_id=0):
+        '''
+        Description:
+        ------------
+        Encode a payload into a complete frame
+
+        :param payload:   bytes-like - payload of the packet
+        :param packet_id: int        - ID of the packet
+
+        :return: bytes - frame, ready to be written
+        :raises ValueError: if the payload doesn't fit in a frame
+        '''
+
+        pay_len = len(payload)
+
+        if pay_len > MAX_PACKET_SIZE:
+            if not self.extended or pay_len > MAX_EXT_PACKET_SIZE:
+                raise ValueError('Payload of {} bytes does not fit in a frame'.format(pay_len))
+
+            blocks = stuff_blocks(payload)
+
+            frame = bytearray((START_BYTE, packet_id, 0xFF, EXT_LEN_MARKER, pay_len >> 8, pay_len & 0xFF))
+            frame += blocks
+            frame += self.ext_crc.calculate_bytes(blocks).to_bytes(self.ext_crc.num_bytes, 'big')
+            frame.append(STOP_BYTE)
+
+            return bytes(frame)
+
+        block = bytearray(payload)
+        overhead = stuff(block)
+
+        frame = bytearray((START_BYTE, packet_id, overhead, pay_len))
+        frame += block
+        frame += self.crc.calculate_bytes(block).to_bytes(self.crc.num_bytes, 'big')
+        frame.append(STOP_BYTE)
+
+        return bytes(frame)
+
+
+class FrameDecoder:
+    __slots__ = ('crc', 'ext_crc', 'extended', 'report_errors', 'state',
+                 'id_byte', 'overhead_byte', 'pay_len', 'wire_len', 'buff',
+                 'rec_crc', 'crc_bytes', 'len_bytes', 'is_extended', 'timestamp',
+                 'pool', 'frames', 'crc_errors', 'payload_errors', 'stop_byte_errors')
+
+    def __init__(self, crc_len=8, extended=False, report_errors=False, pool=None):
+        '''
+        Description:
+        ------------
+        Incremental frame parser. Bytes can be fed in chunks of any size and
+        frames may span any number of chunks. Payload, CRC and garbage
+        between frames are consumed in bulk rather than byte by byte
+
+        :param crc_len:       int  - CRC width of standard frames (8, 16 or
+                                     32)
+        :param extended:      bool - accept extended frames, otherwise their
+                                     length marker is a payload error
+        :param report_errors: bool - return a FrameError for every corrupt
+                                     frame alongside the good frames (errors
+                                     are always counted)
+        :param pool:          PacketPool - copy the payloads of standard
+                                           frames into free buffers of this
+                                           pool (see
+                                           pySerialTransfer.buffer_pool): the
+                                           Frame payload is then a
+                                           PacketHandle. Frames completed
+                                           while no buffer is free get a
+                                           bytes payload as usual - the
+                                           pool's exhaustion policy is left
+                                           to the consumer
+        :return: void
+        '''
+
+        self.crc           = CRC(crc_len=crc_len)
+        self.ext_crc       = CRC(crc_len=EXT_CRC_LEN)
+        self.extended      = extended
+        self.report_errors = report_errors
+
+        self.state         = FIND_START_BYTE
+        self.id_byte       = 0
+        self.overhead_byte = 0xFF
+        self.pay_len       = 0
+        self.wire_len      = 0
+        self.buff          = bytearray()
+        self.rec_crc       = 0
+        self.crc_bytes     = 0
+        self.len_bytes     = 0
+        self.is_extended   = False
+        self.timestamp     = 0
+        self.pool          = pool
+
+        self.frames           = 0
+        self.crc_errors       = 0
+        self.payload_errors   = 0
+        self.stop_byte_errors = 0
+
+    def reset(self):
+        '''
+        Description:
+        ------------
+        Drop any partially received frame
+
+        :return: void
+        '''
+
+        self.state = FIND_START_BYTE
+        self.buff = bytearray()
+
+    def _error(self, out, code):
+        if code == CRC_ERROR:
+            self.crc_errors += 1
+        elif code == PAYLOAD_ERROR:
+            self.payload_errors += 1
+        else:
+            self.stop_byte_errors += 1
+
+        if self.report_errors:
+            out.append(FrameError(code, self.id_byte, self.timestamp))
+
+        return FIND_START_BYTE
+
+    def feed(self, data, timestamp=None):
+        '''
+        Description:
+        ------------
+        Parse a chunk of the byte stream
+
+        :param data:      bytes-like - received bytes
+        :param timestamp: int        - receive time of the chunk, stored in
+                                       every frame that starts within it -
+                                       time.monotonic_ns() if not given
+
+        :return: list - Frame tuples (id, payload bytes, timestamp) completed
+                        by this chunk, in order, interleaved with FrameError
+                        tuples (code, id, timestamp) if report_errors is set
+        '''
+
+        if not isinstance(data, (bytes, bytearray)):
+            data = bytes(data)
+
+        out = []
+        end = len(data)
+        i = 0
+        state = self.state
+
+        while i < end:
+            if state == FIND_START_BYTE:
+                i = data.find(START_BYTE, i)
+
+                if i == -1:
+                    break
+
+                if timestamp is None:
+                    timestamp = time.monotonic_ns()
+
+                self.timestamp = timestamp
+                state = FIND_ID_BYTE
+                i += 1
+
+            elif state == FIND_ID_BYTE:
+                self.id_byte = data[i]
+                state = FIND_OVERHEAD_BYTE
+                i += 1
+
+            elif state == FIND_OVERHEAD_BYTE:
+                self.overhead_byte = data[i]
+                state = FIND_PAYLOAD_LEN
+                i += 1
+
+            elif state == FIND_PAYLOAD_LEN:
+                pay_len = data[i]
+                i += 1
+
+                if 0 < pay_len <= MAX_PACKET_SIZE:
+                    self.pay_len = self.wire_len = pay_len
+                    self.is_extended = False
+                    self.buff = bytearray()
+                    state = FIND_PAYLOAD
+
+                elif pay_len == EXT_LEN_MARKER and self.extended:
+                    self.pay_len = 0
+                    self.len_bytes = 0
+                    self.is_extended = True
+                    state = FIND_EXT_LEN
+
+                else:
+                    state = self._error(out, PAYLOAD_ERROR)
+
+            elif state == FIND_EXT_LEN:
+                self.pay_len = (self.pay_len << 8) | data[i]
+                self.len_bytes += 1
+                i += 1
+
+                if self.len_bytes == 2:
+                    if self.pay_len <= MAX_PACKET_SIZE:
+                        state = self._error(out, PAYLOAD_ERROR)
+                    else:
+                        self.wire_len = ext_wire_len(self.pay_len)
+                        self.buff = bytearray()
+                        state = FIND_PAYLOAD
+
+            elif state == FIND_PAYLOAD:
+                take = min(self.wire_len - len(self.buff), end - i)
+                self.buff += data[i:i + take]
+                i += take
+
+                if len(self.buff) == self.wire_len:
+                    self.rec_crc = 0
+                    self.crc_bytes = 0
+                    state = FIND_CRC
+
+            elif state == FIND_CRC:
+                crc = self.ext_crc if self.is_extended else self.crc
+                rec_crc = self.rec_crc
+                take = min(crc.num_bytes - self.crc_bytes, end - i)
+
+                for byte in data[i:i + take]:
+                    rec_crc = (rec_crc << 8) | byte
+
+                self.rec_crc = rec_crc
+                self.crc_bytes += take
+                i += take
+
+                if self.crc_bytes == crc.num_bytes:
+                    if crc.calculate_bytes(self.buff) == rec_crc:
+                        state = FIND_END_BYTE
+                    else:
+                        state = self._error(out, CRC_ERROR)
+
+            else:
+                state = FIND_START_BYTE
+
+                if data[i] != STOP_BYTE:
+                    self._error(out, STOP_BYTE_ERROR)
+
+                elif self.is_extended:
+                    payload = unstuff_blocks(self.buff, self.pay_len)
+
+                    if payload is None:
+                        self._error(out, PAYLOAD_ERROR)
+                    else:
+                        self.frames += 1
+                        out.append(Frame(self.id_byte, bytes(payload), self.timestamp))
+
+                elif unstuff(self.buff, self.overhead_byte):
+                    self.frames += 1
+
+                    handle = None if self.pool is None else self.pool.fill(self.id_byte, self.buff, self.timestamp,
+                                                                           if_free=True)
+                    out.append(Frame(self.id_byte, bytes(self.buff) if handle is None else handle, self.timestamp))
+
+                else:
+                    self._error(out, PAYLOAD_ERROR)
+
+                i += 1
+
+        self.state = state
+        return out
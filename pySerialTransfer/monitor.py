@@ -0,0 +1,282 @@
+'''
+Live link monitor: packets/s and bytes/s per packet ID, link utilization,
+error rates, inter-arrival jitter and queue depths, refreshed in place,
+with optional hex or struct-decoded tailing of the received packets.
+
+usage: python -m pySerialTransfer.monitor PORT [--baud 115200] [--hex | --schema '<hf'] [--id N]
+
+Statistics are updated with a few integer operations per packet and the
+screen is only redrawn once per interval, so the monitor keeps up with a
+link running at full line rate.
+
+Inter-arrival gaps and jitter are computed from the links' rx_timestamp,
+which is taken once per port read (see SerialTransfer.available()). They
+measure when packets were read rather than when they arrived: packets that
+come in faster than the monitor polls share a timestamp, so their gaps read
+as 0 and the jitter reflects the polling pattern as much as the sender's.
+'''
+
+import argparse
+import math
+import struct
+import sys
+import time
+from collections import deque
+
+from .pySerialTransfer import SerialTransfer, Status
+
+
+ERRORS = (Status.CRC_ERROR, Status.PAYLOAD_ERROR, Status.STOP_BYTE_ERROR)
+
+# START, ID, overhead, length and STOP bytes around every payload
+FRAME_OVERHEAD = 5
+
+
+class IdStats:
+    __slots__ = ('packets', 'bytes', 'last_arrival', 'gaps', 'gap_mean', 'gap_m2')
+
+    def __init__(self):
+        self.packets      = 0
+        self.bytes        = 0
+        self.last_arrival = 0
+        self.gaps         = 0
+        self.gap_mean     = 0.0
+        self.gap_m2       = 0.0
+
+    def add(self, num_bytes, timestamp):
+        self.packets += 1
+        self.bytes += num_bytes
+
+        if self.last_arrival:
+            # Welford's running mean and variance of the inter-arrival time
+            gap = timestamp - self.last_arrival
+            self.gaps += 1
+            delta = gap - self.gap_mean
+            self.gap_mean += delta / self.gaps
+            self.gap_m2 += delta * (gap - self.gap_mean)
+
+        self.last_arrival = timestamp
+
+    @property
+    def jitter(self):
+        '''
+        Description:
+        ------------
+        Standard deviation of the inter-arrival time (of the read times, see
+        the module docstring)
+
+        :return: float - jitter in ns
+        '''
+
+        return math.sqrt(self.gap_m2 / (self.gaps - 1)) if self.gaps > 1 else 0.0
+
+
+class LinkMonitor:
+    def __init__(self, link, baud=None, tail=0, tail_format=None, tail_id=None, clock=time.monotonic):
+        '''
+        Description:
+        ------------
+        Collects statistics of the packets received by a link
+
+        :param link:        SerialTransfer - link to monitor
+        :param baud:        int            - line rate used for the
+                                             utilization figure
+        :param tail:        int            - number of received packets to
+                                             keep for tailing (0 to disable)
+        :param tail_format: str            - struct format to decode tailed
+                                             payloads with, hex if None
+        :param tail_id:     int            - only tail packets with this ID
+        :param clock:       callable       - time source (in s)
+        :return: void
+        '''
+
+        self.link        = link
+        self.baud        = baud
+        self.tail_format = struct.Struct(tail_format) if tail_format else None
+        self.tail_id     = tail_id
+        self.clock       = clock
+
+        self.ids    = {}
+        self.errors = {status: 0 for status in ERRORS}
+        self.tail   = deque(maxlen=tail) if tail else None
+        self.frame_overhead = FRAME_OVERHEAD + link.crc.num_bytes
+
+        self.wire_bytes = 0
+        self.started    = clock()
+        self.last       = {'time': self.started, 'packets': {}, 'bytes': {}, 'wire': 0, 'errors': dict(self.errors)}
+
+    def poll(self, max_packets=1024):
+        '''
+        Description:
+        ------------
+        Process every packet the link can parse without waiting
+
+        :param max_packets: int - return after this many packets so the
+                                  display can be refreshed
+
+        :return: int - number of packets received
+        '''
+
+        link = self.link
+        received = 0
+
+        while received < max_packets:
+            num_bytes = link.available()
+            status = link.status
+
+            if status == Status.NEW_DATA:
+                received += 1
+                stats = self.ids.get(link.id_byte)
+
+                if stats is None:
+                    stats = self.ids[link.id_byte] = IdStats()
+
+                stats.add(num_bytes, link.rx_timestamp)
+                self.wire_bytes += num_bytes + self.frame_overhead
+
+                if self.tail is not None and (self.tail_id is None or link.id_byte == self.tail_id):
+                    self.tail.append((link.rx_timestamp, link.id_byte, bytes(link.rx_buff[:num_bytes])))
+
+            elif status in ERRORS:
+                self.errors[status] += 1
+
+            else:
+                break
+
+        return received
+
+    def format_payload(self, payload):
+        if self.tail_format is not None:
+            try:
+                return ' '.join(str(val) for val in self.tail_format.unpack_from(payload))
+            except struct.error:
+                return '<{} bytes, expected {}>'.format(len(payload), self.tail_format.size)
+
+        return payload.hex(' ')
+
+    def queue_depths(self):
+        '''
+        Description:
+        ------------
+        Bytes waiting in the OS buffer, frames decoded but not yet consumed
+        and frames queued by a TX scheduler
+
+        :return: dict - queue name -> depth
+        '''
+
+        depths = {'rx bytes waiting': 0, 'rx frames queued': len(self.link.rx_events)}
+
+        try:
+            depths['rx bytes waiting'] = self.link.connection.in_waiting
+        except Exception:
+            pass
+
+        scheduler = self.link.tx_scheduler
+
+        if scheduler is not None:
+            for level, stats in enumerate(scheduler.stats):
+                depths['tx queue {}'.format(level)] = stats.depth
+
+        return depths
+
+    def render(self):
+        '''
+        Description:
+        ------------
+        Format the statistics since the previous render()
+
+        :return: str - report
+        '''
+
+        now = self.clock()
+        elapsed = max(now - self.last['time'], 1e-9)
+        packets = {packet_id: stats.packets for packet_id, stats in self.ids.items()}
+        num_bytes = {packet_id: stats.bytes for packet_id, stats in self.ids.items()}
+
+        lines = ['{:>4}{:>12}{:>12}{:>12}{:>14}{:>12}'.format('ID', 'packets/s', 'bytes/s', 'total', 'gap (ms)',
+                                                            'jitter (ms)')]
+
+        for packet_id in sorted(self.ids):
+            stats = self.ids[packet_id]
+            lines.append('{:>4}{:>12.1f}{:>12.0f}{:>12}{:>14.3f}{:>12.3f}'.format(
+                packet_id,
+                (packets[packet_id] - self.last['packets'].get(packet_id, 0)) / elapsed,
+                (num_bytes[packet_id] - self.last['bytes'].get(packet_id, 0)) / elapsed,
+                stats.packets,
+                stats.gap_mean / 1e6,
+                stats.jitter / 1e6))
+
+        wire_rate = (self.wire_bytes - self.last['wire']) / elapsed
+        lines.append('')
+
+        if self.baud:
+            lines.append('link: {:.0f} B/s on the wire, {:.1f}% of {} baud'.format(
+                wire_rate, wire_rate * 10 / self.baud * 100, self.baud))
+        else:
+            lines.append('link: {:.0f} B/s on the wire'.format(wire_rate))
+
+        lines.append('errors: ' + ', '.join('{} {} ({:.1f}/s)'.format(
+            status.name, count, (count - self.last['errors'][status]) / elapsed)
+            for status, count in self.errors.items()))
+        lines.append('queues: ' + ', '.join('{} {}'.format(name, depth)
+                                            for name, depth in self.queue_depths().items()))
+
+        rx_stats = getattr(self.link, 'rx_stats', None)
+
+        if rx_stats is not None:
+            lines.append('rx path: corrupt frames by cause {}, rx bytes high water {}, frames dropped {}{}'.format(
+                ', '.join('{} {}'.format(cause, count) for cause, count in rx_stats.errors.items()),
+                rx_stats.waiting_high_water, rx_stats.queue_dropped,
+                ', kernel overruns {} (uart) {} (tty)'.format(rx_stats.kernel.overrun, rx_stats.kernel.buf_overrun)
+                if rx_stats.kernel_counters else ''))
+
+        if self.tail is not None:
+            lines.append('')
+            lines.extend('{:>14.3f} [{:>3}] {}'.format(timestamp / 1e9, packet_id, self.format_payload(payload))
+                         for timestamp, packet_id, payload in self.tail)
+
+        self.last = {'time': now, 'packets': packets, 'bytes': num_bytes, 'wire': self.wire_bytes,
+                     'errors': dict(self.errors)}
+
+        return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pySerialTransfer.monitor',
+                                     description='Show live statistics of a SerialTransfer link')
+    parser.add_argument('port', help='serial port or transport URL')
+    parser.add_argument('--baud', type=int, default=115200, help='baud rate')
+    parser.add_argument('--crc-len', type=int, default=8, help='CRC width in bits')
+    parser.add_argument('--interval', type=float, default=1.0, help='refresh interval in s')
+    parser.add_argument('--hex', action='store_true', help='tail received payloads in hex')
+    parser.add_argument('--schema', default=None, help='tail received payloads decoded with this struct format')
+    parser.add_argument('--id', type=int, default=None, help='only tail packets with this ID')
+    parser.add_argument('--lines', type=int, default=10, help='number of tailed packets shown')
+    args = parser.parse_args(argv)
+
+    link = SerialTransfer(args.port, baud=args.baud, restrict_ports=False, debug=False, crc_len=args.crc_len)
+    tail = args.lines if (args.hex or args.schema) else 0
+    monitor = LinkMonitor(link, args.baud, tail, args.schema, args.id)
+
+    link.open()
+    link.enable_rx_stats()
+    next_refresh = time.monotonic() + args.interval
+
+    try:
+        while True:
+            if not monitor.poll():
+                time.sleep(0.0005)
+
+            if time.monotonic() >= next_refresh:
+                next_refresh += args.interval
+                sys.stdout.write('\x1b[H\x1b[2J{}  ({})\n\n{}\n'.format(args.port, time.strftime('%H:%M:%S'),
+                                                                     monitor.render()))
+                sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        link.close()
+
+
+if __name__ == '__main__':
+    main()
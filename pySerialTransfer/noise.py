@@ -0,0 +1,298 @@
+'''
+Noisy channel simulation for measuring how the frame parser copes with
+corruption. NoisyChannel wraps any connection with the pySerial API used
+by SerialTransfer and injects bit flips, dropped and inserted bytes,
+spurious START/STOP bytes, burst errors and latency jitter - all drawn
+from a seeded random generator, so every run of a scenario sees exactly
+the same errors.
+
+run_scenario() streams numbered, pseudo-random payloads through a
+NoisyChannel into a SerialTransfer and reports goodput, packet loss,
+false accepts (frames that passed the CRC but don't match any payload
+that was sent) and the CPU time spent parsing.
+
+usage: python -m pySerialTransfer.noise [--packets N] [--payload-len N] [--crc-len N]
+'''
+
+import argparse
+import random
+import struct
+import time
+from collections import deque, namedtuple
+
+from .framing import FrameEncoder, START_BYTE, STOP_BYTE
+from .pySerialTransfer import SerialTransfer, Status
+
+
+SEQ = struct.Struct('<I')
+
+ScenarioResult = namedtuple('ScenarioResult', ['name', 'sent', 'received', 'lost', 'false_accepts',
+                                               'loss_rate', 'false_accept_rate', 'goodput', 'parser_cpu'])
+
+SCENARIOS = {'clean':          {},
+             'ber 1e-5':       {'bit_error_rate': 1e-5},
+             'ber 1e-4':       {'bit_error_rate': 1e-4},
+             'ber 1e-3':       {'bit_error_rate': 1e-3},
+             'drops 1e-3':     {'drop_rate': 1e-3},
+             'inserts 1e-3':   {'insert_rate': 1e-3},
+             'spurious 1e-3':  {'spurious_rate': 1e-3},
+             'bursts 1e-4':    {'burst_rate': 1e-4, 'burst_len': 16},
+             'jitter 5ms':     {'latency': 0.002, 'jitter': 0.005},
+             'mixed':          {'bit_error_rate': 1e-4, 'drop_rate': 1e-4, 'insert_rate': 1e-4,
+                                'spurious_rate': 1e-4, 'burst_rate': 1e-5, 'jitter': 0.002}}
+
+
+class NoisyChannel:
+    def __init__(self, connection, seed=None, bit_error_rate=0.0, drop_rate=0.0, insert_rate=0.0,
+                 spurious_rate=0.0, burst_rate=0.0, burst_len=8, latency=0.0, jitter=0.0,
+                 corrupt_writes=False, clock=time.monotonic):
+        '''
+        Description:
+        ------------
+        Connection wrapper that corrupts the received byte stream (and
+        optionally the written one). All rates are probabilities per byte,
+        except bit_error_rate which is per bit
+
+        :param connection:     Serial   - connection to wrap
+        :param seed:           int      - seed of the error generator
+        :param bit_error_rate: float    - probability of a bit being flipped
+        :param drop_rate:      float    - probability of a byte being lost
+        :param insert_rate:    float    - probability of a random byte being
+                                          inserted after a byte
+        :param spurious_rate:  float    - probability of a START_BYTE or
+                                          STOP_BYTE being inserted after a
+                                          byte
+        :param burst_rate:     float    - probability of a burst error
+                                          starting at a byte
+        :param burst_len:      int      - maximum number of consecutive bytes
+                                          garbled by a burst
+        :param latency:        float    - fixed delay (in s) before received
+                                          bytes become readable
+        :param jitter:         float    - maximum random extra delay (in s),
+                                          bytes are never reordered
+        :param corrupt_writes: bool     - also corrupt written bytes
+        :param clock:          callable - time source (in s) for latency
+        :return: void
+        '''
+
+        self.connection      = connection
+        self.random          = random.Random(seed)
+        self.byte_error_rate = 1 - (1 - bit_error_rate) ** 8
+        self.drop_rate       = drop_rate
+        self.insert_rate     = insert_rate
+        self.spurious_rate   = spurious_rate
+        self.burst_rate      = burst_rate
+        self.burst_len       = burst_len
+        self.latency         = latency
+        self.jitter          = jitter
+        self.corrupt_writes  = corrupt_writes
+        self.clock           = clock
+
+        self.delayed      = deque()
+        self.ready        = bytearray()
+        self.last_release = 0
+        self.burst_left   = 0
+
+        self.bytes_in   = 0
+        self.flipped    = 0
+        self.dropped    = 0
+        self.inserted   = 0
+        self.spurious   = 0
+        self.bursts     = 0
+        self.noise_time = 0.0
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def corrupt(self, data):
+        '''
+        Description:
+        ------------
+        Apply the configured errors to a chunk of bytes
+
+        :param data: bytes - clean bytes
+
+        :return: bytearray - corrupted bytes
+        '''
+
+        start = time.process_time()
+        rand = self.random.random
+        randrange = self.random.randrange
+        out = bytearray()
+
+        for byte in data:
+            if self.burst_left:
+                byte ^= randrange(1, 256)
+                self.burst_left -= 1
+
+            elif self.burst_rate and rand() < self.burst_rate:
+                self.bursts += 1
+                self.burst_left = randrange(self.burst_len)
+                byte ^= randrange(1, 256)
+
+            if self.drop_rate and rand() < self.drop_rate:
+                self.dropped += 1
+                continue
+
+            if self.byte_error_rate and rand() < self.byte_error_rate:
+                self.flipped += 1
+                byte ^= 1 << randrange(8)
+
+            out.append(byte)
+
+            if self.insert_rate and rand() < self.insert_rate:
+                self.inserted += 1
+                out.append(randrange(256))
+
+            if self.spurious_rate and rand() < self.spurious_rate:
+                self.spurious += 1
+                out.append(START_BYTE if rand() < 0.5 else STOP_BYTE)
+
+        self.bytes_in += len(data)
+        self.noise_time += time.process_time() - start
+        return out
+
+    @property
+    def in_waiting(self):
+        waiting = self.connection.in_waiting
+
+        if waiting:
+            data = self.corrupt(self.connection.read(waiting))
+
+            if self.latency or self.jitter:
+                release = self.clock() + self.latency + self.random.uniform(0, self.jitter)
+                self.last_release = max(release, self.last_release)
+                self.delayed.append((self.last_release, data))
+            else:
+                self.ready += data
+
+        if self.delayed:
+            now = self.clock()
+
+            while self.delayed and self.delayed[0][0] <= now:
+                self.ready += self.delayed.popleft()[1]
+
+        return len(self.ready)
+
+    def read(self, size=1):
+        data = bytes(self.ready[:size])
+        del self.ready[:size]
+        return data
+
+    def write(self, data):
+        if self.corrupt_writes:
+            data = self.corrupt(data)
+        return self.connection.write(data)
+
+
+def make_payload(seed, seq, payload_len):
+    rand = random.Random(seed * 1000003 + seq)
+    return SEQ.pack(seq) + rand.randbytes(payload_len - SEQ.size)
+
+
+def run_scenario(name='', packets=1000, payload_len=64, crc_len=8, baud=115200, seed=0, packet_id=1, **noise):
+    '''
+    Description:
+    ------------
+    Stream numbered payloads through a NoisyChannel into a SerialTransfer
+    and check every packet it accepts. Time on the simulated link advances
+    with the number of bytes sent at the given baud rate
+
+    :param name:        str   - label of the scenario
+    :param packets:     int   - number of packets to send
+    :param payload_len: int   - bytes per payload (at least 4)
+    :param crc_len:     int   - CRC width of the link
+    :param baud:        int   - simulated baud rate (10 bits per byte)
+    :param seed:        int   - seed of payloads and errors
+    :param packet_id:   int   - ID of the packets
+    :param noise:       dict  - keyword arguments for NoisyChannel
+
+    :return: ScenarioResult - name, sent, received (intact packets), lost,
+                              false_accepts, loss_rate, false_accept_rate
+                              (per accepted frame), goodput (intact payload
+                              bytes per second of link time) and parser_cpu
+                              (CPU seconds spent in available(), excluding
+                              the noise generator)
+    '''
+
+    from .emulator import pipe
+
+    now = [0.0]
+    host_end, device_end = pipe()
+    channel = NoisyChannel(host_end, seed=seed, clock=lambda: now[0], **noise)
+
+    link = SerialTransfer('pipe', restrict_ports=False, crc_len=crc_len, debug=False)
+    link.connection = channel
+    encoder = FrameEncoder(crc_len)
+
+    seen = set()
+    false_accepts = 0
+    parser_cpu = 0.0
+
+    def drain():
+        nonlocal false_accepts
+
+        while True:
+            link.available()
+
+            if link.status == Status.NEW_DATA:
+                payload = bytes(link.rx_buff[:link.bytes_read])
+                seq = SEQ.unpack_from(payload)[0] if len(payload) >= SEQ.size else -1
+
+                if (link.id_byte == packet_id and 0 <= seq < packets and seq not in seen
+                        and payload == make_payload(seed, seq, payload_len)):
+                    seen.add(seq)
+                else:
+                    false_accepts += 1
+
+            elif link.status in (Status.NO_DATA, Status.CONTINUE):
+                return
+
+    for seq in range(packets):
+        frame = encoder.encode(make_payload(seed, seq, payload_len), packet_id)
+        device_end.write(frame)
+        now[0] += len(frame) * 10 / baud
+
+        start = time.process_time()
+        drain()
+        parser_cpu += time.process_time() - start
+
+    now[0] += noise.get('latency', 0) + noise.get('jitter', 0)
+
+    start = time.process_time()
+    drain()
+    parser_cpu += time.process_time() - start
+
+    received = len(seen)
+    accepted = received + false_accepts
+
+    return ScenarioResult(name, packets, received, packets - received, false_accepts,
+                          (packets - received) / packets,
+                          false_accepts / accepted if accepted else 0.0,
+                          received * payload_len / now[0],
+                          max(parser_cpu - channel.noise_time, 0.0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pySerialTransfer.noise',
+                                     description='Measure frame parsing under simulated line noise')
+    parser.add_argument('--packets', type=int, default=2000, help='packets per scenario')
+    parser.add_argument('--payload-len', type=int, default=64, help='bytes per payload')
+    parser.add_argument('--crc-len', type=int, default=8, help='CRC width in bits')
+    parser.add_argument('--baud', type=int, default=115200, help='simulated baud rate')
+    parser.add_argument('--seed', type=int, default=0, help='seed of payloads and errors')
+    args = parser.parse_args(argv)
+
+    print('{:<16}{:>8}{:>10}{:>8}{:>14}{:>16}{:>14}'.format(
+        'scenario', 'lost', 'loss %', 'false', 'false acc %', 'goodput (B/s)', 'cpu (us/pkt)'))
+
+    for name, noise in SCENARIOS.items():
+        result = run_scenario(name, args.packets, args.payload_len, args.crc_len, args.baud, args.seed, **noise)
+
+        print('{:<16}{:>8}{:>10.2f}{:>8}{:>14.3f}{:>16.0f}{:>14.1f}'.format(
+            name, result.lost, result.loss_rate * 100, result.false_accepts, result.false_accept_rate * 100,
+            result.goodput, result.parser_cpu / args.packets * 1e6))
+
+
+if __name__ == '__main__':
+    main()
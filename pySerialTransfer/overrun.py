@@ -0,0 +1,273 @@
+'''
+Receive-side overrun detection and drop accounting. Lost bytes only show
+up in available() as a later CRC_ERROR, PAYLOAD_ERROR or STOP_BYTE_ERROR,
+which looks just like line noise. RxStats tells the two apart by:
+
+    - reading the kernel's serial error counters (TIOCGICOUNT on Linux:
+      UART overruns, tty buffer overruns, framing and parity errors, breaks)
+      whenever a corrupt frame is found
+    - tracking the bytes waiting in the OS buffer, so a corrupt frame in
+      the data of a read that found the buffer full (or of the read after
+      it) is blamed on an overrun even where the driver keeps no counters
+      (most USB adapters)
+    - bounding the queue of frames decoded by available() but not yet
+      returned: reads are limited so they can't decode more frames than
+      the queue holds, leaving the backlog in the OS buffer. Once that
+      buffer fills up (the application has fallen behind and the kernel
+      is about to lose bytes mid-frame), an explicit policy decides
+      whether to drop whole frames or to keep waiting. The records of a
+      container are queued together when it is decoded, so outside of a
+      backlog a single container can take the queue past max_queue by up
+      to its number of records minus one (see queue_high_water)
+
+Enable it with SerialTransfer.enable_rx_stats().
+'''
+
+import struct
+import sys
+from collections import namedtuple
+
+from .buffer_pool import PacketHandle
+
+
+POLICY_DROP_OLDEST = 'drop-oldest'
+POLICY_DROP_NEWEST = 'drop-newest'
+POLICY_BLOCK       = 'block'
+
+CAUSE_OVERRUN = 'overrun'
+CAUSE_LINE    = 'line'
+CAUSE_UNKNOWN = 'unknown'
+
+# Size of the Linux N_TTY read buffer
+DEFAULT_OS_BUFFER_SIZE = 4096
+
+TIOCGICOUNT = 0x545D
+ICOUNT      = struct.Struct('20i')  # struct serial_icounter_struct
+
+SerialCounters = namedtuple('SerialCounters', ['rx', 'tx', 'frame', 'overrun', 'parity', 'brk', 'buf_overrun'])
+
+
+class InvalidPolicy(Exception):
+    pass
+
+
+def read_serial_counters(connection):
+    '''
+    Description:
+    ------------
+    Read the kernel's error counters of a serial port
+
+    :param connection: Serial - open port
+
+    :return: SerialCounters - counters since the port was opened, None if
+                              the platform, port or driver doesn't provide
+                              them
+    '''
+
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        import fcntl
+
+        data = fcntl.ioctl(connection.fileno(), TIOCGICOUNT, bytes(ICOUNT.size))
+    except (AttributeError, OSError, ValueError, TypeError):
+        return None
+
+    return SerialCounters(*ICOUNT.unpack(data)[4:11])
+
+
+class RxStats:
+    def __init__(self, connection=None, max_queue=None, policy=POLICY_DROP_OLDEST,
+                 os_buffer_size=DEFAULT_OS_BUFFER_SIZE, read_counters=read_serial_counters):
+        '''
+        Description:
+        ------------
+        Overrun and drop counters of a link's receive path
+
+        :param connection:     Serial   - port to read kernel counters of
+        :param max_queue:      int      - maximum number of decoded frames
+                                          waiting to be returned by
+                                          available(), None for no limit
+                                          (the records of one container
+                                          may exceed it unless they came
+                                          from a full OS buffer)
+        :param policy:         str      - what to do when the OS buffer is
+                                          full: POLICY_DROP_OLDEST or
+                                          POLICY_DROP_NEWEST read all of it
+                                          and drop the frames that don't fit
+                                          in the queue, POLICY_BLOCK leaves
+                                          the bytes waiting (for hardware
+                                          flow control)
+        :param os_buffer_size: int      - size of the OS receive buffer, a
+                                          corrupt frame soon after this many
+                                          bytes were waiting counts as an
+                                          overrun
+        :param read_counters:  callable - reads the kernel counters of the
+                                          connection
+        :return: void
+        '''
+
+        if policy not in (POLICY_DROP_OLDEST, POLICY_DROP_NEWEST, POLICY_BLOCK):
+            raise InvalidPolicy('Unknown queue policy "{}"'.format(policy))
+
+        self.connection     = connection
+        self.max_queue      = max_queue
+        self.policy         = policy
+        self.os_buffer_size = os_buffer_size
+        self.read_counters  = read_counters
+
+        self.kernel   = SerialCounters(0, 0, 0, 0, 0, 0, 0)
+        self.baseline = None
+        self.latest   = None
+
+        self.waiting_high_water = 0
+        self.full_reads         = 0
+        self.reads_since_full   = None
+        self.queue_high_water   = 0
+        self.queue_dropped      = 0
+        self.queue_blocked      = 0
+        self.backlog            = False  # the last read emptied a full OS buffer
+        self.errors     = {CAUSE_OVERRUN: 0, CAUSE_LINE: 0, CAUSE_UNKNOWN: 0}
+        self.last_cause = None
+
+        self.update_counters()
+
+    @property
+    def kernel_counters(self):
+        '''
+        Description:
+        ------------
+        Whether the port provides kernel error counters
+
+        :return: bool - True if TIOCGICOUNT works on the port
+        '''
+
+        return self.baseline is not None
+
+    def update_counters(self):
+        '''
+        Description:
+        ------------
+        Read the kernel error counters and update self.kernel (counts since
+        the stats were created)
+
+        :return: SerialCounters - increase since the previous update, None if
+                                  the port has no kernel counters
+        '''
+
+        counters = self.read_counters(self.connection) if self.connection is not None else None
+
+        if counters is None:
+            return None
+
+        if self.baseline is None:
+            self.baseline = self.latest = counters
+
+        delta = SerialCounters(*(new - old for new, old in zip(counters, self.latest)))
+        self.latest = counters
+        self.kernel = SerialCounters(*(new - old for new, old in zip(counters, self.baseline)))
+        return delta
+
+    def note_waiting(self, waiting):
+        # Called for every read with the number of bytes the OS had buffered
+        if waiting > self.waiting_high_water:
+            self.waiting_high_water = waiting
+
+        if waiting >= self.os_buffer_size:
+            self.full_reads += 1
+            self.reads_since_full = 0
+        elif self.reads_since_full is not None:
+            self.reads_since_full += 1
+
+    def read_size(self, waiting, min_frame):
+        '''
+        Description:
+        ------------
+        Number of bytes available() may read without the decoded frames
+        overflowing the queue - everything if the OS buffer is full and the
+        policy drops frames
+
+        :param waiting:   int - bytes waiting in the OS buffer
+        :param min_frame: int - size of the smallest possible frame
+
+        :return: int - bytes to read
+        '''
+
+        self.backlog = False
+
+        if self.max_queue is None:
+            return waiting
+
+        if self.policy != POLICY_BLOCK and waiting >= self.os_buffer_size:
+            self.backlog = True
+            return waiting
+
+        limit = max(self.max_queue, 1) * min_frame
+
+        if waiting > limit:
+            self.queue_blocked += 1
+            return limit
+        return waiting
+
+    def enqueue(self, queue, frames, front=False):
+        '''
+        Description:
+        ------------
+        Add decoded frames to the queue, dropping frames beyond max_queue
+        if they came from a read of a full OS buffer
+
+        :param queue:  deque - frames waiting to be returned by available()
+        :param frames: list  - frames to add
+        :param front:  bool  - add the frames before the queued ones (the
+                               records of a container)
+
+        :return: void
+        '''
+
+        if front:
+            queue.extendleft(reversed(frames))
+        else:
+            queue.extend(frames)
+
+        if self.backlog and len(queue) > self.max_queue:
+            excess = len(queue) - self.max_queue
+            self.queue_dropped += excess
+
+            for _ in range(excess):
+                frame = queue.popleft() if self.policy == POLICY_DROP_OLDEST else queue.pop()
+
+                if type(getattr(frame, 'payload', None)) is PacketHandle:
+                    frame.payload.release()
+
+        if len(queue) > self.queue_high_water:
+            self.queue_high_water = len(queue)
+
+    def classify_error(self):
+        '''
+        Description:
+        ------------
+        Attribute a corrupt frame to an overrun, a line error (framing,
+        parity, break) or an unknown cause (usually noise the UART didn't
+        flag), and count it in self.errors
+
+        :return: str - CAUSE_OVERRUN, CAUSE_LINE or CAUSE_UNKNOWN
+        '''
+
+        delta = self.update_counters()
+
+        if delta is not None and (delta.overrun or delta.buf_overrun):
+            cause = CAUSE_OVERRUN
+        elif delta is not None and (delta.frame or delta.parity or delta.brk):
+            cause = CAUSE_LINE
+        elif self.reads_since_full is not None and self.reads_since_full <= 1:
+            # Bytes arriving while the buffer was full were lost at the end
+            # of that read's data, so the damaged frame completes in the
+            # same read or the next one
+            cause = CAUSE_OVERRUN
+        else:
+            cause = CAUSE_UNKNOWN
+
+        self.errors[cause] += 1
+        self.last_cause = cause
+        return cause
@@ -0,0 +1,215 @@
+'''
+Composable stages for processing packet batches, e.g.
+
+    from pySerialTransfer import pipeline as pl
+
+    pl.pipe(link.packet_batches(),
+            pl.filter_ids({1, 2}),
+            pl.decode('<hf', names=('count', 'temp')),
+            pl.window(10),
+            pl.sink(print))
+
+Every stage is created by a factory and is a callable that takes an
+iterable of batches (lists) and returns a generator of batches, so work
+is done lazily, one batch at a time, and per-item overhead stays inside
+list comprehensions.
+
+Empty batches are heartbeats: link.packet_batches(idle_batches=True)
+yields one each time it finds no data, filter_ids(), decode() and
+map_items() pass them on, aggregate() uses them to close time windows on a
+quiet link and sink() ignores them.
+'''
+
+import struct
+import time
+
+
+def pipe(source, *stages):
+    '''
+    Description:
+    ------------
+    Chain stages onto a source of batches
+
+    :param source: iterable - batches of items (e.g. link.packet_batches())
+    :param stages: callable - stages created by the factories in this module
+
+    :return: n/a - output of the last stage (a generator of batches, or the
+                   result of a sink)
+    '''
+
+    for stage in stages:
+        source = stage(source)
+    return source
+
+
+def filter_ids(ids):
+    '''
+    Description:
+    ------------
+    Keep only packets whose ID is in ids
+
+    :param ids: iterable - packet IDs to keep
+
+    :return: callable - pipeline stage
+    '''
+
+    ids = frozenset(ids)
+
+    def stage(batches):
+        for batch in batches:
+            kept = [packet for packet in batch if packet.id in ids]
+
+            if kept or not batch:
+                yield kept
+
+    return stage
+
+
+def decode(fmt, names=None):
+    '''
+    Description:
+    ------------
+    Unpack each packet's payload with a struct format. Packets whose payload
+    is shorter than the format are dropped and counted in the stage's
+    rejected attribute instead of ending the pipeline with struct.error
+
+    :param fmt:   str      - struct format as defined by
+                             https://docs.python.org/3/library/struct.html#format-strings
+    :param names: iterable - field names, if given each item becomes a dict
+                             instead of a tuple
+
+    :return: callable - pipeline stage
+    '''
+
+    packer = struct.Struct(fmt)
+    unpack_from = packer.unpack_from
+    size = packer.size
+
+    def stage(batches):
+        for batch in batches:
+            valid = [packet for packet in batch if len(packet.payload) >= size]
+
+            if len(valid) != len(batch):
+                stage.rejected += len(batch) - len(valid)
+
+                if not valid:
+                    continue
+
+            if names is None:
+                yield [unpack_from(packet.payload) for packet in valid]
+            else:
+                yield [dict(zip(names, unpack_from(packet.payload))) for packet in valid]
+
+    stage.rejected = 0
+    return stage
+
+
+def map_items(func):
+    '''
+    Description:
+    ------------
+    Apply a function to every item
+
+    :param func: callable - function of one item
+
+    :return: callable - pipeline stage
+    '''
+
+    def stage(batches):
+        for batch in batches:
+            yield [func(item) for item in batch]
+
+    return stage
+
+
+def window(size):
+    '''
+    Description:
+    ------------
+    Regroup items into batches of exactly size items (any incomplete
+    batch is yielded when the input ends)
+
+    :param size: int - number of items per output batch
+
+    :return: callable - pipeline stage
+    '''
+
+    def stage(batches):
+        pending = []
+
+        for batch in batches:
+            pending.extend(batch)
+
+            while len(pending) >= size:
+                yield pending[:size]
+                del pending[:size]
+
+        if pending:
+            yield pending
+
+    return stage
+
+
+def aggregate(interval, func=list, clock=time.monotonic):
+    '''
+    Description:
+    ------------
+    Collect the items arriving during each time window and reduce them to a
+    single result. A window is closed by the first batch that arrives after
+    it ends, so feed the stage heartbeats (empty batches, see
+    link.packet_batches(idle_batches=True)) to have the last window emitted
+    while the link is quiet; windows without items produce no result
+
+    :param interval: float    - window length (in s)
+    :param func:     callable - reduces the list of items in a window (e.g.
+                                len, or a mean over a field)
+    :param clock:    callable - time source
+
+    :return: callable - pipeline stage yielding one result per batch
+    '''
+
+    def stage(batches):
+        pending = []
+        window_end = None
+
+        for batch in batches:
+            now = clock()
+
+            if window_end is not None and now >= window_end:
+                yield [func(pending)]
+                pending = []
+                window_end = None
+
+            if batch:
+                if window_end is None:
+                    window_end = now + interval
+
+                pending.extend(batch)
+
+        if pending:
+            yield [func(pending)]
+
+    return stage
+
+
+def sink(func):
+    '''
+    Description:
+    ------------
+    Terminal stage - run the pipeline, handing every batch to func
+
+    :param func: callable - called with each batch
+
+    :return: callable - pipeline stage returning the number of items consumed
+    '''
+
+    def stage(batches):
+        count = 0
+
+        for batch in batches:
+            if batch:
+                func(batch)
+                count += len(batch)
+        return count
+
+    return stage
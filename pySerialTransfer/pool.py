@@ -0,0 +1,322 @@
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from .pySerialTransfer import SerialTransfer, MAX_PACKET_SIZE
+
+
+PoolPacket = namedtuple('PoolPacket', ['port', 'id', 'payload', 'timestamp'])
+
+CMD_SEND = 'send'
+CMD_STOP = 'stop'
+
+MSG_PACKETS = 'packets'
+MSG_ERROR   = 'error'  # (MSG_ERROR, port, error, whether the port was closed)
+
+
+class UnknownPort(Exception):
+    pass
+
+
+def _close_link(link):
+    try:
+        link.close()
+    except Exception:
+        pass
+
+
+def _worker_main(conn, ports, link_factory, link_kwargs, batch_size, batch_interval, idle_sleep):
+    # Errors are contained per port: they are reported to the parent as
+    # MSG_ERROR and a port that can't be read is closed, while the worker's
+    # other ports carry on
+    links = {}
+
+    for port in ports:
+        try:
+            link = link_factory(port, **link_kwargs)
+            link.open()
+            links[port] = link
+        except Exception as e:
+            conn.send((MSG_ERROR, port, repr(e), True))
+
+    batch      = []
+    last_flush = time.monotonic()
+
+    try:
+        while True:
+            while conn.poll():
+                cmd = conn.recv()
+
+                if cmd[0] == CMD_STOP:
+                    return
+
+                if cmd[0] == CMD_SEND:
+                    _, port, packet_id, payload = cmd
+                    link = links.get(port)
+
+                    if link is None:
+                        conn.send((MSG_ERROR, port, 'Port is not open', True))
+                        continue
+
+                    try:
+                        if not link.send(link.tx_struct_obj(payload[:MAX_PACKET_SIZE]), packet_id):
+                            conn.send((MSG_ERROR, port, 'Send failed', False))
+                    except Exception as e:
+                        conn.send((MSG_ERROR, port, repr(e), False))
+
+            got_data = False
+
+            for port, link in list(links.items()):
+                try:
+                    # Drain each port before moving on to the next, unless
+                    # the batch fills up first
+                    while len(batch) < batch_size and link.available():
+                        got_data = True
+                        batch.append((port, link.id_byte, bytes(link.rx_buff[:link.bytes_read]),
+                                      getattr(link, 'rx_timestamp', 0) or time.monotonic_ns()))
+                except Exception as e:
+                    del links[port]
+                    _close_link(link)
+                    conn.send((MSG_ERROR, port, repr(e), True))
+
+                if len(batch) >= batch_size:
+                    conn.send((MSG_PACKETS, batch))
+                    batch      = []
+                    last_flush = time.monotonic()
+
+            now = time.monotonic()
+
+            if batch and now - last_flush >= batch_interval:
+                conn.send((MSG_PACKETS, batch))
+                batch      = []
+                last_flush = now
+
+            if not got_data:
+                time.sleep(idle_sleep)
+
+    except (EOFError, BrokenPipeError, KeyboardInterrupt):
+        pass
+
+    finally:
+        for link in links.values():
+            _close_link(link)
+
+
+def _send_commands(conn, commands):
+    # Commands are written by a thread of their own so that LinkPool.send()
+    # never blocks: a worker stuck writing a batch to a full pipe doesn't
+    # read commands until the parent polls again
+    while True:
+        cmd = commands.get()
+
+        try:
+            conn.send(cmd)
+        except (BrokenPipeError, OSError):
+            return
+
+        if cmd[0] == CMD_STOP:
+            return
+
+
+class LinkPool:
+    def __init__(self, ports, workers=None, link_factory=SerialTransfer, batch_size=64, batch_interval=0.005,
+                 idle_sleep=0.0005, mp_context=None, **link_kwargs):
+        '''
+        Description:
+        ------------
+        Spread the receive/parse loops of many ports across worker processes
+        so parsing isn't limited by a single interpreter's GIL. Each worker
+        owns its ports outright and hands decoded packets back in batches
+        over a pipe. A worker whose pipe is full because poll() isn't called
+        stops reading its ports (and sending) until poll() drains the pipe
+
+        :param ports:          list     - ports to open
+        :param workers:        int      - number of worker processes
+                                          (default: one per CPU, at most one
+                                          per port)
+        :param link_factory:   callable - called in the worker as
+                                          link_factory(port, **link_kwargs) to
+                                          create each link (must be picklable)
+        :param batch_size:     int      - maximum number of packets per batch
+        :param batch_interval: float    - maximum time (in s) a packet waits in
+                                          a worker for its batch to fill
+        :param idle_sleep:     float    - time (in s) a worker sleeps when
+                                          none of its ports had data
+        :param mp_context:     str      - multiprocessing start method (None
+                                          for the platform default)
+        :param link_kwargs:    n/a      - keyword arguments for link_factory
+
+        :return: void
+        '''
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        self.ports   = list(ports)
+        self.workers = max(1, min(workers, len(self.ports)))
+        self.ctx     = multiprocessing.get_context(mp_context)
+
+        self.link_factory   = link_factory
+        self.link_kwargs    = link_kwargs
+        self.batch_size     = batch_size
+        self.batch_interval = batch_interval
+        self.idle_sleep     = idle_sleep
+
+        self.assignment = {port: i % self.workers for i, port in enumerate(self.ports)}
+        self.conns      = []
+        self.procs      = []
+        self.commands   = []
+        self.senders    = []
+        self.dead       = set()
+        self.failed     = set()
+        self.errors     = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        '''
+        Description:
+        ------------
+        Start the worker processes
+
+        :return: void
+        '''
+
+        for worker in range(self.workers):
+            ports = [port for port, w in self.assignment.items() if w == worker]
+            parent_conn, child_conn = self.ctx.Pipe()
+            proc = self.ctx.Process(target=_worker_main,
+                                    args=(child_conn, ports, self.link_factory, self.link_kwargs,
+                                          self.batch_size, self.batch_interval, self.idle_sleep),
+                                    name='LinkPool-{}'.format(worker),
+                                    daemon=True)
+            proc.start()
+            child_conn.close()
+
+            commands = queue.Queue()
+            sender = threading.Thread(target=_send_commands, args=(parent_conn, commands),
+                                      name='LinkPool-{}-send'.format(worker), daemon=True)
+            sender.start()
+
+            self.conns.append(parent_conn)
+            self.procs.append(proc)
+            self.commands.append(commands)
+            self.senders.append(sender)
+
+    def stop(self, timeout=5):
+        '''
+        Description:
+        ------------
+        Stop the worker processes (their ports are closed). Packets that
+        weren't collected with poll() yet are discarded
+
+        :param timeout: float - time (in s) to wait for each worker to exit
+
+        :return: void
+        '''
+
+        for commands in self.commands:
+            commands.put((CMD_STOP,))
+
+        for proc, conn in zip(self.procs, self.conns):
+            deadline = time.monotonic() + timeout
+
+            # Keep reading so a worker blocked on a full pipe gets to the
+            # stop command
+            while proc.is_alive() and time.monotonic() < deadline:
+                try:
+                    if conn.poll(0.05):
+                        conn.recv()
+                except (EOFError, OSError):
+                    proc.join(max(deadline - time.monotonic(), 0))
+
+            if proc.is_alive():
+                proc.terminate()
+            proc.join()
+
+        for sender in self.senders:
+            sender.join(timeout)
+
+        for conn in self.conns:
+            conn.close()
+
+        self.conns    = []
+        self.procs    = []
+        self.commands = []
+        self.senders  = []
+        self.dead     = set()
+        self.failed   = set()
+
+    def send(self, port, payload, packet_id=0):
+        '''
+        Description:
+        ------------
+        Send a packet on one of the pool's ports (routed to the worker that
+        owns the port)
+
+        :param port:      str        - port to send on
+        :param payload:   bytes-like - packet payload
+        :param packet_id: int        - ID of the packet
+
+        :return: void
+        :raises UnknownPort: if the port isn't part of the pool, or its worker
+                             reported (see poll()) that it closed the port
+        '''
+
+        if port not in self.assignment:
+            raise UnknownPort('{} is not part of this pool'.format(port))
+
+        if port in self.failed:
+            raise UnknownPort('{} was closed after an error'.format(port))
+
+        self.commands[self.assignment[port]].put((CMD_SEND, port, packet_id, bytes(payload)))
+
+    def poll(self, timeout=0):
+        '''
+        Description:
+        ------------
+        Collect the packets the workers decoded since the last call. Errors
+        reported by the workers are logged and appended to self.errors as
+        (port, error) tuples, and ports the workers closed (failed to open
+        or read) are added to self.failed
+
+        :param timeout: float - maximum time (in s) to wait for the first
+                                batch, None to block
+
+        :return: list - PoolPacket tuples (port, id, payload, timestamp in
+                        time.monotonic_ns() units)
+        '''
+
+        packets = []
+
+        live = [conn for conn in self.conns if conn not in self.dead]
+
+        for conn in multiprocessing.connection.wait(live, timeout):
+            while True:
+                try:
+                    if not conn.poll():
+                        break
+                    msg = conn.recv()
+                except EOFError:
+                    self.dead.add(conn)
+                    break
+
+                if msg[0] == MSG_PACKETS:
+                    packets.extend(PoolPacket._make(p) for p in msg[1])
+                elif msg[0] == MSG_ERROR:
+                    logging.error('Error on {}: {}'.format(msg[1], msg[2]))
+                    self.errors.append(msg[1:3])
+
+                    if msg[3]:
+                        self.failed.add(msg[1])
+        return packets
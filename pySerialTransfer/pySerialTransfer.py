@@ -2,6 +2,9 @@ import logging
 import os
 import json
 import struct
+import threading
+import time
+from collections import namedtuple, OrderedDict, deque
 from enum import Enum
 from typing import Union
 
@@ -9,6 +12,15 @@ import serial
 import serial.tools.list_ports
 from array import array
 from .CRC import CRC
+from . import binpack
+from .buffer_pool import POLICY_DROP, PacketHandle, PacketPool
+from .compression import PayloadCompressor
+from .container import CONTAINER_ID, MAX_RECORD, ContainerWriter, InvalidContainer, unpack_records
+from .decode_cache import DecodeCache
+from .overrun import POLICY_DROP_OLDEST, DEFAULT_OS_BUFFER_SIZE, RxStats
+from .transports import is_url, transport_for_url
+from .framing import (START_BYTE, STOP_BYTE, MAX_PACKET_SIZE, EXT_LEN_MARKER, MAX_EXT_PACKET_SIZE,
+                      Frame, FrameEncoder, FrameDecoder, FrameError, stuff, unstuff)
 
 
 class InvalidSerialPort(Exception):
@@ -28,17 +40,14 @@ class Status(Enum):
     STOP_BYTE_ERROR = -2
 
 
-START_BYTE = 0x7E
-STOP_BYTE  = 0x81
-
-MAX_PACKET_SIZE = 0xFE
-
 BYTE_FORMATS = {'native':          '@',
                 'native_standard': '=',
                 'little-endian':   '<',
                 'big-endian':      '>',
                 'network':         '!'}
 
+OBJ_CODECS = ['json', 'binary']
+
 STRUCT_FORMAT_LENGTHS = {'c': 1,
                          'b': 1,
                          'B': 1,
@@ -69,6 +78,12 @@ ARRAY_FORMAT_LENGTHS = {'b': 1,
                         'd': 8}
 
 
+# Frame encoded ahead of time by SerialTransfer.prepare_frame()
+PreparedFrame = namedtuple('PreparedFrame', ['id', 'payload', 'frame'])
+
+Packet = namedtuple('Packet', ['id', 'payload', 'timestamp'], defaults=[0])
+
+
 class State(Enum):
     FIND_START_BYTE    = 0
     FIND_ID_BYTE       = 1
@@ -77,6 +92,7 @@ class State(Enum):
     FIND_PAYLOAD       = 4
     FIND_CRC           = 5
     FIND_END_BYTE      = 6
+    FIND_EXT_LEN       = 7
 
 
 def constrain(val, min_, max_):
@@ -92,16 +108,20 @@ def serial_ports():
 
 
 class SerialTransfer:
-    def __init__(self, port, baud=115200, restrict_ports=True, debug=True, byte_format=BYTE_FORMATS['little-endian'], timeout=0.05, write_timeout=None):
+    def __init__(self, port, baud=115200, restrict_ports=True, debug=True, byte_format=BYTE_FORMATS['little-endian'], timeout=0.05, write_timeout=None, obj_codec='json', shared_strings=None, crc_len=8, extended_frames=False):
         '''
         Description:
         ------------
         Initialize transfer class and connect to the specified USB device
 
-        :param port: int or str - port the USB device is connected to
+        :param port: int or str - port the USB device is connected to, or a
+                                  transport URL such as socket://host:port,
+                                  udp://host:port, unix:///path or
+                                  rfc2217://host:port (see
+                                  pySerialTransfer.transports)
         :param baud: int        - baud (bits per sec) the device is configured for
         :param restrict_ports: bool - only allow port selection from auto
-                                      detected list
+                                      detected list (ignored for URLs)
         :param byte_format:    str  - format for values packed/unpacked via the
                                       struct package as defined by
                                       https://docs.python.org/3/library/struct.html#struct-format-strings
@@ -109,14 +129,33 @@ class SerialTransfer:
                                       default 50ms marries up with DEFAULT_TIMEOUT in SerialTransfer
         :param write_timeout: float - timeout (in s) to set on pySerial for maximum wait for a write operation to the serial port
                                       default None causes no write timeouts to be raised
+        :param obj_codec:     str   - default encoding used by tx_obj()/rx_obj() for dicts
+                                      and heterogeneous lists - either 'json' or 'binary'
+                                      (see pySerialTransfer.binpack)
+        :param shared_strings: list - strings (e.g. dict keys) known to both ends that
+                                      the binary codec never sends in full, each listed
+                                      once
+        :param crc_len:       int   - width of the frame CRC in bits - 8 (default, compatible
+                                      with the Arduino library), 16 or 32. Both ends must match
+        :param extended_frames: bool - allow payloads of up to MAX_EXT_PACKET_SIZE bytes.
+                                      send() uses an extended frame (16-bit length, per-block
+                                      COBS stuffing, CRC-32) for payloads that don't fit in a
+                                      standard frame, and available() accepts both frame types
         :return: void
         '''
 
         self.bytes_to_rec = 0
-        self.pay_index = 0
-        self.rec_overhead_byte = 0
-        self.tx_buff = [' '] * MAX_PACKET_SIZE
-        self.rx_buff = [' '] * MAX_PACKET_SIZE
+        self.rx_timestamp = 0  # see available()
+        self.rx_errors    = 0  # frames reported as CRC, payload or stop byte errors
+        self.rx_events = deque()
+        self.extended_frames = extended_frames
+
+        if extended_frames:
+            self.tx_buff = [' '] * MAX_EXT_PACKET_SIZE
+            self.rx_buff = [' '] * MAX_EXT_PACKET_SIZE
+        else:
+            self.tx_buff = [' '] * MAX_PACKET_SIZE
+            self.rx_buff = [' '] * MAX_PACKET_SIZE
 
         self.debug        = debug
         self.id_byte       = 0
@@ -124,10 +163,34 @@ class SerialTransfer:
         self.status       = 0
         self.overhead_byte = 0xFF
         self.callbacks    = []
+        self.compressors  = {}
+        self.tx_scheduler = None
+        self.tx_coalescer = None
+        self.rx_stats     = None
+        self.packet_pool  = None
+        self.rx_handle    = None
+        self.message_seq  = 0
+        self.frame_cache  = None
+        self.frame_cache_size   = 0
+        self.frame_cache_hits   = 0
+        self.frame_cache_misses = 0
+        self.decode_cache = None
+        self.container    = None
+        self.container_id = None
+        self.container_thread = None
         self.byte_format  = byte_format
+        self.obj_codec    = obj_codec
+        self.shared_strings = shared_strings
 
-        self.state = State.FIND_START_BYTE
+        self.encoder = FrameEncoder(crc_len, extended_frames)
+        self.decoder = FrameDecoder(crc_len, extended_frames, report_errors=True)
+        self.crc = self.encoder.crc
         
+        if is_url(port):
+            self.port_name = port
+            self.connection = transport_for_url(port, baud, timeout, write_timeout)
+            return
+
         if restrict_ports:
             self.port_name = None
             for p in serial_ports():
@@ -142,13 +205,24 @@ class SerialTransfer:
         else:
             self.port_name = port
 
-        self.crc = CRC()
         self.connection = serial.Serial()
         self.connection.port = self.port_name
         self.connection.baudrate = baud
         self.connection.timeout = timeout
         self.connection.write_timeout = write_timeout
 
+    @property
+    def state(self):
+        '''
+        Description:
+        ------------
+        Current state of the frame parser
+
+        :return: State - parser state
+        '''
+
+        return State(self.decoder.state)
+
     def open(self):
         '''
         Description:
@@ -186,18 +260,385 @@ class SerialTransfer:
         
         self.callbacks = callbacks
 
+    def enable_compression(self, packet_id, zdict=b'', level=9):
+        '''
+        Description:
+        ------------
+        Compress the payloads of all packets sent and received with the given
+        ID. Each payload is prefixed with a one byte header whose flag bit
+        marks compressed payloads - if compression doesn't shrink a payload
+        it is sent uncompressed. Both ends of the link must enable compression
+        for the same IDs with the same shared dictionary
+
+        :param packet_id: int   - ID of the packets to compress
+        :param zdict:     bytes - shared dictionary, see
+                                  pySerialTransfer.compression.PayloadCompressor
+        :param level:     int   - zlib compression level (0-9)
+
+        :return: PayloadCompressor - compressor used for the ID (its byte
+                                     counters give the achieved ratio)
+        '''
+
+        self.compressors[packet_id] = PayloadCompressor(zdict, level)
+        self.clear_frame_cache()
+        return self.compressors[packet_id]
+
+    def disable_compression(self, packet_id):
+        '''
+        Description:
+        ------------
+        Stop compressing packets with the given ID
+
+        :param packet_id: int - ID of the packets to stop compressing
+
+        :return: void
+        '''
+
+        self.compressors.pop(packet_id, None)
+        self.clear_frame_cache()
+
+    def enable_frame_cache(self, size=32):
+        '''
+        Description:
+        ------------
+        Keep the most recently sent frames so send() can skip encoding when
+        the same payload is sent again with the same ID (polls, heartbeats,
+        constant queries, etc). Hits and misses are counted in
+        frame_cache_hits and frame_cache_misses
+
+        :param size: int - maximum number of frames to keep, the least
+                           recently used frame is evicted first
+
+        :return: void
+        '''
+
+        self.frame_cache = OrderedDict()
+        self.frame_cache_size = size
+        self.frame_cache_hits = 0
+        self.frame_cache_misses = 0
+
+    def disable_frame_cache(self):
+        '''
+        Description:
+        ------------
+        Stop caching sent frames and drop the frames cached so far
+
+        :return: void
+        '''
+
+        self.frame_cache = None
+
+    def clear_frame_cache(self):
+        '''
+        Description:
+        ------------
+        Drop the cached frames (called whenever the way payloads are encoded
+        changes, e.g. compression is enabled or disabled for an ID)
+
+        :return: void
+        '''
+
+        if self.frame_cache is not None:
+            self.frame_cache.clear()
+
+    def enable_decode_cache(self, size=128):
+        '''
+        Description:
+        ------------
+        Memoize rx_obj() decodes of dicts and (binary codec) lists. When the
+        received payload is byte-identical to an earlier one with the same
+        packet ID, the earlier result is returned without decoding. Cached
+        results are immutable (dicts become read-only mappings and lists
+        become tuples) since the same object is handed out repeatedly
+
+        :param size: int - maximum number of decoded payloads to keep
+
+        :return: DecodeCache - the cache (its counters give the hit rate)
+        '''
+
+        self.decode_cache = DecodeCache(size)
+        return self.decode_cache
+
+    def disable_decode_cache(self):
+        '''
+        Description:
+        ------------
+        Stop memoizing rx_obj() decodes
+
+        :return: void
+        '''
+
+        self.decode_cache = None
+
+    def enable_containers(self, packet_id=CONTAINER_ID, max_delay=0.002, max_record=MAX_RECORD):
+        '''
+        Description:
+        ------------
+        Coalesce small messages: send() packs messages of up to max_record
+        bytes as records into container frames (with the given packet ID)
+        instead of sending a frame per message. A container is sent when the
+        next record doesn't fit, when a larger message is sent (so messages
+        never overtake each other) and by a background thread once its
+        oldest record has waited max_delay - or call flush_records().
+        Received containers are unpacked by available(),
+        which reports each record as a packet with its own ID, so
+        callbacks, packets() etc work unchanged. Both ends must enable
+        containers with the same packet ID
+
+        :param packet_id:  int   - ID of the container frames
+        :param max_delay:  float - longest time (in s) a message is held back
+        :param max_record: int   - largest message (in bytes) to coalesce
+
+        :return: ContainerWriter - the container (its counters give the
+                                   number of records and containers sent)
+        '''
+
+        self.disable_containers()
+
+        self.container_id = packet_id
+        self.container = ContainerWriter(max_delay, max_record)
+        self.container_thread = threading.Thread(target=self.run_containers, args=(self.container,),
+                                                 name='ContainerFlush', daemon=True)
+        self.container_thread.start()
+        return self.container
+
+    def disable_containers(self):
+        '''
+        Description:
+        ------------
+        Send any pending records and stop coalescing messages
+
+        :return: void
+        '''
+
+        container = self.container
+
+        if container is None:
+            return
+
+        with container.cond:
+            self.flush_records()
+            self.container = None
+            self.container_id = None
+            container.cond.notify_all()
+
+        self.container_thread.join()
+        self.container_thread = None
+
+    def flush_records(self, priority=None):
+        '''
+        Description:
+        ------------
+        Send the pending container, if there is one
+
+        :param priority: int - scheduler queue to use, ignored if no scheduler
+                               is attached
+
+        :return: bool - whether or not the container was written or queued
+        '''
+
+        container = self.container
+
+        if container is None:
+            return True
+
+        with container.cond:
+            payload = container.take()
+
+            if payload is None:
+                return True
+
+            return self.write_frame(self.encoder.encode(payload, self.container_id), priority)
+
+    def run_containers(self, container):
+        # Sends the container once its oldest record has waited max_delay,
+        # whether or not the application calls send() or available() again
+        with container.cond:
+            while self.container is container:
+                if not container.count:
+                    container.cond.wait()
+                    continue
+
+                remaining = container.deadline - container.clock()
+
+                if remaining > 0:
+                    container.cond.wait(remaining)
+                    continue
+
+                try:
+                    self.flush_records()
+                except Exception as e:
+                    logging.exception(e)
+
+    def enable_rx_stats(self, max_queue=None, policy=POLICY_DROP_OLDEST, os_buffer_size=DEFAULT_OS_BUFFER_SIZE):
+        '''
+        Description:
+        ------------
+        Count overruns and drops on the receive path (see
+        pySerialTransfer.overrun): kernel serial error counters, high-water
+        marks of the OS buffer and of the queue of frames decoded but not
+        yet returned by available(), and the likely cause of every corrupt
+        frame. Optionally bound that queue by reading less from the port
+
+        :param max_queue:      int - maximum number of queued frames, None
+                                     for no limit. A container's records
+                                     are queued together, so one container
+                                     can exceed it unless the OS buffer was
+                                     full
+        :param policy:         str - what to do once the OS buffer is full:
+                                     POLICY_DROP_OLDEST, POLICY_DROP_NEWEST or
+                                     POLICY_BLOCK (leave the bytes waiting
+                                     instead of dropping frames)
+        :param os_buffer_size: int - size of the OS receive buffer
+
+        :return: RxStats - the counters
+        '''
+
+        self.rx_stats = RxStats(self.connection, max_queue, policy, os_buffer_size)
+        return self.rx_stats
+
+    def disable_rx_stats(self):
+        '''
+        Description:
+        ------------
+        Stop counting overruns and drops (and stop bounding the queue)
+
+        :return: void
+        '''
+
+        self.rx_stats = None
+
+    def enable_packet_pool(self, count=64, policy=POLICY_DROP, timeout=None):
+        '''
+        Description:
+        ------------
+        Have the frame decoder copy received payloads straight into a pool of
+        preallocated buffers (see pySerialTransfer.buffer_pool). After
+        available() reports new data, rx_handle holds the packet. It is
+        released by the next available() call unless take_handle() is used
+        to keep it - a kept handle must be released by the application once
+        it's done with the packet. Frames decoded while every buffer is
+        held are copied into one once they're returned by available(), and
+        the policy only applies if none is free by then
+
+        :param count:   int   - number of buffers
+        :param policy:  str   - buffer_pool.POLICY_DROP drops packets while
+                                every buffer is held (available() returns 0
+                                with status CONTINUE), POLICY_BLOCK waits for
+                                a buffer to be released
+        :param timeout: float - maximum time (in s) to block before dropping,
+                                required with POLICY_BLOCK
+
+        :return: PacketPool - the pool
+        :raises buffer_pool.InvalidPolicy: if the policy is unknown, or
+                                           POLICY_BLOCK is given without a
+                                           timeout
+        '''
+
+        self.packet_pool = PacketPool(count, MAX_PACKET_SIZE, policy, timeout)
+        self.decoder.pool = self.packet_pool
+        return self.packet_pool
+
+    def disable_packet_pool(self):
+        '''
+        Description:
+        ------------
+        Stop filling pooled buffers (handles already handed out stay valid
+        until released)
+
+        :return: void
+        '''
+
+        self.decoder.pool = None
+        self.packet_pool = None
+
+        if self.rx_handle is not None:
+            self.rx_handle.release()
+            self.rx_handle = None
+
+    def take_handle(self):
+        '''
+        Description:
+        ------------
+        Take ownership of the pooled buffer of the last received packet, so
+        it stays valid after the next available() call
+
+        :return: PacketHandle - handle to release() once done with the packet,
+                                None if the packet isn't in a pooled buffer
+        '''
+
+        handle = self.rx_handle
+        self.rx_handle = None
+        return handle
+
+    def enable_write_coalescing(self, max_bytes=512, max_delay=0.0005):
+        '''
+        Description:
+        ------------
+        Buffer outgoing frames and write them in batches of up to max_bytes,
+        holding no frame longer than max_delay (see
+        pySerialTransfer.coalesce.WriteCoalescer). Use flush() to write
+        buffered frames immediately
+
+        :param max_bytes: int   - write as soon as this many bytes are
+                                  buffered
+        :param max_delay: float - longest time (in s) a frame is buffered
+
+        :return: WriteCoalescer - the buffer (its counters give the number of
+                                  frames and writes)
+        '''
+
+        from .coalesce import WriteCoalescer
+
+        self.disable_write_coalescing()
+        coalescer = WriteCoalescer(self, max_bytes, max_delay)
+        coalescer.start()
+        return coalescer
+
+    def disable_write_coalescing(self):
+        '''
+        Description:
+        ------------
+        Write any buffered frames and stop buffering
+
+        :return: void
+        '''
+
+        if self.tx_coalescer is not None:
+            self.tx_coalescer.stop()
+
+    def flush(self):
+        '''
+        Description:
+        ------------
+        Send pending container records and write frames buffered by write
+        coalescing now, e.g. right after a latency-critical send()
+
+        :return: void
+        '''
+
+        self.flush_records()
+
+        if self.tx_coalescer is not None:
+            self.tx_coalescer.flush()
+
     def close(self):
         '''
         Description:
         ------------
-        Close serial port
+        Close serial port (after writing any buffered frames)
 
         :return: void
         '''
+        self.disable_containers()
+
+        if self.tx_coalescer is not None:
+            self.tx_coalescer.stop()
+
         if self.connection.is_open:
             self.connection.close()
     
-    def tx_obj(self, val, start_pos=0, byte_format='', val_type_override=''):
+    def tx_obj(self, val, start_pos=0, byte_format='', val_type_override='', codec=''):
         '''
         Description:
         -----------
@@ -211,16 +652,28 @@ class SerialTransfer:
                                   https://docs.python.org/3/library/struct.html#struct-format-strings
         :param val_type_override: str - manually specify format according to
                                         https://docs.python.org/3/library/struct.html#format-characters
+        :param codec:       str - encoding for dicts and lists, either 'json'
+                                  or 'binary' - defaults to self.obj_codec. With
+                                  'binary', lists are encoded as one
+                                  self-describing object instead of element by
+                                  element
     
         :return: int - index of the last byte of the value in the TX buffer + 1,
                        None if operation failed
         '''
         
+        if not codec:
+            codec = self.obj_codec
+        
         if val_type_override:
             format_str = val_type_override
             
         else:
-            if isinstance(val, str):
+            if codec == 'binary' and isinstance(val, (dict, list)):
+                val = binpack.pack(val, self.shared_strings)
+                format_str = '%ds' % len(val)
+                
+            elif isinstance(val, str):
                 val = val.encode()
                 format_str = '%ds' % len(val)
                 
@@ -271,12 +724,148 @@ class SerialTransfer:
                        None if operation failed
         '''
       
+        if start_pos + len(val_bytes) > len(self.tx_buff):
+            logging.error('{} bytes at index {} do not fit in the TX buffer'.format(len(val_bytes), start_pos))
+            return None
+      
         for index in range(len(val_bytes)):
             self.tx_buff[index + start_pos] = val_bytes[index]
         
         return start_pos + len(val_bytes)
 
-    def rx_obj(self, obj_type, start_pos=0, obj_byte_size=0, list_format=None, byte_format=''):
+    def tx_records(self, records, schema=None, start_pos=0, byte_format=''):
+        '''
+        Description:
+        -----------
+        Insert a batch of fixed-size records (an array of structs) into the
+        TX buffer back to back, starting at the specified index. Records are
+        packed into one scratch buffer with a single pack_into() call each
+        (NumPy structured arrays are copied in bulk) and then copied into
+        the TX buffer at once
+
+        :param records:     iterable or numpy.ndarray - tuples of field
+                                  values (or single values for one-field
+                                  formats), or a NumPy structured array
+        :param schema:      str - struct format of one record as defined by
+                                  https://docs.python.org/3/library/struct.html#format-characters,
+                                  not needed for NumPy arrays
+        :param start_pos:   int - index of TX buffer where the first byte
+                                  of the first record is to be stored in
+        :param byte_format: str - byte order, size and alignment according to
+                                  https://docs.python.org/3/library/struct.html#struct-format-strings,
+                                  used if schema has none - defaults to
+                                  self.byte_format
+
+        :return: int - index of the last byte of the last record in the TX
+                       buffer + 1, None if operation failed
+        '''
+
+        if hasattr(records, 'tobytes') and hasattr(records, 'dtype'):
+            val_bytes = records.tobytes()
+
+        else:
+            record = struct.Struct(self.record_format(schema, byte_format))
+
+            if not isinstance(records, (list, tuple)):
+                records = list(records)
+
+            val_bytes = bytearray(record.size * len(records))
+            pack_into = record.pack_into
+            offset = 0
+
+            for val in records:
+                if isinstance(val, (tuple, list)):
+                    pack_into(val_bytes, offset, *val)
+                else:
+                    pack_into(val_bytes, offset, val)
+
+                offset += record.size
+
+        end = start_pos + len(val_bytes)
+
+        if end > len(self.tx_buff):
+            logging.error('{} bytes at index {} do not fit in the TX buffer'.format(len(val_bytes), start_pos))
+            return None
+
+        self.tx_buff[start_pos:end] = val_bytes
+        return end
+
+    def rx_records(self, schema, count=None, start_pos=0, byte_format=''):
+        '''
+        Description:
+        ------------
+        Extract a batch of fixed-size records (an array of structs) packed
+        back to back in the RX buffer in one call
+
+        :param schema:      str or numpy.dtype - struct format of one record
+                                  as defined by
+                                  https://docs.python.org/3/library/struct.html#format-characters
+                                  (decoded with struct.iter_unpack), or a NumPy
+                                  structured dtype (decoded with
+                                  numpy.frombuffer)
+        :param count:       int - number of records, None for every whole
+                                  record between start_pos and the end of the
+                                  received payload
+        :param start_pos:   int - index of RX buffer where the first record
+                                  starts
+        :param byte_format: str - byte order, size and alignment according to
+                                  https://docs.python.org/3/library/struct.html#struct-format-strings,
+                                  used if a struct format has none - defaults
+                                  to self.byte_format
+
+        :return: list or numpy.ndarray - tuple of field values per record, or
+                                         a structured array for a dtype, None
+                                         if operation failed
+        '''
+
+        if isinstance(schema, (str, struct.Struct)):
+            fmt = self.record_format(schema, byte_format)
+            size = struct.calcsize(fmt)
+            np = None
+        else:
+            import numpy as np
+
+            schema = np.dtype(schema)
+            size = schema.itemsize
+
+        available = (self.bytes_read - start_pos) // size if size else 0
+
+        if count is None:
+            count = available
+
+        if not 0 <= count <= available:
+            logging.error('{} records of {} bytes at index {} exceed the received payload'.format(count, size, start_pos))
+            return None
+
+        payload = bytes(self.rx_buff[start_pos:start_pos + count * size])
+
+        if np is None:
+            return list(struct.iter_unpack(fmt, payload)) if size else []
+
+        return np.frombuffer(payload, schema, count)
+
+    def record_format(self, schema, byte_format=''):
+        '''
+        Description:
+        ------------
+        Full struct format of a record, adding the byte order if it has none
+
+        :param schema:      str or struct.Struct - record format
+        :param byte_format: str - byte order to add, defaults to
+                                  self.byte_format
+
+        :return: str - struct format
+        '''
+
+        if isinstance(schema, struct.Struct):
+            return schema.format
+
+        if schema[:1] in BYTE_FORMATS.values():
+            return schema
+
+        return (byte_format or self.byte_format) + schema
+
+    def rx_obj(self, obj_type, start_pos=0, obj_byte_size=0, list_format=None, byte_format='', codec=''):
         '''
         Description:
         ------------
@@ -297,11 +886,66 @@ class SerialTransfer:
                                      https://docs.python.org/3/library/array.html#module-array
         :param byte_format: str    - byte order, size and alignment according to
                                      https://docs.python.org/3/library/struct.html#struct-format-strings
+        :param codec:       str    - encoding for dicts and lists, either 'json'
+                                     or 'binary' - defaults to self.obj_codec.
+                                     Binary objects are self-describing, so
+                                     obj_byte_size is not needed for them
     
         :return unpacked_response: obj - object extracted from the RX buffer,
                                          None if operation failed
         '''
         
+        if not codec:
+            codec = self.obj_codec
+        
+        if self.decode_cache is not None and (obj_type == dict or (obj_type == list and not list_format)):
+            if codec == 'binary':
+                end = self.bytes_read
+            else:
+                end = start_pos + obj_byte_size
+
+            # Only payloads of the last received packet can be keyed reliably
+            if start_pos < end <= self.bytes_read:
+                try:
+                    key = (self.id_byte, obj_type, codec, start_pos, bytes(self.rx_buff[start_pos:end]))
+                except (TypeError, ValueError):
+                    key = None
+
+                if key is not None:
+                    return self.decode_cache.get(key, lambda: self.decode_obj(obj_type, start_pos, obj_byte_size, list_format, byte_format, codec))
+
+        return self.decode_obj(obj_type, start_pos, obj_byte_size, list_format, byte_format, codec)
+
+    def decode_obj(self, obj_type, start_pos=0, obj_byte_size=0, list_format=None, byte_format='', codec=''):
+        '''
+        Description:
+        ------------
+        Decode a value from the RX buffer without going through the decode
+        cache, see rx_obj() for the parameters
+
+        :return unpacked_response: obj - object extracted from the RX buffer,
+                                         None if operation failed
+        '''
+
+        if not codec:
+            codec = self.obj_codec
+
+        if codec == 'binary' and (obj_type == dict or (obj_type == list and not list_format)):
+            buff = self.rx_buff
+
+            if start_pos < self.bytes_read:
+                # Indexing bytes is much cheaper than indexing the list
+                try:
+                    buff = bytes(self.rx_buff[start_pos:self.bytes_read])
+                    start_pos = 0
+                except (TypeError, ValueError):
+                    buff = self.rx_buff
+
+            try:
+                return binpack.unpack(buff, start_pos, self.shared_strings)[0]
+            except binpack.BinpackError:
+                return None
+        
         if (obj_type == str) or (obj_type == dict):
             buff = bytes(self.rx_buff[start_pos:(start_pos + obj_byte_size)])
             format_str = '%ds' % len(buff)
@@ -367,12 +1011,8 @@ class SerialTransfer:
         :return: void
         '''
 
-        self.overhead_byte = 0xFF
-
-        for i in range(pay_len):
-            if self.tx_buff[i] == START_BYTE:
-                self.overhead_byte = i
-                break
+        index = self.tx_payload(pay_len).find(START_BYTE)
+        self.overhead_byte = 0xFF if index == -1 else index
 
     def find_last(self, pay_len):
         '''
@@ -387,33 +1027,73 @@ class SerialTransfer:
                        within the given packet array
         '''
 
-        if pay_len <= MAX_PACKET_SIZE:
-            for i in range(pay_len - 1, -1, -1):
-                if self.tx_buff[i] == START_BYTE:
-                    return i
-        return -1
+        if pay_len > MAX_PACKET_SIZE:
+            return -1
+        return self.tx_payload(pay_len).rfind(START_BYTE)
 
     def stuff_packet(self, pay_len):
         '''
         Description:
         ------------
         Enforces the COBS (Consistent Overhead Stuffing) ruleset across
-        all bytes in the packet against the value of START_BYTE
+        all bytes in the packet against the value of START_BYTE (see
+        framing.stuff(), which build_frame() uses)
 
         :param pay_len: int - number of bytes in the payload
 
         :return: void
         '''
 
-        ref_byte = self.find_last(pay_len)
+        if pay_len > MAX_PACKET_SIZE:
+            return
+
+        block = bytearray(self.tx_payload(pay_len))
+        stuff(block)
+        self.tx_buff[:pay_len] = block
+
+    def build_frame(self, message_len, packet_id=0):
+        '''
+        Description:
+        ------------
+        Packetize a specified number of bytes from the TX buffer without
+        sending them. Payloads larger than MAX_PACKET_SIZE are sent as
+        extended frames if extended frames are enabled (payload compression
+        is not applied to extended frames)
+
+        :param message_len: int - number of bytes from the tx_buff to use as
+                                  payload in the packet
+        :param packet_id:   int - ID of the packet
+
+        :return: bytearray - complete frame, ready to be written to the port
+        '''
+
+        if self.extended_frames and message_len > MAX_PACKET_SIZE:
+            message_len = constrain(message_len, 0, MAX_EXT_PACKET_SIZE)
+        else:
+            message_len = constrain(message_len, 0, MAX_PACKET_SIZE)
+
+            if packet_id in self.compressors:
+                message_len = self.compress_packet(message_len, packet_id)
+
+        return bytearray(self.encoder.encode(self.tx_payload(message_len), packet_id))
+
+    def tx_payload(self, message_len):
+        '''
+        Description:
+        ------------
+        Copy the start of the TX buffer as bytes
+
+        :param message_len: int - number of bytes to copy
 
-        if (not ref_byte == -1) and (ref_byte <= MAX_PACKET_SIZE):
-            for i in range(pay_len - 1, -1, -1):
-                if self.tx_buff[i] == START_BYTE:
-                    self.tx_buff[i] = ref_byte - i
-                    ref_byte = i
+        :return: bytes - payload
+        '''
 
-    def send(self, message_len, packet_id=0):
+        try:
+            return bytes(self.tx_buff[:message_len])
+        except (TypeError, ValueError):
+            return bytes([ord(b) if isinstance(b, str) else int(b) for b in self.tx_buff[:message_len]])
+
+    def send(self, message_len, packet_id=0, priority=None):
         '''
         Description:
         ------------
@@ -422,40 +1102,31 @@ class SerialTransfer:
         :param message_len: int - number of bytes from the tx_buff to send as
                                   payload in the packet
         :param packet_id:   int - ID of the packet to send                                  
+        :param priority:    int - queue to use if a TxScheduler owns the write
+                                  side of the link (see
+                                  pySerialTransfer.scheduler), ignored
+                                  otherwise
 
         :return: bool - whether or not the operation was successful
         '''
 
-        stack = []
-        message_len = constrain(message_len, 0, MAX_PACKET_SIZE)
-
         try:
-            self.calc_overhead(message_len)
-            self.stuff_packet(message_len)
-            found_checksum = self.crc.calculate(self.tx_buff, message_len)
-
-            stack.append(START_BYTE)
-            stack.append(packet_id)
-            stack.append(self.overhead_byte)
-            stack.append(message_len)
-
-            for i in range(message_len):
-                if isinstance(self.tx_buff[i], str):
-                    val = ord(self.tx_buff[i])
-                else:
-                    val = int(self.tx_buff[i])
+            if self.container is not None:
+                if (message_len <= self.container.max_record and packet_id != self.container_id
+                        and packet_id not in self.compressors):
+                    return self.send_record(message_len, packet_id, priority)
 
-                stack.append(val)
+                self.flush_records(priority)
 
-            stack.append(found_checksum)
-            stack.append(STOP_BYTE)
+            if self.frame_cache is None:
+                return self.write_frame(self.build_frame(message_len, packet_id), priority)
 
-            stack = bytearray(stack)
-            
-            if self.open():
-                self.connection.write(stack)
+            return self.write_frame(self.cached_frame(message_len, packet_id), priority)
 
-            return True
+        except ValueError as e:
+            logging.error('{}'.format(e))
+
+            return False
 
         except:
             import traceback
@@ -463,122 +1134,474 @@ class SerialTransfer:
 
             return False
 
-    def unpack_packet(self):
+    def send_record(self, message_len, packet_id=0, priority=None):
         '''
         Description:
         ------------
-        Unpacks all COBS-stuffed bytes within the array
+        Add a message to the pending container (see enable_containers()),
+        sending the container if it is full or due
 
-        :return: void
+        :param message_len: int - number of bytes from the tx_buff to send
+        :param packet_id:   int - ID the message is delivered with
+        :param priority:    int - scheduler queue to use for the container
+
+        :return: bool - whether or not the operation was successful
         '''
 
-        test_index = self.rec_overhead_byte
+        container = self.container
+
+        with container.cond:
+            if not container.count:
+                container.cond.notify()
+
+            full = container.add(packet_id, self.tx_payload(max(message_len, 0)))
+
+            if full is not None:
+                self.write_frame(self.encoder.encode(full, self.container_id), priority)
 
-        if test_index <= MAX_PACKET_SIZE:
-            while self.rx_buff[test_index]:
-                delta = self.rx_buff[test_index]
-                self.rx_buff[test_index] = START_BYTE
-                test_index += delta
+            if container.due():
+                return self.flush_records(priority)
 
-            self.rx_buff[test_index] = START_BYTE
+        return True
+
+    def cached_frame(self, message_len, packet_id=0):
+        '''
+        Description:
+        ------------
+        Return the frame for the given payload from the frame cache, encoding
+        and caching it on a miss
+
+        :param message_len: int - number of bytes from the tx_buff to use as
+                                  payload in the packet
+        :param packet_id:   int - ID of the packet
+
+        :return: bytes - complete frame, ready to be written to the port
+        '''
+
+        try:
+            key = (packet_id, bytes(self.tx_buff[:message_len]))
+        except (TypeError, ValueError):
+            # Payloads with unset (' ') or non-byte entries aren't cached
+            self.frame_cache_misses += 1
+            return self.build_frame(message_len, packet_id)
+
+        frame = self.frame_cache.get(key)
+
+        if frame is not None:
+            self.frame_cache.move_to_end(key)
+            self.frame_cache_hits += 1
+            return frame
+
+        self.frame_cache_misses += 1
+        frame = bytes(self.build_frame(message_len, packet_id))
+        self.frame_cache[key] = frame
+
+        if len(self.frame_cache) > self.frame_cache_size:
+            self.frame_cache.popitem(last=False)
+
+        return frame
+
+    def prepare_frame(self, payload, packet_id=0):
+        '''
+        Description:
+        ------------
+        Encode a payload into a complete frame once so it can be sent any
+        number of times with send_frame() without being stuffed and
+        checksummed again. Note that the TX buffer is used (and overwritten)
+        while encoding
+
+        :param payload:   bytes-like - payload of the packet
+        :param packet_id: int        - ID of the packet
+
+        :return: PreparedFrame - ID, payload and encoded frame
+        :raises ValueError: if the payload is larger than the TX buffer
+        '''
+
+        payload = bytes(payload)
+
+        if len(payload) > len(self.tx_buff):
+            raise ValueError('Payload of {} bytes does not fit in the TX buffer'.format(len(payload)))
+
+        self.tx_buff[:len(payload)] = payload
+
+        return PreparedFrame(packet_id, payload, bytes(self.build_frame(len(payload), packet_id)))
+
+    def send_frame(self, prepared, priority=None):
+        '''
+        Description:
+        ------------
+        Send a frame encoded with prepare_frame()
+
+        :param prepared: PreparedFrame - frame to send
+        :param priority: int           - scheduler queue to use, ignored if
+                                         no scheduler is attached
+
+        :return: bool - whether or not the frame was written or queued
+        '''
+
+        return self.write_frame(prepared.frame, priority)
+
+    def send_message(self, data, packet_id=0):
+        '''
+        Description:
+        ------------
+        Send a message of any length up to pySerialTransfer.fragment.MAX_MESSAGE
+        bytes, split into as many packets as needed. The receiver puts it back
+        together with a pySerialTransfer.fragment.Reassembler
+
+        :param data:      bytes-like - message to send
+        :param packet_id: int        - ID of the fragment packets
+
+        :return: bool - whether or not every fragment was sent
+        '''
+
+        from .fragment import send_fragments
+
+        self.message_seq = (self.message_seq + 1) & 0xFF
+        return send_fragments(self, data, packet_id, self.message_seq)
+
+    def write_frame(self, frame, priority=None):
+        '''
+        Description:
+        ------------
+        Write a complete frame to the port, or hand it to the transmit
+        scheduler or write coalescing buffer if one is attached
+
+        :param frame:    bytes-like - complete frame
+        :param priority: int        - scheduler queue to use, ignored if no
+                                      scheduler is attached
+
+        :return: bool - whether or not the frame was written or queued
+        '''
+
+        if self.tx_scheduler is not None:
+            if self.tx_coalescer is not None:
+                self.tx_coalescer.flush()
+
+            return self.tx_scheduler.submit(frame, priority)
+
+        if self.tx_coalescer is not None:
+            return self.tx_coalescer.write(frame)
+
+        if self.open():
+            self.connection.write(frame)
+
+        return True
+
+    def compress_packet(self, message_len, packet_id):
+        '''
+        Description:
+        ------------
+        Replace the first message_len bytes of the TX buffer with their
+        compressed form (including the compression header byte)
+
+        :param message_len: int - number of bytes from the tx_buff to compress
+        :param packet_id:   int - ID of the packet to send
+
+        :return: int - number of bytes in the TX buffer to send
+        :raises ValueError: if the payload doesn't fit in MAX_PACKET_SIZE bytes
+                            with the header byte (incompressible payloads of
+                            more than MAX_PACKET_SIZE - 1 bytes - send_message()
+                            keeps its fragments below that size)
+        '''
+
+        message_len = constrain(message_len, 0, MAX_PACKET_SIZE)
+        payload = bytes([ord(b) if isinstance(b, str) else int(b) for b in self.tx_buff[:message_len]])
+        payload = self.compressors[packet_id].compress(payload)
+
+        if len(payload) > MAX_PACKET_SIZE:
+            raise ValueError('Payload of {} bytes does not fit in a packet with ID {} once compressed ({} bytes)'.format(
+                message_len, packet_id, len(payload)))
+
+        self.tx_buff[:len(payload)] = payload
+        return len(payload)
+
+    def decompress_packet(self):
+        '''
+        Description:
+        ------------
+        Replace the compressed payload in the RX buffer with its decompressed
+        form
+
+        :return: int - number of bytes in the decompressed payload, None if
+                       the payload could not be decompressed
+        '''
+
+        payload = self.compressors[self.id_byte].decompress(bytes(self.rx_buff[:self.bytes_to_rec]),
+                                                            MAX_PACKET_SIZE)
+
+        if payload is None:
+            return None
+
+        self.rx_buff[:len(payload)] = payload
+        return len(payload)
+
+    def unpack_packet(self, overhead_byte=0, pay_len=MAX_PACKET_SIZE):
+        '''
+        Description:
+        ------------
+        Unpacks all COBS-stuffed bytes within the array. available() hands
+        out payloads that are already unstuffed (see framing.unstuff()), this
+        is only needed for stuffed payloads copied into rx_buff by hand
+
+        :param overhead_byte: int - overhead byte of the payload (index of
+                                    the first stuffed byte, 0xFF if none)
+        :param pay_len:       int - number of bytes in the payload
+
+        :return: void
+        '''
+
+        pay_len = min(pay_len, len(self.rx_buff))
+        block = bytearray(ord(b) if isinstance(b, str) else int(b) for b in self.rx_buff[:pay_len])
+
+        if unstuff(block, overhead_byte):
+            self.rx_buff[:pay_len] = block
 
     def available(self):
         '''
         Description:
         ------------
         Parses incoming serial data, analyzes packet contents,
-        and reports errors/successful packet reception
+        and reports errors/successful packet reception. Everything waiting
+        on the port is handed to the frame decoder in bulk - if that
+        completes more than one frame, the rest are reported by the
+        following calls
+
+        rx_timestamp is the time.monotonic_ns() of the read that delivered
+        the packet's start byte, taken once per read rather than per byte.
+        It is an upper bound: it runs late by as long as the bytes sat in
+        the OS buffer (up to a poll interval, plus USB latency), and every
+        packet whose start byte came in the same read gets the same value
 
         :return self.bytes_read: int - number of bytes read from the received
                                       packet
         '''
 
+        container = self.container
+
+        if container is not None:
+            with container.cond:
+                if container.due():
+                    self.flush_records()
+
+        if self.rx_events:
+            return self.process_frame(self.rx_events.popleft())
+
         if self.open():
-            if self.connection.in_waiting:
-                while self.connection.in_waiting:
-                    rec_char = int.from_bytes(self.connection.read(),
-                                             byteorder='big')
-
-                    if self.state == State.FIND_START_BYTE:
-                        if rec_char == START_BYTE:
-                            self.state = State.FIND_ID_BYTE
-                    
-                    elif self.state == State.FIND_ID_BYTE:
-                        self.id_byte = rec_char
-                        self.state = State.FIND_OVERHEAD_BYTE
-
-                    elif self.state == State.FIND_OVERHEAD_BYTE:
-                        self.rec_overhead_byte = rec_char
-                        self.state = State.FIND_PAYLOAD_LEN
-
-                    elif self.state == State.FIND_PAYLOAD_LEN:
-                        if rec_char > 0 and rec_char <= MAX_PACKET_SIZE:
-                            self.bytes_to_rec = rec_char
-                            self.pay_index = 0
-                            self.state = State.FIND_PAYLOAD
-                        else:
-                            self.bytes_read = 0
-                            self.state = State.FIND_START_BYTE
-                            self.status = Status.PAYLOAD_ERROR
-                            return self.bytes_read
-
-                    elif self.state == State.FIND_PAYLOAD:
-                        if self.pay_index < self.bytes_to_rec:
-                            self.rx_buff[self.pay_index] = rec_char
-                            self.pay_index += 1
-
-                            # Try to receive as many more bytes as we can, but we might not get all of them
-                            # if there is a timeout from the OS
-                            if self.pay_index != self.bytes_to_rec:
-                                more_bytes = list(self.connection.read(self.bytes_to_rec - self.pay_index))
-                                next_index = self.pay_index + len(more_bytes)
-
-                                self.rx_buff[self.pay_index:next_index] = more_bytes
-                                self.pay_index = next_index
-
-                            if self.pay_index == self.bytes_to_rec:
-                                self.state = State.FIND_CRC
-
-                    elif self.state == State.FIND_CRC:
-                        found_checksum = self.crc.calculate(
-                            self.rx_buff, self.bytes_to_rec)
-
-                        if found_checksum == rec_char:
-                            self.state = State.FIND_END_BYTE
-                        else:
-                            self.bytes_read = 0
-                            self.state = State.FIND_START_BYTE
-                            self.status = Status.CRC_ERROR
-                            return self.bytes_read
-
-                    elif self.state == State.FIND_END_BYTE:
-                        self.state = State.FIND_START_BYTE
-
-                        if rec_char == STOP_BYTE:
-                            self.unpack_packet()
-                            self.bytes_read = self.bytes_to_rec
-                            self.status = Status.NEW_DATA
-                            return self.bytes_read
-
-                        self.bytes_read = 0
-                        self.status = Status.STOP_BYTE_ERROR
-                        return self.bytes_read
-
-                    else:
-                        logging.error('Undefined state: {}'.format(self.state))
-
-                        self.bytes_read = 0
-                        self.state = State.FIND_START_BYTE
-                        return self.bytes_read
-            else:
+            waiting = self.connection.in_waiting
+
+            if not waiting:
                 self.bytes_read = 0
                 self.status = Status.NO_DATA
                 return self.bytes_read
 
+            timestamp = time.monotonic_ns()
+
+            if self.rx_stats is not None:
+                return self.available_counted(waiting, timestamp)
+
+            while waiting:
+                frames = self.decoder.feed(self.connection.read(waiting), timestamp)
+
+                if frames:
+                    self.rx_events.extend(frames[1:])
+                    return self.process_frame(frames[0])
+
+                waiting = self.connection.in_waiting
+
         self.bytes_read = 0
         self.status = Status.CONTINUE
         return self.bytes_read
-    
+
+    def available_counted(self, waiting, timestamp):
+        '''
+        Description:
+        ------------
+        The read loop of available() with receive path accounting (see
+        enable_rx_stats())
+
+        :param waiting:   int - bytes waiting on the port
+        :param timestamp: int - receive time in ns
+
+        :return self.bytes_read: int - number of bytes read from the received
+                                      packet
+        '''
+
+        stats = self.rx_stats
+        min_frame = 6 + self.crc.num_bytes
+
+        while waiting:
+            stats.note_waiting(waiting)
+            frames = self.decoder.feed(self.connection.read(stats.read_size(waiting, min_frame)), timestamp)
+
+            if frames:
+                stats.enqueue(self.rx_events, frames)
+                return self.process_frame(self.rx_events.popleft())
+
+            waiting = self.connection.in_waiting
+
+        self.bytes_read = 0
+        self.status = Status.CONTINUE
+        return self.bytes_read
+
+    def process_frame(self, frame):
+        '''
+        Description:
+        ------------
+        Copy a frame parsed by the decoder into the RX buffer (decompressing
+        it if needed) and update the link status
+
+        :param frame: Frame or FrameError - result of FrameDecoder.feed()
+
+        :return self.bytes_read: int - number of bytes in the payload, 0 if the
+                                      frame was corrupt
+        '''
+
+        if self.rx_handle is not None:
+            self.rx_handle.release()
+            self.rx_handle = None
+
+        self.id_byte = frame.id
+
+        if type(frame) is FrameError:
+            self.bytes_read = 0
+            self.status = Status(frame.code)
+            self.rx_errors += 1
+
+            if self.rx_stats is not None:
+                self.rx_stats.classify_error()
+
+            return self.bytes_read
+
+        payload = frame.payload
+
+        if type(payload) is PacketHandle:
+            if frame.id == self.container_id or frame.id in self.compressors:
+                # Replaced by the records or the decompressed payload below
+                handle, payload = payload, bytes(payload.payload)
+                handle.release()
+            else:
+                self.rx_handle = payload
+                payload = payload.payload
+
+        if frame.id == self.container_id:
+            try:
+                records = unpack_records(payload)
+            except InvalidContainer:
+                records = None
+
+            if not records:
+                self.bytes_read = 0
+
+                if records is None:
+                    self.status = Status.PAYLOAD_ERROR
+                    self.rx_errors += 1
+                else:
+                    self.status = Status.CONTINUE
+                return self.bytes_read
+
+            records_left = [Frame(sub_id, payload, frame.timestamp) for sub_id, payload in records[1:]]
+
+            if self.rx_stats is not None:
+                self.rx_stats.enqueue(self.rx_events, records_left, front=True)
+            else:
+                self.rx_events.extendleft(reversed(records_left))
+            self.id_byte, payload = records[0]
+
+        self.bytes_to_rec = len(payload)
+        self.rx_buff[:self.bytes_to_rec] = payload
+        self.bytes_read = self.bytes_to_rec
+
+        if self.id_byte in self.compressors:
+            self.bytes_read = self.decompress_packet()
+
+            if self.bytes_read is None:
+                self.bytes_read = 0
+                self.status = Status.PAYLOAD_ERROR
+                self.rx_errors += 1
+                return self.bytes_read
+
+        if self.packet_pool is not None and self.rx_handle is None and self.bytes_read <= self.packet_pool.size:
+            # Frames decoded while the pool was empty, container records and
+            # decompressed payloads
+            if self.id_byte in self.compressors:
+                payload = self.rx_buff[:self.bytes_read]
+
+            self.rx_handle = self.packet_pool.fill(self.id_byte, payload, frame.timestamp)
+
+            if self.rx_handle is None:
+                self.bytes_read = 0
+                self.status = Status.CONTINUE
+                return self.bytes_read
+
+        self.rx_timestamp = frame.timestamp
+        self.status = Status.NEW_DATA
+        return self.bytes_read
+
+    def packet_batches(self, max_batch=64, idle_sleep=0.001, timeout=None, idle_batches=False):
+        '''
+        Description:
+        ------------
+        Lazily yield lists of received packets. Each batch holds every packet
+        that could be parsed without waiting (up to max_batch), so consumers
+        can process packets in bulk (see pySerialTransfer.pipeline)
+
+        :param max_batch:  int   - maximum number of packets per batch
+        :param idle_sleep: float - time (in s) to sleep when no data is
+                                   available
+        :param timeout:    float - stop after this long (in s) without
+                                   receiving a packet, None to run forever
+        :param idle_batches: bool - yield an empty batch each time no data
+                                    is available, so time based stages
+                                    (pipeline.aggregate) keep running on a
+                                    quiet link
+
+        :return: generator - lists of Packet tuples (id, payload bytes,
+                             receive timestamp)
+        '''
+
+        last_packet = time.monotonic()
+
+        while True:
+            batch = []
+
+            while len(batch) < max_batch:
+                if self.available():
+                    batch.append(Packet(self.id_byte, bytes(self.rx_buff[:self.bytes_read]), self.rx_timestamp))
+                elif self.status in (Status.NO_DATA, Status.CONTINUE):
+                    break
+
+            if batch:
+                last_packet = time.monotonic()
+                yield batch
+
+            else:
+                if timeout is not None and time.monotonic() - last_packet >= timeout:
+                    return
+
+                time.sleep(idle_sleep)
+
+                if idle_batches:
+                    yield batch
+
+    def packets(self, idle_sleep=0.001, timeout=None):
+        '''
+        Description:
+        ------------
+        Lazily yield received packets one at a time
+
+        :param idle_sleep: float - time (in s) to sleep when no data is
+                                   available
+        :param timeout:    float - stop after this long (in s) without
+                                   receiving a packet, None to run forever
+
+        :return: generator - Packet tuples (id, payload bytes, receive
+                             timestamp)
+        '''
+
+        for batch in self.packet_batches(idle_sleep=idle_sleep, timeout=timeout):
+            yield from batch
+
     def tick(self):
         '''
         Description:
@@ -0,0 +1,256 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from .pySerialTransfer import MAX_PACKET_SIZE
+
+
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK   = 2
+
+BITS_PER_BYTE = 10  # start bit + 8 data bits + stop bit
+
+
+class QueueStats:
+    __slots__ = ('depth', 'max_depth', 'queued', 'sent', 'dropped', 'bytes_sent',
+                 'total_latency', 'max_latency')
+
+    def __init__(self):
+        self.depth         = 0
+        self.max_depth     = 0
+        self.queued        = 0
+        self.sent          = 0
+        self.dropped       = 0
+        self.bytes_sent    = 0
+        self.total_latency = 0.0
+        self.max_latency   = 0.0
+
+    @property
+    def avg_latency(self):
+        '''
+        Description:
+        ------------
+        Average time (in s) frames of this queue spent waiting to be written
+
+        :return: float - average queueing latency
+        '''
+
+        if not self.sent:
+            return 0.0
+        return self.total_latency / self.sent
+
+
+class TxScheduler:
+    def __init__(self, link, levels=3, default_priority=PRIORITY_NORMAL, max_depth=None,
+                 burst=None, bits_per_byte=BITS_PER_BYTE, clock=time.monotonic, sleep=time.sleep):
+        '''
+        Description:
+        ------------
+        Transmit scheduler that owns the write side of a SerialTransfer link.
+        Frames are queued by priority (0 is the most urgent) and written by a
+        background thread one frame at a time, so urgent frames jump ahead of
+        queued bulk traffic at the next frame boundary. Output is paced with
+        a token bucket refilled at the link's byte rate (baud / bits_per_byte)
+        so bytes don't pile up in the OS and adapter buffers. Connections
+        without a baud rate (socket transports opened without one) are not
+        paced
+
+        :param link:             SerialTransfer - link to transmit on
+        :param levels:           int - number of priority queues
+        :param default_priority: int - queue used when send() is called
+                                       without a priority
+        :param max_depth:        int - maximum number of frames per queue,
+                                       frames submitted to a full queue are
+                                       dropped (None for unbounded queues)
+        :param burst:            int - token bucket size in bytes, i.e. the
+                                       most bytes written ahead of the wire
+        :param bits_per_byte:    int - bits on the wire per byte sent
+        :param clock:            callable - time source (in s)
+        :param sleep:            callable - waits the given time (in s)
+                                            while pacing
+
+        :return: void
+        :raises ValueError: if default_priority isn't a valid queue index
+        '''
+
+        if not 0 <= default_priority < levels:
+            raise ValueError('Default priority {} is not in range(0, {})'.format(default_priority, levels))
+
+        self.link             = link
+        self.default_priority = default_priority
+        self.max_depth        = max_depth
+        self.burst            = burst if burst else 2 * (MAX_PACKET_SIZE + 10)
+        self.rate             = link.connection.baudrate / bits_per_byte if link.connection.baudrate else None
+        self.clock            = clock
+        self.sleep            = sleep
+
+        self.queues = [deque() for _ in range(levels)]
+        self.stats  = [QueueStats() for _ in range(levels)]
+
+        self.tokens      = self.burst
+        self.last_refill = clock()
+
+        self.cond    = threading.Condition()
+        self.running = False
+        self.writing = False
+        self.thread  = None
+
+    def start(self):
+        '''
+        Description:
+        ------------
+        Attach the scheduler to the link and start the writer thread
+
+        :return: void
+        '''
+
+        if self.running:
+            return
+
+        self.running = True
+        self.link.tx_scheduler = self
+        self.thread = threading.Thread(target=self.run, name='TxScheduler', daemon=True)
+        self.thread.start()
+
+    def stop(self, flush=True, timeout=None):
+        '''
+        Description:
+        ------------
+        Stop the writer thread and detach the scheduler from the link
+
+        :param flush:   bool  - write all queued frames before stopping
+        :param timeout: float - maximum time (in s) to wait for the flush
+
+        :return: void
+        '''
+
+        if flush:
+            self.flush(timeout)
+
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+        if self.link.tx_scheduler is self:
+            self.link.tx_scheduler = None
+
+    def submit(self, frame, priority=None):
+        '''
+        Description:
+        ------------
+        Queue a complete frame for transmission
+
+        :param frame:    bytes-like - complete frame
+        :param priority: int        - queue index (0 is the most urgent),
+                                      None for the default priority
+
+        :return: bool - True if queued, False if the queue was full
+        :raises ValueError: if priority isn't a valid queue index
+        '''
+
+        if priority is None:
+            priority = self.default_priority
+        elif not 0 <= priority < len(self.queues):
+            raise ValueError('Priority {} is not in range(0, {})'.format(priority, len(self.queues)))
+
+        stats = self.stats[priority]
+
+        with self.cond:
+            queue = self.queues[priority]
+
+            if self.max_depth is not None and len(queue) >= self.max_depth:
+                stats.dropped += 1
+                return False
+
+            queue.append((self.clock(), frame))
+            stats.queued += 1
+            stats.depth   = len(queue)
+
+            if stats.depth > stats.max_depth:
+                stats.max_depth = stats.depth
+
+            self.cond.notify()
+        return True
+
+    def flush(self, timeout=None):
+        '''
+        Description:
+        ------------
+        Block until every queued frame has been written (returns at once if
+        the writer thread isn't running)
+
+        :param timeout: float - maximum time (in s) to wait
+
+        :return: bool - True if all queues drained in time, False if frames
+                        are still queued
+        '''
+
+        with self.cond:
+            self.cond.wait_for(lambda: not (any(self.queues) or self.writing) or not self.running, timeout)
+            return not (any(self.queues) or self.writing)
+
+    def next_frame(self):
+        for priority, queue in enumerate(self.queues):
+            if queue:
+                queued_at, frame = queue.popleft()
+                self.stats[priority].depth = len(queue)
+                return priority, queued_at, frame
+        return None
+
+    def wait_for_tokens(self, num_bytes):
+        if self.rate is None:
+            # Connections without a known line rate aren't paced
+            return
+
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+        # Frames larger than the bucket are allowed through once it is full
+        needed = min(num_bytes, self.burst)
+
+        if self.tokens < needed:
+            self.sleep((needed - self.tokens) / self.rate)
+            self.tokens = needed
+            self.last_refill = self.clock()
+
+        self.tokens -= num_bytes
+
+    def run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: any(self.queues) or not self.running)
+
+                if not self.running:
+                    return
+
+                priority, queued_at, frame = self.next_frame()
+                self.writing = True
+
+            self.wait_for_tokens(len(frame))
+
+            try:
+                if self.link.open():
+                    self.link.connection.write(frame)
+            except Exception as e:
+                logging.exception(e)
+
+            latency = self.clock() - queued_at
+            stats   = self.stats[priority]
+
+            with self.cond:
+                self.writing         = False
+                stats.sent          += 1
+                stats.bytes_sent    += len(frame)
+                stats.total_latency += latency
+
+                if latency > stats.max_latency:
+                    stats.max_latency = latency
+
+                self.cond.notify_all()
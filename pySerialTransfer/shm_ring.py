@@ -0,0 +1,307 @@
+'''
+Shared memory layout:
+
+    header: magic (u32), slot count (u32), slot payload size (u32),
+            padding (u32), next sequence number to be written (u64)
+    slots:  sequence number (u64), timestamp in ns (i64), payload length
+            (u16), packet ID (u8), padding, payload
+
+A slot's sequence number is set to EMPTY_SEQ while it is being rewritten
+and to the packet's sequence number once the packet is complete, so
+readers can tell when a slot was overwritten under them.
+'''
+
+import struct
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from .pySerialTransfer import MAX_PACKET_SIZE
+
+
+MAGIC     = 0x50535452  # 'PSTR'
+EMPTY_SEQ = 0xFFFFFFFFFFFFFFFF
+
+HEADER      = struct.Struct('<IIIIQ')
+SLOT_HEADER = struct.Struct('<QqHB5x')
+SEQ         = struct.Struct('<Q')
+
+WRITE_SEQ_OFFSET = 16
+
+_attach_lock = threading.Lock()
+
+
+class InvalidRing(Exception):
+    pass
+
+
+class RingPacket:
+    __slots__ = ('seq', 'id', 'timestamp', 'payload')
+
+    def __init__(self, seq, packet_id, timestamp, payload):
+        self.seq       = seq
+        self.id        = packet_id
+        self.timestamp = timestamp
+        self.payload   = payload
+
+
+class PacketRingPublisher:
+    def __init__(self, name=None, slots=1024, slot_size=MAX_PACKET_SIZE):
+        '''
+        Description:
+        ------------
+        Create a shared memory ring buffer and publish decoded packets into
+        it. The publisher writes each packet once, no matter how many
+        subscribers read it
+
+        :param name:      str - name of the shared memory block (random if
+                                None, see self.name)
+        :param slots:     int - number of packets the ring holds
+        :param slot_size: int - maximum payload size per packet
+
+        :return: void
+        '''
+
+        self.slots     = slots
+        self.slot_size = slot_size
+        self.stride    = SLOT_HEADER.size + slot_size
+        self.seq       = 0
+
+        self.shm  = shared_memory.SharedMemory(name, create=True, size=HEADER.size + slots * self.stride)
+        self.name = self.shm.name
+        self.buf  = self.shm.buf
+
+        HEADER.pack_into(self.buf, 0, MAGIC, slots, slot_size, 0, 0)
+
+        for slot in range(slots):
+            SEQ.pack_into(self.buf, HEADER.size + slot * self.stride, EMPTY_SEQ)
+
+    def publish(self, packet_id, payload, timestamp=None):
+        '''
+        Description:
+        ------------
+        Write a packet into the next slot of the ring
+
+        :param packet_id: int        - ID of the packet
+        :param payload:   bytes-like - packet payload (truncated to the slot
+                                       size)
+        :param timestamp: int        - receive time in ns, defaults to
+                                       time.monotonic_ns()
+
+        :return: int - sequence number of the packet
+        '''
+
+        if timestamp is None:
+            timestamp = time.monotonic_ns()
+
+        seq    = self.seq
+        offset = HEADER.size + (seq % self.slots) * self.stride
+        length = min(len(payload), self.slot_size)
+        start  = offset + SLOT_HEADER.size
+
+        SEQ.pack_into(self.buf, offset, EMPTY_SEQ)
+        self.buf[start:start + length] = payload[:length]
+        SLOT_HEADER.pack_into(self.buf, offset, seq, timestamp, length, packet_id)
+        SEQ.pack_into(self.buf, WRITE_SEQ_OFFSET, seq + 1)
+
+        self.seq = seq + 1
+        return seq
+
+    def publish_link(self, link, timestamp=None):
+        '''
+        Description:
+        ------------
+        Publish the last packet parsed by a SerialTransfer link (call after
+        available() reported new data)
+
+        :param link:      SerialTransfer - link that received the packet
+        :param timestamp: int            - receive time in ns, defaults to
+                                           the link's rx_timestamp
+
+        :return: int - sequence number of the packet
+        '''
+
+        if timestamp is None:
+            timestamp = getattr(link, 'rx_timestamp', None)
+
+        return self.publish(link.id_byte, bytes(link.rx_buff[:link.bytes_read]), timestamp)
+
+    def close(self, unlink=True):
+        '''
+        Description:
+        ------------
+        Detach from the shared memory block and (by default) destroy it
+
+        :param unlink: bool - destroy the shared memory block
+
+        :return: void
+        '''
+
+        self.buf = None
+        self.shm.close()
+
+        if unlink:
+            self.shm.unlink()
+
+
+def _attach(name):
+    # Only the publisher owns the block - subscribers must not register it
+    # with their resource tracker, which would destroy it when they exit
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+
+    # Older versions always register. Unregistering afterwards would also
+    # drop the publisher's entry when it shares the tracker (same process
+    # or a spawned child), so skip the registration of this one block
+    # instead - other threads creating blocks meanwhile still register
+    # theirs. The lock keeps concurrent attaches from restoring each
+    # other's patch
+    tracked_name = name if name.startswith('/') else '/' + name
+
+    with _attach_lock:
+        register = resource_tracker.register
+
+        def register_others(res_name, rtype):
+            if res_name != tracked_name or rtype != 'shared_memory':
+                register(res_name, rtype)
+
+        resource_tracker.register = register_others
+
+        try:
+            return shared_memory.SharedMemory(name)
+        finally:
+            resource_tracker.register = register
+
+
+class PacketRingSubscriber:
+    def __init__(self, name, from_start=False):
+        '''
+        Description:
+        ------------
+        Attach to a ring created by a PacketRingPublisher (usually in
+        another process). Every subscriber has its own cursor, and payloads
+        are returned as memoryviews into the shared memory itself (no
+        copies). A payload view stays valid until the publisher laps the
+        ring - use is_valid() to check, or copy it if it must be kept
+
+        :param name:       str  - name of the shared memory block
+        :param from_start: bool - start with the oldest packet still in the
+                                  ring instead of the next new one
+
+        :return: void
+        '''
+
+        self.shm = _attach(name)
+        self.buf = self.shm.buf
+        magic, self.slots, self.slot_size, _, write_seq = HEADER.unpack_from(self.buf, 0)
+
+        if magic != MAGIC:
+            self.buf = None
+            self.shm.close()
+            raise InvalidRing('Shared memory block "{}" is not a packet ring'.format(name))
+
+        self.stride   = SLOT_HEADER.size + self.slot_size
+        self.overruns = 0
+        self.received = 0
+
+        if from_start:
+            self.cursor = max(0, write_seq - self.slots)
+        else:
+            self.cursor = write_seq
+
+    def pending(self):
+        '''
+        Description:
+        ------------
+        Number of packets published but not yet read by this subscriber
+
+        :return: int - number of pending packets
+        '''
+
+        return SEQ.unpack_from(self.buf, WRITE_SEQ_OFFSET)[0] - self.cursor
+
+    def read(self):
+        '''
+        Description:
+        ------------
+        Read the next packet. If the publisher overwrote packets this
+        subscriber had not read yet, they are skipped and counted in
+        self.overruns
+
+        :return: RingPacket - next packet, None if there is none
+        '''
+
+        while True:
+            write_seq = SEQ.unpack_from(self.buf, WRITE_SEQ_OFFSET)[0]
+
+            if self.cursor >= write_seq:
+                return None
+
+            if write_seq - self.cursor > self.slots:
+                self.overruns += write_seq - self.cursor - self.slots
+                self.cursor    = write_seq - self.slots
+
+            seq    = self.cursor
+            offset = HEADER.size + (seq % self.slots) * self.stride
+            slot_seq, timestamp, length, packet_id = SLOT_HEADER.unpack_from(self.buf, offset)
+
+            if slot_seq != seq:
+                # Overwritten while we were looking, catch up and try again
+                self.overruns += 1
+                self.cursor   += 1
+                continue
+
+            self.cursor   += 1
+            self.received += 1
+            start = offset + SLOT_HEADER.size
+            return RingPacket(seq, packet_id, timestamp, self.buf[start:start + length])
+
+    def read_batch(self, max_packets=64):
+        '''
+        Description:
+        ------------
+        Read up to max_packets pending packets
+
+        :param max_packets: int - maximum number of packets to return
+
+        :return: list - RingPacket objects, oldest first
+        '''
+
+        batch = []
+
+        while len(batch) < max_packets:
+            packet = self.read()
+
+            if packet is None:
+                break
+            batch.append(packet)
+        return batch
+
+    def is_valid(self, packet):
+        '''
+        Description:
+        ------------
+        Check that a packet's payload view hasn't been overwritten by the
+        publisher since it was read
+
+        :param packet: RingPacket - packet returned by read()
+
+        :return: bool - True if the payload is still intact
+        '''
+
+        offset = HEADER.size + (packet.seq % self.slots) * self.stride
+        return SEQ.unpack_from(self.buf, offset)[0] == packet.seq
+
+    def close(self):
+        '''
+        Description:
+        ------------
+        Detach from the shared memory block. Payload views returned by read()
+        must be released first
+
+        :return: void
+        '''
+
+        self.buf = None
+        self.shm.close()
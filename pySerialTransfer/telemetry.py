@@ -0,0 +1,398 @@
+'''
+Ring buffers for high-rate telemetry. Each TelemetryRing holds the latest
+samples of one fixed-layout record (a struct format such as '<Ihff' or a
+NumPy structured dtype) in a preallocated byte buffer: received payloads
+are copied straight into the next row, so ingesting a sample creates no
+Python objects. Readers get the latest N samples as a NumPy structured
+array (fields are vectorized columns, e.g. ring.latest(500)['temp']) or,
+without NumPy, as a dict of array.array columns.
+
+    sink = TelemetrySink()
+    imu = sink.register(0x10, '<Ihhh', names=('t', 'x', 'y', 'z'), capacity=10000)
+
+    while True:
+        if link.available():
+            sink.rx(link)
+
+NumPy is optional (pip install pySerialTransfer[numpy]).
+'''
+
+import re
+import struct
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+DEFAULT_CAPACITY = 4096
+
+FIELD_RE = re.compile(r'(\d*)([xcbB?hHiIlLqQefds])')
+
+NUMPY_TYPES = {'c': 'S1', 'b': 'i1', 'B': 'u1', '?': '?', 'h': 'i2', 'H': 'u2', 'i': 'i4', 'I': 'u4',
+               'l': 'i4', 'L': 'u4', 'q': 'i8', 'Q': 'u8', 'e': 'f2', 'f': 'f4', 'd': 'f8'}
+ARRAY_TYPES = {'b': 'b', 'B': 'B', '?': 'B', 'h': 'h', 'H': 'H', 'i': 'i', 'I': 'I', 'l': 'l', 'L': 'L',
+               'q': 'q', 'Q': 'Q', 'e': 'f', 'f': 'f', 'd': 'd'}
+
+
+class InvalidSchema(Exception):
+    pass
+
+
+def parse_format(fmt, names=None):
+    '''
+    Description:
+    ------------
+    Split a struct format into named fields. Formats without a byte order
+    prefix are read as little-endian with no padding (like the Arduino
+    side packs them)
+
+    :param fmt:   str      - struct format
+    :param names: iterable - one name per field ('4s' and '3h' are single
+                             fields), defaults to f0, f1, ...
+
+    :return: tuple - (struct.Struct, list of (name, code, count, offset))
+    :raises InvalidSchema: if the format can't be parsed or names don't match
+    '''
+
+    fmt = fmt.replace(' ', '')
+    prefix = fmt[0] if fmt and fmt[0] in '@=<>!' else '<'
+    body = fmt[1:] if fmt and fmt[0] in '@=<>!' else fmt
+
+    if prefix == '@':
+        raise InvalidSchema('Native alignment (@) is not supported, use <, > or =')
+
+    fields = []
+    pos = 0
+
+    for match in FIELD_RE.finditer(body):
+        if match.start() != pos:
+            break
+
+        count, code = int(match.group(1) or 1), match.group(2)
+        offset = struct.calcsize(prefix + body[:match.start()])
+
+        if code != 'x':
+            fields.append([code, count, offset])
+
+        pos = match.end()
+
+    if pos != len(body) or not fields:
+        raise InvalidSchema('Unsupported struct format "{}"'.format(fmt))
+
+    names = list(names) if names is not None else ['f{}'.format(i) for i in range(len(fields))]
+
+    if len(names) != len(fields):
+        raise InvalidSchema('{} names given for {} fields'.format(len(names), len(fields)))
+
+    return struct.Struct(prefix + body), [(name, code, count, offset)
+                                          for name, (code, count, offset) in zip(names, fields)]
+
+
+def numpy_format(byte_order, code, count):
+    byte_order = '>' if byte_order in '>!' else byte_order
+
+    if code == 's':
+        return 'S{}'.format(count)
+
+    if count == 1:
+        return byte_order + NUMPY_TYPES[code]
+    return '({},){}{}'.format(count, byte_order, NUMPY_TYPES[code])
+
+
+class TelemetryRing:
+    def __init__(self, schema, capacity=DEFAULT_CAPACITY, names=None, use_numpy=None):
+        '''
+        Description:
+        ------------
+        Preallocated ring of fixed-size telemetry records
+
+        :param schema:    str or numpy.dtype - struct format of a record, or a
+                                               structured dtype (needs NumPy)
+        :param capacity:  int      - number of records kept
+        :param names:     iterable - field names for a struct format
+        :param use_numpy: bool     - return NumPy arrays from the readers,
+                                     defaults to True if NumPy is installed
+        :return: void
+        :raises InvalidSchema: if the schema can't be used
+        :raises ValueError: if capacity is less than 1
+        '''
+
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1, got {}'.format(capacity))
+
+        if use_numpy is None:
+            use_numpy = np is not None
+
+        if use_numpy and np is None:
+            raise InvalidSchema('NumPy is not installed')
+
+        if isinstance(schema, str):
+            self.struct, self.fields = parse_format(schema, names)
+            self.record_size = self.struct.size
+            self.dtype = None
+
+            if use_numpy:
+                self.dtype = np.dtype({'names':    [name for name, _, _, _ in self.fields],
+                                       'formats':  [numpy_format(self.struct.format[0], code, count)
+                                                    for _, code, count, _ in self.fields],
+                                       'offsets':  [offset for _, _, _, offset in self.fields],
+                                       'itemsize': self.record_size})
+        else:
+            if np is None:
+                raise InvalidSchema('Structured dtypes need NumPy')
+
+            self.dtype = np.dtype(schema)
+            self.struct = None
+            self.fields = None
+            self.record_size = self.dtype.itemsize
+            use_numpy = True
+
+        self.capacity  = capacity
+        self.use_numpy = use_numpy
+
+        self.buff       = bytearray(capacity * self.record_size)
+        self.timestamps = array('q', bytes(8 * capacity))
+        self.count      = 0
+        self.rejected   = 0
+
+        if use_numpy:
+            self.rows = np.frombuffer(self.buff, self.dtype)
+            self.times = np.frombuffer(self.timestamps, np.int64)
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, payload, timestamp=0):
+        '''
+        Description:
+        ------------
+        Copy the records in a payload into the ring. A payload may hold
+        several back-to-back records, trailing partial records are ignored
+
+        :param payload:   bytes-like - received payload
+        :param timestamp: int        - receive time in ns, given to every
+                                       record of the payload
+
+        :return: int - number of records stored
+        '''
+
+        size = self.record_size
+        num_records = len(payload) // size
+
+        if not num_records:
+            self.rejected += 1
+            return 0
+
+        payload = memoryview(payload)
+        index = self.count % self.capacity
+        done = 0
+
+        while done < num_records:
+            rows = min(num_records - done, self.capacity - index)
+            start = index * size
+            self.buff[start:start + rows * size] = payload[done * size:(done + rows) * size]
+            self.timestamps[index:index + rows] = array('q', [timestamp]) * rows
+
+            done += rows
+            index = (index + rows) % self.capacity
+
+        self.count += num_records
+        return num_records
+
+    def indices(self, n=None):
+        # Ring rows of the latest n records, oldest first, as up to two slices
+        n = len(self) if n is None else min(n, len(self))
+        end = self.count % self.capacity
+        start = end - n
+
+        if start >= 0:
+            return [slice(start, end)]
+        return [slice(self.capacity + start, self.capacity), slice(0, end)]
+
+    def latest(self, n=None):
+        '''
+        Description:
+        ------------
+        The latest n records, oldest first. The result is a copy, so it
+        stays valid while the ring keeps filling
+
+        :param n: int - number of records, None for all stored records
+
+        :return: numpy.ndarray or dict - structured array with NumPy, else a
+                                         dict of field name -> array.array
+                                         ('s' and repeated fields give lists)
+        '''
+
+        parts = self.indices(n)
+
+        if self.use_numpy:
+            if len(parts) == 1:
+                return self.rows[parts[0]].copy()
+            return np.concatenate([self.rows[part] for part in parts])
+
+        size = self.record_size
+        data = b''.join(self.buff[part.start * size:part.stop * size] for part in parts)
+        columns = list(zip(*self.struct.iter_unpack(data)))
+        result = {}
+        col = 0
+
+        for name, code, count, _ in self.fields:
+            width = 1 if code == 's' else count
+
+            if not columns:
+                values = []
+            elif width > 1:
+                values = list(zip(*columns[col:col + width]))
+            else:
+                values = columns[col]
+
+            if code in 'sc' or width > 1:
+                result[name] = list(values)
+            else:
+                result[name] = array(ARRAY_TYPES[code], values)
+
+            col += width
+
+        return result
+
+    def latest_timestamps(self, n=None):
+        '''
+        Description:
+        ------------
+        Receive times of the latest n records, oldest first
+
+        :param n: int - number of records, None for all stored records
+
+        :return: numpy.ndarray or array.array - timestamps in ns
+        '''
+
+        parts = self.indices(n)
+
+        if self.use_numpy:
+            return np.concatenate([self.times[part] for part in parts])
+
+        out = array('q')
+
+        for part in parts:
+            out.extend(self.timestamps[part])
+        return out
+
+    def column(self, name, n=None):
+        '''
+        Description:
+        ------------
+        One field of the latest n records
+
+        :param name: str - field name
+        :param n:    int - number of records, None for all stored records
+
+        :return: numpy.ndarray or array.array - field values, oldest first
+        '''
+
+        return self.latest(n)[name]
+
+    def clear(self):
+        '''
+        Description:
+        ------------
+        Forget all stored records
+
+        :return: void
+        '''
+
+        self.count = 0
+
+
+class TelemetrySink:
+    def __init__(self):
+        '''
+        Description:
+        ------------
+        Routes received packets to the TelemetryRing registered for their ID
+
+        :return: void
+        '''
+
+        self.rings   = {}
+        self.ignored = 0
+
+    def register(self, packet_id, schema, capacity=DEFAULT_CAPACITY, names=None, use_numpy=None):
+        '''
+        Description:
+        ------------
+        Store packets with the given ID in a new ring
+
+        :param packet_id: int - ID of the telemetry packets
+        :param schema:    str or numpy.dtype - record layout (see TelemetryRing)
+        :param capacity:  int      - number of records kept
+        :param names:     iterable - field names for a struct format
+        :param use_numpy: bool     - return NumPy arrays from the readers
+
+        :return: TelemetryRing - the ring
+        '''
+
+        ring = TelemetryRing(schema, capacity, names, use_numpy)
+        self.rings[packet_id] = ring
+        return ring
+
+    def feed(self, packet_id, payload, timestamp=0):
+        '''
+        Description:
+        ------------
+        Store a packet if a ring is registered for its ID
+
+        :param packet_id: int        - ID of the packet
+        :param payload:   bytes-like - payload
+        :param timestamp: int        - receive time in ns
+
+        :return: int - number of records stored
+        '''
+
+        ring = self.rings.get(packet_id)
+
+        if ring is None:
+            self.ignored += 1
+            return 0
+
+        return ring.append(payload, timestamp)
+
+    def rx(self, link):
+        '''
+        Description:
+        ------------
+        Store the packet last received by a link (call after available()
+        reported new data). The payload is copied without being decoded:
+        straight from the pooled buffer if the link has a packet pool (see
+        SerialTransfer.enable_packet_pool), otherwise the RX buffer (a list)
+        is first converted to a bytes object - a per-sample allocation
+
+        :param link: SerialTransfer - link that received the packet
+
+        :return: int - number of records stored
+        '''
+
+        ring = self.rings.get(link.id_byte)
+
+        if ring is None:
+            self.ignored += 1
+            return 0
+
+        if link.rx_handle is not None:
+            return ring.append(link.rx_handle.payload, link.rx_timestamp)
+        return ring.append(bytes(link.rx_buff[:link.bytes_read]), link.rx_timestamp)
+
+    def consume(self, batch):
+        '''
+        Description:
+        ------------
+        Store a batch from SerialTransfer.packet_batches()
+
+        :param batch: list - Packet tuples (id, payload, timestamp)
+
+        :return: int - number of records stored
+        '''
+
+        return sum(self.feed(packet.id, packet.payload, packet.timestamp) for packet in batch)
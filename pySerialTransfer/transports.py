@@ -0,0 +1,367 @@
+'''
+Network transports for SerialTransfer, selected by URL:
+
+    socket://host:port   - TCP (ser2net, ESP32 WiFi/Ethernet bridges, etc)
+    udp://host:port      - UDP, one or more whole frames per datagram
+    unix:///path/to/sock - Unix domain stream socket
+    rfc2217://host:port  - Telnet COM port control, handled by pySerial
+
+Each transport exposes the subset of the pySerial Serial API that
+SerialTransfer uses (open/close/is_open, in_waiting, read, write), so
+frames run over them unchanged. Socket options are given as query
+parameters, e.g. socket://10.0.0.7:4000?coalesce=1460&bufsize=65536:
+
+    nodelay  - 1 (default) disables Nagle's algorithm on TCP sockets so
+               every frame leaves immediately
+    coalesce - gather writes until this many bytes are pending, the link
+               is next polled for received data or the oldest pending byte
+               has waited delay seconds, and send them together. 0
+               (default) sends every write immediately
+    delay    - longest time (in s) a coalesced write is held back (default
+               0.001)
+    bufsize  - kernel send/receive buffer size in bytes
+    bind     - local UDP port to receive on (default: any free port)
+
+The baud rate given to SerialTransfer is kept as the transport's baudrate,
+the nominal line rate of the serial port behind the bridge, so a TxScheduler
+can pace frames to it.
+'''
+
+import logging
+import select
+import socket
+import threading
+import time
+from urllib.parse import urlsplit, parse_qs
+
+import serial
+
+
+DEFAULT_BUFFER_SIZE    = 1 << 20
+DEFAULT_COALESCE_DELAY = 0.001
+RECV_SIZE              = 1 << 16
+MAX_DATAGRAM           = 65507
+
+
+class SocketTransport:
+    family    = socket.AF_INET
+    sock_type = socket.SOCK_STREAM
+
+    def __init__(self, url, timeout=0.05, write_timeout=None, baudrate=None):
+        '''
+        Description:
+        ------------
+        Base class of the socket based transports - use transport_for_url()
+        to create one
+
+        :param url:           str   - transport URL
+        :param timeout:       float - maximum wait (in s) for read() when no
+                                      data is waiting
+        :param write_timeout: float - maximum wait (in s) for a write, None
+                                      to block until the data is sent
+        :param baudrate:      int   - nominal line rate of the remote serial
+                                      port (not applied to the socket), None
+                                      if unknown
+        :return: void
+        '''
+
+        parts   = urlsplit(url)
+        options = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+
+        self.port          = url
+        self.baudrate      = baudrate
+        self.timeout       = timeout
+        self.write_timeout = write_timeout
+        self.address       = self.parse_address(parts)
+        self.nodelay       = options.get('nodelay', '1') != '0'
+        self.coalesce      = int(options.get('coalesce', 0))
+        self.delay         = float(options.get('delay', DEFAULT_COALESCE_DELAY))
+        self.buffer_size   = int(options.get('bufsize', DEFAULT_BUFFER_SIZE))
+        self.options       = options
+
+        self.sock    = None
+        self.rx_buff = bytearray()
+        self.pending = bytearray()
+
+        self.cond     = threading.Condition()
+        self.deadline = 0
+        self.running  = False
+        self.flusher  = None
+
+    @staticmethod
+    def parse_address(parts):
+        if not parts.hostname or not parts.port:
+            raise ValueError('Expected host:port in transport URL')
+        return (parts.hostname, parts.port)
+
+    @property
+    def is_open(self):
+        return self.sock is not None
+
+    def configure(self, sock):
+        for option in (socket.SO_SNDBUF, socket.SO_RCVBUF):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, option, self.buffer_size)
+            except OSError:
+                pass
+
+    def open(self):
+        '''
+        Description:
+        ------------
+        Connect the socket
+
+        :return: void
+        :raises serial.SerialException: if the connection fails
+        '''
+
+        sock = socket.socket(self.family, self.sock_type)
+
+        try:
+            self.configure(sock)
+            sock.settimeout(self.write_timeout)
+            sock.connect(self.address)
+        except OSError as e:
+            sock.close()
+            raise serial.SerialException('Could not connect to {}: {}'.format(self.port, e))
+
+        self.sock = sock
+        self.rx_buff.clear()
+        self.pending.clear()
+
+        if self.coalesce and self.flusher is None:
+            self.running = True
+            self.flusher = threading.Thread(target=self.run, name='SocketTransportFlush', daemon=True)
+            self.flusher.start()
+
+    def close(self):
+        '''
+        Description:
+        ------------
+        Send any coalesced writes and close the socket
+
+        :return: void
+        '''
+
+        if self.flusher is not None:
+            with self.cond:
+                self.running = False
+                self.cond.notify_all()
+
+            self.flusher.join()
+            self.flusher = None
+
+        if self.sock is not None:
+            try:
+                self.flush()
+            except serial.SerialException:
+                pass
+
+            if self.sock is not None:
+                self.sock.close()
+                self.sock = None
+
+    def disconnect(self):
+        self.sock.close()
+        self.sock = None
+
+    def fill(self, wait=0):
+        '''
+        Description:
+        ------------
+        Move received data from the socket into the RX buffer
+
+        :param wait: float - maximum time (in s) to wait for data
+
+        :return: void
+        '''
+
+        if self.sock is None or not select.select([self.sock], [], [], wait)[0]:
+            return
+
+        try:
+            chunk = self.sock.recv(RECV_SIZE)
+        except OSError as e:
+            self.disconnect()
+            raise serial.SerialException('Connection to {} lost: {}'.format(self.port, e))
+
+        if chunk:
+            self.rx_buff += chunk
+        elif self.sock_type == socket.SOCK_STREAM:
+            # Peer closed the connection - open() reconnects
+            self.disconnect()
+
+    @property
+    def in_waiting(self):
+        self.flush()
+        self.fill()
+        return len(self.rx_buff)
+
+    def read(self, size=1):
+        '''
+        Description:
+        ------------
+        Read up to size bytes, waiting up to timeout if none are buffered
+
+        :param size: int - maximum number of bytes to read
+
+        :return: bytes - received bytes
+        '''
+
+        if not self.rx_buff:
+            self.fill(self.timeout)
+
+        data = bytes(self.rx_buff[:size])
+        del self.rx_buff[:size]
+        return data
+
+    def write(self, data):
+        '''
+        Description:
+        ------------
+        Send data, or queue it if write coalescing is enabled
+
+        :param data: bytes-like - data to send
+
+        :return: int - number of bytes written or queued
+        '''
+
+        with self.cond:
+            if self.sock is None:
+                raise serial.PortNotOpenError()
+
+            if not self.pending:
+                self.deadline = time.monotonic() + self.delay
+                self.cond.notify()
+
+            self.pending += data
+
+            if len(self.pending) >= self.coalesce:
+                self.flush()
+
+        return len(data)
+
+    def flush(self):
+        '''
+        Description:
+        ------------
+        Send all coalesced writes
+
+        :return: void
+        '''
+
+        with self.cond:
+            if not self.pending or self.sock is None:
+                return
+
+            data = bytes(self.pending)
+            self.pending.clear()
+
+            try:
+                self.send(data)
+            except OSError as e:
+                self.disconnect()
+                raise serial.SerialException('Write to {} failed: {}'.format(self.port, e))
+
+    def send(self, data):
+        self.sock.sendall(data)
+
+    def run(self):
+        # Sends coalesced writes whose delay ran out while the link wasn't
+        # polled or written to
+        with self.cond:
+            while self.running:
+                if not self.pending:
+                    self.cond.wait()
+                    continue
+
+                remaining = self.deadline - time.monotonic()
+
+                if remaining > 0:
+                    self.cond.wait(remaining)
+                    continue
+
+                try:
+                    self.flush()
+                except serial.SerialException as e:
+                    logging.error('{}'.format(e))
+
+
+class TcpTransport(SocketTransport):
+    def configure(self, sock):
+        super().configure(sock)
+
+        if self.nodelay:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class UnixTransport(SocketTransport):
+    family = getattr(socket, 'AF_UNIX', None)
+
+    @staticmethod
+    def parse_address(parts):
+        if not parts.path:
+            raise ValueError('Expected a socket path in transport URL')
+        return parts.path
+
+
+class UdpTransport(SocketTransport):
+    sock_type = socket.SOCK_DGRAM
+
+    def configure(self, sock):
+        super().configure(sock)
+        sock.bind(('', int(self.options.get('bind', 0))))
+
+    def send(self, data):
+        # Frames never straddle datagrams as long as coalesce <= MAX_DATAGRAM
+        for start in range(0, len(data), MAX_DATAGRAM):
+            self.sock.send(data[start:start + MAX_DATAGRAM])
+
+
+TRANSPORTS = {'socket': TcpTransport,
+              'tcp':    TcpTransport,
+              'udp':    UdpTransport,
+              'unix':   UnixTransport}
+
+
+def is_url(port):
+    '''
+    Description:
+    ------------
+    Whether a port name is a transport URL rather than a serial port
+
+    :param port: int or str - port name
+
+    :return: bool - True for URLs such as socket://host:port
+    '''
+
+    return isinstance(port, str) and '://' in port
+
+
+def transport_for_url(url, baud=115200, timeout=0.05, write_timeout=None):
+    '''
+    Description:
+    ------------
+    Create an unopened connection for a transport URL. Schemes without a
+    native transport (rfc2217://, loop://, ...) are handed to
+    serial.serial_for_url()
+
+    :param url:           str   - transport URL
+    :param baud:          int   - baud rate of serial based URLs, the
+                                    nominal rate of socket transports
+    :param timeout:       float - read timeout (in s)
+    :param write_timeout: float - write timeout (in s)
+
+    :return: SocketTransport or serial.SerialBase - connection
+    '''
+
+    scheme = url.split('://', 1)[0].lower()
+
+    if scheme in TRANSPORTS:
+        return TRANSPORTS[scheme](url, timeout, write_timeout, baud)
+
+    connection = serial.serial_for_url(url, do_not_open=True)
+    connection.baudrate = baud
+    connection.timeout = timeout
+    connection.write_timeout = write_timeout
+    return connection
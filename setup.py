@@ -18,6 +18,7 @@ setup(
     classifiers      = [],
     install_requires = ['pyserial'],
     extras_require   = {
+        'numpy': ['numpy'],
         'dev': [
             'pytest>=8.1.1',
             'pytest-cov>=5.0.0',
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from pySerialTransfer import binpack
+from pySerialTransfer.binpack import BinpackError, pack, unpack
+
+
+@pytest.mark.parametrize('val', [
+    None,
+    True,
+    False,
+    0,
+    127,
+    128,
+    -1,
+    -32,
+    -33,
+    2 ** 40,
+    -(2 ** 40),
+    1.5,
+    1.23,
+    '',
+    'a',
+    'x' * 40,
+    'ünïcödé',
+    b'\x00\x7e\x81',
+    [],
+    [1, 'two', 3.0, None, [True, False]],
+    {'nested': {'list': list(range(20)), 'map': {str(i): i for i in range(20)}}},
+])
+def test_round_trip(val):
+    """Test that every supported value survives an encode/decode round trip"""
+    encoded = pack(val)
+    decoded, end = unpack(encoded)
+    assert decoded == val
+    assert end == len(encoded)
+
+
+def test_tuple_decodes_as_list():
+    decoded, _ = unpack(pack((1, 2, 3)))
+    assert decoded == [1, 2, 3]
+
+
+def test_small_ints_take_one_byte():
+    assert len(pack(5)) == 1
+    assert len(pack(-5)) == 1
+
+
+def test_float32_used_when_exact():
+    assert len(pack(0.5)) == 5
+    assert len(pack(0.1)) == 9
+
+
+def test_repeated_strings_use_table_refs():
+    """Test that repeated keys are replaced by two byte string table references"""
+    records = [{'temp': i, 'state': 'ok'} for i in range(5)]
+    encoded = pack(records)
+    assert encoded.count(b'temp') == 1
+    assert encoded.count(b'state') == 1
+    assert unpack(encoded)[0] == records
+
+
+STATUS = {'mode': 'run', 'temp': 23.5, 'rpm': 1200, 'ok': True, 'err': 0, 'seq': 42}
+
+
+def test_smaller_than_json():
+    assert len(pack(STATUS)) * 1.8 <= len(json.dumps(STATUS))
+
+
+def test_shared_strings():
+    """Test that strings shared in advance are never sent and still decode"""
+    shared = list(STATUS.keys()) + ['run']
+    encoded = pack(STATUS, shared)
+    assert b'mode' not in encoded
+    assert len(encoded) * 2.5 <= len(json.dumps(STATUS))
+    assert unpack(encoded, shared_strings=shared)[0] == STATUS
+
+
+def test_duplicate_shared_strings_raise():
+    """Test that a shared string listed twice is rejected instead of decoding to the wrong string"""
+    shared = ['mode', 'temp', 'mode']
+
+    with pytest.raises(BinpackError):
+        pack(STATUS, shared)
+
+    with pytest.raises(BinpackError):
+        unpack(pack(STATUS, shared[:2]), shared_strings=shared)
+
+
+def test_unpack_from_list_with_offset():
+    """Test decoding directly out of a list based buffer at an offset"""
+    encoded = pack({'a': [1, 2]})
+    buff = [0, 0] + list(encoded) + [' '] * 4
+    decoded, end = unpack(buff, 2)
+    assert decoded == {'a': [1, 2]}
+    assert end == 2 + len(encoded)
+
+
+def test_unsupported_type_raises():
+    with pytest.raises(BinpackError):
+        pack(object())
+
+
+@pytest.mark.parametrize('encoded', [
+    bytes([binpack.FIXSTR | 5, 0x61]),
+    bytes([0xC1]),
+    bytes([binpack.FLOAT32, 0x00]),
+])
+def test_malformed_payload_raises(encoded):
+    with pytest.raises(BinpackError):
+        unpack(encoded)
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import os
+import queue
+import tempfile
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from pySerialTransfer.broker import Broker, BrokerClient, ClientConnection
+from pySerialTransfer.pySerialTransfer import Status, MAX_PACKET_SIZE
+
+
+class FakeLink:
+    """Stands in for SerialTransfer: available() pops packets from a queue, send() records frames"""
+
+    def __init__(self):
+        self.incoming = queue.Queue()
+        self.sent = queue.Queue()
+        self.rx_buff = [0] * MAX_PACKET_SIZE
+        self.tx_buff = [0] * MAX_PACKET_SIZE
+        self.id_byte = 0
+        self.bytes_read = 0
+        self.status = Status.NO_DATA
+
+    def open(self):
+        return True
+
+    def close(self):
+        pass
+
+    def available(self):
+        try:
+            self.id_byte, payload = self.incoming.get_nowait()
+        except queue.Empty:
+            self.status = Status.NO_DATA
+            return 0
+
+        self.rx_buff[:len(payload)] = payload
+        self.bytes_read = len(payload)
+        self.status = Status.NEW_DATA
+        return self.bytes_read
+
+    def tx_struct_obj(self, val_bytes, start_pos=0):
+        self.tx_buff[start_pos:start_pos + len(val_bytes)] = val_bytes
+        return start_pos + len(val_bytes)
+
+    def send(self, message_len, packet_id=0):
+        self.sent.put((packet_id, bytes(self.tx_buff[:message_len])))
+        return True
+
+
+@pytest.fixture
+def broker():
+    links = [FakeLink(), FakeLink()]
+    path = os.path.join(tempfile.mkdtemp(), 'broker.sock')
+    broker = Broker(links, path, max_queue=4)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(broker.start())
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait(5)
+    yield broker
+
+    asyncio.run_coroutine_threadsafe(broker.stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+
+def wait_for_subscribers(broker, count):
+    for _ in range(500):
+        if sum(len(c.subscriptions) for c in broker.clients) >= count:
+            return
+        threading.Event().wait(0.01)
+
+
+def test_server_side_filtering(broker):
+    """Test that each client only receives the IDs it subscribed to"""
+    a = BrokerClient(broker.socket_path, timeout=2)
+    b = BrokerClient(broker.socket_path, timeout=2)
+    a.subscribe([1])
+    b.subscribe(None, port=1)
+    wait_for_subscribers(broker, 2)
+
+    broker.links[0].incoming.put((2, b'skip'))
+    broker.links[0].incoming.put((1, b'one'))
+    broker.links[1].incoming.put((9, b'nine'))
+
+    assert a.recv() == (0, 1, b'one')
+    assert b.recv() == (1, 9, b'nine')
+    assert a.recv(timeout=0.1) is None
+    a.close()
+    b.close()
+
+
+def test_send_through_broker(broker):
+    client = BrokerClient(broker.socket_path)
+    client.send(b'\x01\x02', packet_id=5, port=1)
+    assert broker.links[1].sent.get(timeout=2) == (5, b'\x01\x02')
+    client.close()
+
+
+def test_oversized_payload_is_dropped(broker, caplog):
+    """Test that payloads that don't fit in a packet are logged and dropped instead of being cut"""
+    client = BrokerClient(broker.socket_path)
+
+    with caplog.at_level(logging.ERROR):
+        client.send(bytes(MAX_PACKET_SIZE + 1), packet_id=5, port=1)
+        client.send(bytes(MAX_PACKET_SIZE), packet_id=6, port=1)
+        assert broker.links[1].sent.get(timeout=2) == (6, bytes(MAX_PACKET_SIZE))
+
+    assert 'Dropped {} byte payload'.format(MAX_PACKET_SIZE + 1) in caplog.text
+    client.close()
+
+
+def test_client_writer_errors_are_logged(caplog):
+    broker = Broker([FakeLink()], 'unused')
+    client = ClientConnection(writer=MagicMock(), max_queue=4)
+
+    async def fail():
+        raise RuntimeError('write failed')
+
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(fail())
+    loop.run_until_complete(asyncio.wait([task]))
+    loop.close()
+
+    with caplog.at_level(logging.ERROR):
+        broker.client_writer_done(client, task)
+
+    assert 'write failed' in caplog.text
+    client.writer.close.assert_called_once()
+
+
+def test_slow_send_does_not_block_clients(broker):
+    """Test that packets keep flowing to clients while a port is busy writing"""
+    link = broker.links[1]
+    release = threading.Event()
+    record = link.send
+    link.send = lambda message_len, packet_id=0: release.wait(5) and record(message_len, packet_id)
+
+    client = BrokerClient(broker.socket_path, timeout=2)
+    client.subscribe(None, port=0)
+    wait_for_subscribers(broker, 1)
+
+    client.send(b'slow', packet_id=1, port=1)
+    client.send(b'next', packet_id=2, port=1)
+    broker.links[0].incoming.put((3, b'rx'))
+    assert client.recv() == (0, 3, b'rx')
+
+    release.set()
+    assert link.sent.get(timeout=2) == (1, b'slow')
+    assert link.sent.get(timeout=2) == (2, b'next')
+    client.close()
+
+
+def test_slow_client_drops_oldest():
+    """Test that a client that isn't reading loses its oldest messages instead of stalling the readers"""
+    client = ClientConnection(writer=None, max_queue=4)
+
+    for i in range(10):
+        client.enqueue(bytes([i]))
+
+    assert list(client.queue) == [bytes([i]) for i in range(6, 10)]
+    assert client.dropped == 6
+    assert client.ready.is_set()
+
+
+def test_subscriptions():
+    client = ClientConnection(writer=None, max_queue=4)
+    assert not client.wants(0, 1)
+    client.subscriptions[0] = {1, 2}
+    client.subscriptions[1] = None
+    assert client.wants(0, 1)
+    assert not client.wants(0, 3)
+    assert client.wants(1, 200)
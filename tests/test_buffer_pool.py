@@ -0,0 +1,172 @@
+import threading
+
+import pytest
+
+from pySerialTransfer.buffer_pool import (
+    InvalidPolicy,
+    PacketPool,
+    POLICY_BLOCK,
+    POLICY_DROP,
+)
+from pySerialTransfer.emulator import pipe
+from pySerialTransfer.framing import FrameDecoder, FrameEncoder
+from pySerialTransfer.pySerialTransfer import SerialTransfer, Status
+
+
+def test_fill_and_release():
+    pool = PacketPool(count=2, size=8)
+    handle = pool.fill(3, b'abc', timestamp=42)
+    assert (handle.id, handle.length, handle.timestamp) == (3, 3, 42)
+    assert bytes(handle.payload) == b'abc'
+    assert pool.in_use == 1
+
+    handle.release()
+    handle.release()  # double release is harmless
+    assert pool.in_use == 0
+    assert pool.released == 1
+
+
+def test_buffers_are_reused():
+    """Test that steady state reception cycles through the same preallocated handles"""
+    pool = PacketPool(count=2, size=8)
+    seen = set()
+
+    for i in range(10):
+        with pool.fill(i, bytes([i])) as handle:
+            seen.add(id(handle))
+            seen.add(id(handle.buffer))
+
+    assert len(seen) == 2
+    assert pool.high_water == 1
+
+
+def test_drop_policy():
+    pool = PacketPool(count=1, policy=POLICY_DROP)
+    assert pool.fill(0, b'a') is not None
+    assert pool.fill(0, b'b') is None
+    assert pool.dropped == 1
+
+
+def test_block_policy_waits_for_release():
+    pool = PacketPool(count=1, policy=POLICY_BLOCK, timeout=2)
+    first = pool.fill(0, b'a')
+    threading.Timer(0.05, first.release).start()
+    second = pool.fill(1, b'b')
+    assert second is first
+    assert bytes(second.payload) == b'b'
+    assert pool.blocked == 1
+    assert pool.dropped == 0
+
+
+def test_block_policy_timeout_drops():
+    pool = PacketPool(count=1, policy=POLICY_BLOCK, timeout=0.01)
+    pool.fill(0, b'a')
+    assert pool.fill(0, b'b') is None
+    assert pool.dropped == 1
+
+
+def test_truncation_and_invalid_policy():
+    pool = PacketPool(count=1, size=4)
+    assert bytes(pool.fill(0, b'abcdef').payload) == b'abcd'
+
+    with pytest.raises(InvalidPolicy):
+        PacketPool(policy='nope')
+
+    # Blocking without a timeout would hang a thread that holds every buffer
+    with pytest.raises(InvalidPolicy):
+        PacketPool(policy=POLICY_BLOCK)
+
+
+def test_capture_from_link():
+    class Link:
+        id_byte = 5
+        bytes_read = 2
+        rx_buff = [9, 8, 7, ' ']
+
+    handle = PacketPool().capture(Link)
+    assert handle.id == 5
+    assert bytes(handle.payload) == b'\x09\x08'
+
+
+def test_payload_view_is_not_recreated():
+    pool = PacketPool(count=1, size=8)
+    handle = pool.fill(0, b'abc')
+    assert handle.payload is handle.payload
+
+
+def test_decoder_fills_free_pooled_buffers():
+    """Test that the decoder copies payloads into free buffers and falls back to bytes without dropping"""
+    pool = PacketPool(count=2)
+    encoder = FrameEncoder()
+    decoder = FrameDecoder(pool=pool)
+    frames = decoder.feed(encoder.encode(b'\x7E\x01', 3) + encoder.encode(b'xy', 4) + encoder.encode(b'z', 5), 7)
+
+    assert [f.payload for f in frames[:2]] == pool.handles
+    assert [(f.id, bytes(f.payload.payload), f.timestamp) for f in frames[:2]] == [(3, b'\x7E\x01', 7), (4, b'xy', 7)]
+    assert frames[2] == (5, b'z', 7)
+    assert (decoder.frames, pool.dropped) == (3, 0)
+
+
+def make_link():
+    host_end, device_end = pipe()
+    tx = SerialTransfer('pipe', restrict_ports=False, debug=False)
+    rx = SerialTransfer('pipe', restrict_ports=False, debug=False)
+    tx.connection = host_end
+    rx.connection = device_end
+    return tx, rx
+
+
+def send(link, payload, packet_id=0):
+    link.tx_buff[:len(payload)] = payload
+    return link.send(len(payload), packet_id)
+
+
+def test_link_hands_out_pooled_packets():
+    """Test that steady state reception through a link cycles through the pool without leaking buffers"""
+    tx, rx = make_link()
+    pool = rx.enable_packet_pool(count=4)
+
+    for i in range(20):
+        send(tx, bytes([i, i + 1]), i)
+    kept = []
+
+    while rx.available():
+        assert bytes(rx.rx_handle.payload) == bytes([rx.id_byte, rx.id_byte + 1])
+        assert rx.rx_handle.timestamp == rx.rx_timestamp
+
+        if rx.id_byte in (5, 6):
+            kept.append(rx.take_handle())
+
+    assert [bytes(h.payload) for h in kept] == [b'\x05\x06', b'\x06\x07']
+    assert pool.dropped == 0
+    assert pool.in_use == len(kept) + 1
+
+    for handle in kept:
+        handle.release()
+    rx.disable_packet_pool()
+    assert pool.in_use == 0
+
+
+def test_link_pool_exhaustion_drops_packets():
+    """Test that the drop policy applies once the application holds every buffer"""
+    tx, rx = make_link()
+    pool = rx.enable_packet_pool(count=2)
+
+    for i in range(4):
+        send(tx, bytes([i]), 1)
+
+    assert rx.available()
+    first = rx.take_handle()
+    assert rx.available()
+    second = rx.take_handle()
+
+    assert rx.available() == 0
+    assert rx.status == Status.CONTINUE
+    assert rx.available() == 0
+    assert (bytes(first.payload), bytes(second.payload), pool.dropped) == (b'\x00', b'\x01', 2)
+
+    first.release()
+    send(tx, b'\x04', 1)
+    assert rx.available()
+    assert rx.rx_handle is first
+    assert bytes(first.payload) == b'\x04'
@@ -0,0 +1,68 @@
+import random
+from unittest.mock import MagicMock
+
+import pytest
+
+from pySerialTransfer.clock_sync import CLOCK_SYNC_ID, REPLY, REQUEST, ClockSync
+
+
+OFFSET_NS = 5_000_000_000
+DRIFT = 50e-6  # device clock runs 50 ppm fast
+
+
+def device_ns(host_ns):
+    return host_ns * (1 + DRIFT) + OFFSET_NS
+
+
+def run_exchanges(sync, count=40, seed=1):
+    rng = random.Random(seed)
+    host = 1_000_000_000
+
+    for _ in range(count):
+        t1 = host
+        up = 200_000 + rng.expovariate(1 / 200_000)  # 0.2 ms wire + random queueing
+        down = 200_000 + rng.expovariate(1 / 200_000)
+        t2 = device_ns(t1 + up) / sync.device_tick_ns
+        t3 = device_ns(t1 + up + 50_000) / sync.device_tick_ns
+        t4 = t1 + up + 50_000 + down
+        sync.add_sample(t1, int(t2), int(t3), int(t4))
+        host += 1_000_000_000
+
+
+def test_offset_and_drift_estimate():
+    sync = ClockSync(MagicMock(), device_tick_ns=1000)
+    assert not sync.synced
+    assert sync.to_host(0) is None
+
+    run_exchanges(sync)
+    host = 30_000_000_000
+    assert sync.drift_ppm == pytest.approx(50, abs=10)
+    assert abs(sync.to_host(device_ns(host) / 1000) - host) <= sync.error_ns + 1000
+    assert sync.to_device(host) == pytest.approx(device_ns(host) / 1000, abs=(sync.error_ns + 1000) / 1000)
+
+
+def test_sample_window_is_bounded():
+    sync = ClockSync(MagicMock(), max_samples=8)
+    run_exchanges(sync, count=20)
+    assert len(sync.samples) == 8
+
+
+def test_request_and_reply():
+    """Test the request/reply exchange over a link"""
+    link = MagicMock()
+    link.tx_struct_obj.side_effect = lambda val_bytes: len(val_bytes)
+    sync = ClockSync(link)
+    sync.request()
+
+    sent = link.tx_struct_obj.call_args[0][0]
+    seq, t1 = REQUEST.unpack(sent)
+    link.send.assert_called_once_with(REQUEST.size, CLOCK_SYNC_ID)
+
+    link.rx_buff = list(REPLY.pack(seq, t1, 10, 20))
+    link.bytes_read = REPLY.size
+    link.rx_timestamp = t1 + 1_000_000
+    assert sync.handle_reply()
+    assert sync.synced
+
+    link.rx_buff = list(REPLY.pack(seq + 1, t1, 10, 20))
+    assert not sync.handle_reply()  # stale sequence number
@@ -0,0 +1,135 @@
+import threading
+import time
+
+from pySerialTransfer.pySerialTransfer import SerialTransfer
+from pySerialTransfer.coalesce import WriteCoalescer
+from pySerialTransfer.emulator import pipe
+from pySerialTransfer.scheduler import TxScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_pair():
+    host_end, device_end = pipe()
+    writes = []
+    write = host_end.write
+    host_end.write = lambda data: writes.append(bytes(data)) or write(data)
+
+    tx = SerialTransfer('pipe', restrict_ports=False, debug=False)
+    rx = SerialTransfer('pipe', restrict_ports=False, debug=False)
+    tx.connection = host_end
+    rx.connection = device_end
+    return tx, rx, writes
+
+
+def send(link, payload, packet_id=0):
+    link.tx_buff[:len(payload)] = payload
+    return link.send(len(payload), packet_id)
+
+
+def receive(link):
+    packets = []
+    while link.available():
+        packets.append((link.id_byte, bytes(link.rx_buff[:link.bytes_read])))
+    return packets
+
+
+def test_frames_are_written_together():
+    tx, rx, writes = make_pair()
+    coalescer = tx.enable_write_coalescing(max_bytes=100, max_delay=10)
+
+    for i in range(20):
+        send(tx, bytes([i, 0x7E]), i)
+
+    # Each frame is 8 bytes, so the buffer is written every 13 frames
+    assert [len(data) for data in writes] == [104]
+    tx.flush()
+
+    assert len(writes) == 2
+    assert receive(rx) == [(i, bytes([i, 0x7E])) for i in range(20)]
+    assert (coalescer.frames, coalescer.writes, coalescer.size_flushes, coalescer.explicit_flushes) == (20, 2, 1, 1)
+    tx.disable_write_coalescing()
+    assert tx.tx_coalescer is None
+
+
+def test_deadline_is_checked_on_write():
+    tx, rx, writes = make_pair()
+    clock = FakeClock()
+    coalescer = WriteCoalescer(tx, max_bytes=1000, max_delay=0.001, clock=clock)
+    tx.tx_coalescer = coalescer
+
+    send(tx, b'a')
+    clock.now = 0.0005
+    send(tx, b'b')
+    assert writes == []
+
+    clock.now = 0.001
+    send(tx, b'c')
+    assert len(writes) == 1
+    assert [payload for _, payload in receive(rx)] == [b'a', b'b', b'c']
+    assert coalescer.timer_flushes == 1
+
+
+def test_deadline_thread_writes_idle_buffer():
+    tx, rx, writes = make_pair()
+    coalescer = tx.enable_write_coalescing(max_bytes=1000, max_delay=0.002)
+
+    send(tx, b'abc', 1)
+    send(tx, b'def', 2)
+    assert writes == []
+
+    for _ in range(200):
+        if writes:
+            break
+        time.sleep(0.001)
+
+    assert len(writes) == 1
+    assert receive(rx) == [(1, b'abc'), (2, b'def')]
+    assert coalescer.timer_flushes == 1
+    tx.disable_write_coalescing()
+
+
+def test_threads_share_the_buffer():
+    tx, rx, writes = make_pair()
+    tx.enable_write_coalescing(max_bytes=256, max_delay=0.001)
+    frames = {n: [tx.prepare_frame(bytes([n, i]), n) for i in range(50)] for n in range(4)}
+
+    def sender(packet_id):
+        for prepared in frames[packet_id]:
+            tx.send_frame(prepared)
+
+    threads = [threading.Thread(target=sender, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    tx.close()
+
+    packets = receive(rx)
+    assert len(packets) == 200
+    for n in range(4):
+        assert [payload[1] for packet_id, payload in packets if packet_id == n] == list(range(50))
+    assert len(writes) < 200
+    assert tx.tx_coalescer is None
+
+
+def test_scheduler_bypasses_the_buffer():
+    tx, rx, writes = make_pair()
+    tx.connection.baudrate = 1000000
+    tx.enable_write_coalescing(max_bytes=1000, max_delay=10)
+    send(tx, b'first', 1)
+
+    sched = TxScheduler(tx)
+    sched.start()
+    send(tx, b'second', 2)
+    assert sched.flush(1)
+    sched.stop()
+
+    assert receive(rx) == [(1, b'first'), (2, b'second')]
+    assert len(writes) == 2
@@ -0,0 +1,54 @@
+import pytest
+
+from pySerialTransfer.compression import COMPRESSED_FLAG, HEADER_LEN, PayloadCompressor
+
+
+TEXT = (b'Lorem ipsum dolor sit amet, consectetuer adipiscing elit. Aenean commodo ligula eget dolor. '
+        b'Aenean massa. Cum sociis natoque penatibus et magnis dis parturient montes, nascetur ridiculus mus.')
+
+
+@pytest.mark.parametrize('zdict', [b'', TEXT])
+def test_round_trip(zdict):
+    comp = PayloadCompressor(zdict)
+    packed = comp.compress(TEXT)
+    assert packed[0] == COMPRESSED_FLAG
+    assert len(packed) < len(TEXT)
+    assert comp.decompress(packed, 254) == TEXT
+
+
+def test_shared_dictionary_improves_ratio():
+    plain = PayloadCompressor().compress(TEXT[:120])
+    primed = PayloadCompressor(TEXT).compress(TEXT[:120])
+    assert len(primed) < len(plain)
+
+
+def test_incompressible_payload_is_sent_raw():
+    """Test that compression is skipped when it doesn't shrink the payload"""
+    comp = PayloadCompressor()
+    data = bytes(range(0, 250, 7))
+    packed = comp.compress(data)
+    assert packed[0] == 0
+    assert packed[HEADER_LEN:] == data
+    assert comp.skipped == 1
+    assert comp.decompress(packed, 254) == data
+
+
+def test_ratio():
+    comp = PayloadCompressor()
+    assert comp.ratio == 1.0
+    comp.compress(TEXT)
+    assert comp.ratio < 1.0
+
+
+@pytest.mark.parametrize('packed', [
+    b'',
+    bytes([COMPRESSED_FLAG, 0xFF, 0xFF, 0xFF]),
+])
+def test_malformed_payload(packed):
+    assert PayloadCompressor().decompress(packed, 254) is None
+
+
+def test_decompressed_size_is_bounded():
+    comp = PayloadCompressor()
+    packed = comp.compress(b'a' * 200)
+    assert comp.decompress(packed, 100) is None
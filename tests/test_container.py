@@ -0,0 +1,179 @@
+import time
+
+import pytest
+
+from pySerialTransfer.pySerialTransfer import SerialTransfer, Status
+from pySerialTransfer.container import (CONTAINER_ID, MAX_RECORD, RECORD_HEADER, ContainerWriter, InvalidContainer,
+                                        unpack_records)
+from pySerialTransfer.emulator import pipe
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_pair(**kwargs):
+    host_end, device_end = pipe()
+    tx = SerialTransfer('pipe', restrict_ports=False, debug=False)
+    rx = SerialTransfer('pipe', restrict_ports=False, debug=False)
+    tx.connection = host_end
+    rx.connection = device_end
+
+    clock = FakeClock()
+    tx.enable_containers(**kwargs).clock = clock
+    rx.enable_containers(**kwargs)
+    return tx, rx, clock
+
+
+def send(link, payload, packet_id):
+    link.tx_buff[:len(payload)] = payload
+    return link.send(len(payload), packet_id)
+
+
+def receive(link):
+    packets = []
+    while link.available():
+        packets.append((link.id_byte, bytes(link.rx_buff[:link.bytes_read])))
+    return packets
+
+
+def test_unpack_records():
+    payload = RECORD_HEADER.pack(3, 2) + b'\x7E\x81' + RECORD_HEADER.pack(9, 0) + RECORD_HEADER.pack(1, 1) + b'x'
+    assert unpack_records(payload) == [(3, b'\x7E\x81'), (9, b''), (1, b'x')]
+    assert unpack_records(b'') == []
+
+
+@pytest.mark.parametrize('payload', [b'\x01', RECORD_HEADER.pack(1, 5) + b'abc'])
+def test_unpack_records_rejects_truncated(payload):
+    with pytest.raises(InvalidContainer):
+        unpack_records(payload)
+
+
+def test_writer_returns_full_container():
+    writer = ContainerWriter()
+    record = bytes(MAX_RECORD // 2 - RECORD_HEADER.size)
+
+    assert writer.add(1, record) is None
+    assert writer.add(2, record) is None
+    full = writer.add(3, record)
+
+    assert [sub_id for sub_id, _ in unpack_records(full)] == [1, 2]
+    assert len(writer) == 1
+    assert writer.take() == RECORD_HEADER.pack(3, len(record)) + record
+    assert writer.take() is None
+    assert (writer.containers, writer.records) == (2, 3)
+
+    with pytest.raises(ValueError):
+        writer.add(1, bytes(MAX_RECORD + 1))
+
+
+def test_records_are_held_until_due():
+    tx, rx, clock = make_pair(max_delay=0.01)
+
+    send(tx, b'\x01\x02', 5)
+    send(tx, b'\x7E', 6)
+    assert receive(rx) == []
+
+    clock.now = 0.005
+    tx.available()
+    assert receive(rx) == []
+
+    clock.now = 0.01
+    tx.available()
+    assert receive(rx) == [(5, b'\x01\x02'), (6, b'\x7E')]
+    assert rx.status == Status.NO_DATA
+
+
+def test_due_records_are_sent_without_further_calls():
+    """Test that the flush thread sends a due container while the sender is idle"""
+    tx, rx, clock = make_pair(max_delay=0.01)
+    tx.container.clock = time.monotonic
+
+    send(tx, b'\x01\x02', 5)
+
+    deadline = time.monotonic() + 5
+    while not rx.connection.in_waiting and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+    assert receive(rx) == [(5, b'\x01\x02')]
+
+    tx.disable_containers()
+    assert tx.container_thread is None
+
+
+def test_close_stops_the_flush_thread():
+    tx, rx, clock = make_pair()
+    thread = tx.container_thread
+
+    send(tx, b'\x01\x02', 5)
+    tx.close()
+
+    assert not thread.is_alive()
+    assert tx.container is None
+    assert receive(rx) == [(5, b'\x01\x02')]
+
+
+def test_large_messages_flush_pending_records_first():
+    tx, rx, clock = make_pair(max_record=8)
+
+    send(tx, b'abc', 1)
+    send(tx, bytes(range(100)), 2)
+    send(tx, b'def', 3)
+    tx.flush_records()
+
+    assert receive(rx) == [(1, b'abc'), (2, bytes(range(100))), (3, b'def')]
+    assert tx.container.containers == 2
+
+
+def test_full_containers_are_sent():
+    tx, rx, clock = make_pair()
+
+    for i in range(200):
+        send(tx, bytes([i, 0x7E, i]), i & 0x3F)
+    tx.disable_containers()
+
+    assert receive(rx) == [(i & 0x3F, bytes([i, 0x7E, i])) for i in range(200)]
+
+
+def test_records_dispatch_to_callbacks():
+    tx, rx, clock = make_pair()
+    received = []
+    rx.set_callbacks([lambda n=n: received.append((n, rx.rx_obj(int, obj_byte_size=4))) for n in range(4)])
+
+    for n in (3, 1, 2):
+        tx.tx_obj(n * 1000)
+        tx.send(4, packet_id=n)
+    tx.flush_records()
+
+    while rx.tick():
+        pass
+
+    assert received == [(3, 3000), (1, 1000), (2, 2000)]
+
+
+def test_corrupt_container_is_a_payload_error():
+    tx, rx, clock = make_pair()
+    tx.connection.write(tx.encoder.encode(RECORD_HEADER.pack(1, 9) + b'abc', CONTAINER_ID))
+
+    rx.available()
+    assert rx.status == Status.PAYLOAD_ERROR
+
+
+def test_containers_halve_bytes_on_the_wire():
+    plain_end, plain_rx = pipe()
+    plain = SerialTransfer('pipe', restrict_ports=False, debug=False)
+    plain.connection = plain_end
+
+    tx, rx, clock = make_pair()
+
+    for i in range(100):
+        send(plain, bytes([i, i]), 1)
+        send(tx, bytes([i, i]), 1)
+    tx.flush_records()
+
+    assert rx.connection.in_waiting * 1.9 <= plain_rx.in_waiting
+    assert receive(rx) == [(1, bytes([i, i])) for i in range(100)]
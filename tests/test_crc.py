@@ -22,9 +22,7 @@ def test_crc_poly():
     assert crc.table_len == 256
 
 
-#  Note: The CRC class has no upper limit on the crc_len parameter, but attempting to use a value greater than 32 hangs
-#  the test. The CRC class should be updated to handle this case.
-@pytest.mark.parametrize('crc_len', [4, 8, 16, 32, 128, 256])    
+@pytest.mark.parametrize('crc_len', [8, 16, 32])    
 def test_custom_positive_crc_len(crc_len):
     """Test the initialization of the CRC class with a custom crc length."""
     expected_table_len = pow(2, crc_len)
@@ -32,6 +30,24 @@ def test_custom_positive_crc_len(crc_len):
     assert crc.table_len == expected_table_len
 
 
+@pytest.mark.parametrize('crc_len', [0, 4, 12, 64, 128, 256])
+def test_unsupported_crc_len(crc_len):
+    """Test that widths other than 8, 16 and 32 are rejected instead of falling back to an 8-bit CRC"""
+    with pytest.raises(ValueError):
+        CRC(crc_len=crc_len)
+
+
+@pytest.mark.parametrize('crc_len', [8, 16, 32])
+def test_calculate_checksum_index_range(crc_len):
+    """Test that table lookups outside the 256 entry table raise a ValueError"""
+    crc = CRC(crc_len=crc_len)
+    assert crc.calculate_checksum(255) == crc.table[255]
+
+    for index in (-1, 256, 300):
+        with pytest.raises(ValueError):
+            crc.calculate_checksum(index)
+
+
 def test_crc_calculate():
     """Test the calculate method of the CRC class returns an integer."""
     crc = CRC()
@@ -98,8 +114,6 @@ def test_calculate_with_non_int_with_dist():
     assert result == expected_output
 
 
-# TODO: Handle this case in the calculate method   
-@pytest.mark.xfail(reason="not currently handled in the calculate method")   
 def test_calculate_with_dist_greater_than_list_length():
     crc_instance = CRC()
     arr = [0x31, 0x32, 0x33, 0x34, 0x35]
@@ -157,8 +171,6 @@ def test_calculate_with_empty_list():
     assert result == 0
 
 
-# TODO: Handle this case in the calculate method   
-@pytest.mark.xfail(reason="not currently handled in the calculate method") 
 def test_calculate_with_negative_dist():
     """Test that the calculate method raises a ValueError when the dist parameter is negative."""
     crc_instance = CRC()
@@ -182,3 +194,44 @@ def test_calculate_with_list_of_mixed_types():
     arr = [0x31, "a", 0x33, "b", 0x35]
     result = crc_instance.calculate(arr)
     assert result == 254
+
+
+@pytest.mark.parametrize('crc_len, polynomial, expected_output', [
+    (16, None, 0x31C3),    # CRC-16/XMODEM
+    (16, 0x8005, 0xFEE8),  # CRC-16/UMTS, table driven
+    (32, None, 0xCBF43926),  # CRC-32
+    (32, 0x1EDC6F41, 0xE3069283),  # CRC-32C, reflected table driven
+])
+def test_wide_crc_check_values(crc_len, polynomial, expected_output):
+    """Test the wide CRCs against the standard check value of the catalogued algorithms"""
+    crc_instance = CRC(polynomial, crc_len)
+    assert crc_instance.calculate(b'123456789') == expected_output
+    assert crc_instance.calculate(list(b'123456789')) == expected_output
+    assert crc_instance.num_bytes == crc_len // 8
+
+
+@pytest.mark.parametrize('crc_len, polynomial, params, expected_output', [
+    (8,  0x07,       dict(reflect=True, init=0xFF),                       0xD0),        # CRC-8/ROHC
+    (16, 0x1021,     dict(reflect=True),                                  0x2189),      # CRC-16/KERMIT
+    (16, 0x1021,     dict(init=0xFFFF),                                   0x29B1),      # CRC-16/IBM-3740
+    (32, 0x04C11DB7, dict(reflect=False, init=0xFFFFFFFF, xorout=0xFFFFFFFF), 0xFC891918),  # CRC-32/BZIP2
+    (32, 0x04C11DB7, dict(xorout=0),                                      0x340BC6D9),  # CRC-32/JAMCRC
+])
+def test_crc_parameters(crc_len, polynomial, params, expected_output):
+    """Test the reflect, init and xorout parameters against catalogued check values"""
+    crc_instance = CRC(polynomial, crc_len, **params)
+    assert crc_instance.calculate(b'123456789') == expected_output
+
+
+def test_wide_table_matches_crc_hqx():
+    """Test that the generic table driven path agrees with binascii.crc_hqx"""
+    crc_instance = CRC(crc_len=16)
+    data = bytes(range(256))
+    assert crc_instance._crc_wide(data) == crc_instance.calculate(data)
+
+
+def test_calculate_with_bytes_matches_list():
+    crc_instance = CRC()
+    arr = [0x31, 0x32, 0x33, 0x34, 0x35]
+    assert crc_instance.calculate(bytes(arr)) == crc_instance.calculate(arr) == 218
+    assert crc_instance.calculate(bytearray(arr), 3) == 209
@@ -0,0 +1,48 @@
+import pytest
+
+from pySerialTransfer.decode_cache import DecodeCache, freeze
+
+
+def test_freeze():
+    """Test that decoded values are converted to equal, immutable values"""
+    val = freeze({'a': [1, {'b': [2, 3]}], 'c': bytearray(b'x')})
+    assert val == {'a': (1, {'b': (2, 3)}), 'c': b'x'}
+
+    with pytest.raises(TypeError):
+        val['d'] = 1
+    with pytest.raises(TypeError):
+        val['a'][1]['b'] = 0
+
+
+def test_decode_cache_hits_and_eviction():
+    """Test that repeated keys skip decoding and the least recently used entry is evicted"""
+    cache = DecodeCache(size=2)
+    calls = []
+
+    def decoder(val):
+        def decode():
+            calls.append(val)
+            return {'val': val}
+        return decode
+
+    first = cache.get((0, b'a'), decoder('a'))
+    assert cache.get((0, b'a'), decoder('a')) is first
+    assert calls == ['a']
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.get((0, b'b'), decoder('b'))
+    cache.get((0, b'a'), decoder('a'))
+    cache.get((0, b'c'), decoder('c'))
+    assert len(cache) == 2
+    assert cache.evictions == 1
+    assert (0, b'b') not in cache.entries
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_decode_cache_skips_failures():
+    """Test that failed decodes are not cached"""
+    cache = DecodeCache()
+    assert cache.get('key', lambda: None) is None
+    assert len(cache) == 0
@@ -0,0 +1,125 @@
+from unittest.mock import patch
+
+import pytest
+
+from pySerialTransfer.pySerialTransfer import SerialTransfer, Status
+from pySerialTransfer.emulator import pipe
+from pySerialTransfer.delta import DeltaDecoder, DeltaEncoder, InvalidSchema, Schema
+
+
+FIELDS = [('seq', 'I'), ('mode', 'B'), ('temp', 'f'), ('volts', 'f'), ('rpm', 'H'), ('flags', 'I'),
+          ('x', 'd'), ('y', 'd'), ('z', 'f'), ('err', 'H'), ('ok', '?')]
+
+
+def make_record(i):
+    return {'seq': i, 'mode': 2, 'temp': 21.5, 'volts': 12.0, 'rpm': 1200 + (i // 10), 'flags': 0,
+            'x': 1.0, 'y': 2.0, 'z': 0.5, 'err': 0, 'ok': True}
+
+
+def test_schema():
+    schema = Schema(FIELDS)
+    assert schema.record_len == 42
+    assert schema.mask_len == 2
+
+
+@pytest.mark.parametrize('fields', [[], [('a', 'Z')]])
+def test_invalid_schema(fields):
+    with pytest.raises(InvalidSchema):
+        Schema(fields)
+
+
+def test_round_trip_and_bandwidth():
+    """Test that deltas reconstruct every record while cutting bandwidth several-fold"""
+    schema = Schema(FIELDS)
+    enc = DeltaEncoder(schema, keyframe_interval=50)
+    dec = DeltaDecoder(schema)
+    total = 0
+
+    for i in range(500):
+        payload = enc.encode(make_record(i))
+        total += len(payload)
+        assert dec.decode(payload) == make_record(i)
+
+    assert total * 4 < 500 * schema.record_len
+    assert dec.keyframes == 10
+    assert dec.deltas == 490
+
+
+def test_resync_on_keyframe_after_loss():
+    """Test that the receiver drops deltas after a lost packet and recovers on the next keyframe"""
+    schema = Schema(FIELDS)
+    enc = DeltaEncoder(schema, keyframe_interval=5)
+    dec = DeltaDecoder(schema)
+    payloads = [enc.encode(make_record(i)) for i in range(11)]
+
+    assert dec.decode(payloads[0]) == make_record(0)
+    assert dec.decode(payloads[2]) is None  # payloads[1] was lost
+    assert dec.decode(payloads[3]) is None
+    assert dec.decode(payloads[4]) is None
+    assert dec.decode(payloads[5]) == make_record(5)  # keyframe
+    assert dec.resyncs == 1
+    assert dec.dropped == 3
+
+
+def test_force_keyframe():
+    schema = Schema(FIELDS)
+    enc = DeltaEncoder(schema)
+    enc.encode(make_record(0))
+    enc.force_keyframe()
+    assert len(enc.encode(make_record(1))) == 1 + schema.record_len
+
+
+def test_truncated_payload_is_dropped():
+    schema = Schema(FIELDS)
+    dec = DeltaDecoder(schema)
+    payload = DeltaEncoder(schema).encode(make_record(0))
+    assert dec.decode(payload[:10]) is None
+    assert dec.decode(b'') is None
+
+
+def test_link_helpers():
+    """Test encoding into a link's TX buffer and decoding from its RX buffer"""
+    schema = Schema(FIELDS)
+    enc = DeltaEncoder(schema)
+    dec = DeltaDecoder(schema)
+
+    with patch('serial.Serial'):
+        link = SerialTransfer('COM3', restrict_ports=False)
+
+    size = enc.tx(link, make_record(0), start_pos=0)
+    link.rx_buff = link.tx_buff
+    link.bytes_read = size
+    assert dec.rx(link) == make_record(0)
+
+
+def test_corrupt_frames_invalidate_rx():
+    """Test that frames lost to corruption are noticed even when the sequence number wraps around to match"""
+    schema = Schema(FIELDS)
+    enc = DeltaEncoder(schema, keyframe_interval=1000)
+    dec = DeltaDecoder(schema)
+
+    host_end, device_end = pipe()
+    tx = SerialTransfer('pipe', restrict_ports=False, debug=False)
+    rx = SerialTransfer('pipe', restrict_ports=False, debug=False)
+    tx.connection = host_end
+    rx.connection = device_end
+
+    for i in range(130):
+        frame = bytearray(tx.encoder.encode(enc.encode(make_record(i)), 1))
+
+        if 1 <= i <= 128:
+            frame[-2] ^= 0xFF  # CRC
+
+        host_end.write(frame)
+
+    received = []
+    while True:
+        rx.available()
+        if rx.status == Status.NEW_DATA:
+            received.append(dec.rx(rx))
+        elif rx.status not in (Status.CRC_ERROR, Status.PAYLOAD_ERROR, Status.STOP_BYTE_ERROR):
+            break
+
+    assert rx.rx_errors == 128
+    assert received == [make_record(0), None]
+    assert dec.resyncs == 1
@@ -0,0 +1,120 @@
+import os
+import struct
+import sys
+import time
+
+import pytest
+
+from pySerialTransfer.pySerialTransfer import SerialTransfer, Status
+from pySerialTransfer.emulator import TELEMETRY_HEADER, TELEMETRY_ID, emulated_link
+
+
+def receive(link, device, count, tries=1000):
+    packets = []
+    for _ in range(tries):
+        device.poll()
+        while link.available():
+            packets.append((link.id_byte, bytes(link.rx_buff[:link.bytes_read])))
+        if len(packets) >= count:
+            break
+    return packets
+
+
+def test_echo():
+    link, device = emulated_link()
+    link.tx_buff[:3] = [1, 0x7E, 3]
+    link.send(3, packet_id=4)
+
+    assert receive(link, device, 1) == [(4, b'\x01\x7E\x03')]
+    assert (device.rx_frames, device.tx_frames) == (1, 1)
+
+
+def test_rpc():
+    link, device = emulated_link(device_kwargs={'echo': False})
+    device.register(7, lambda payload: struct.pack('<i', sum(payload)))
+    device.register(8, lambda payload: None)
+
+    link.tx_buff[:3] = [1, 2, 3]
+    link.send(3, packet_id=7)
+    link.send(3, packet_id=8)
+    link.send(3, packet_id=9)
+
+    assert receive(link, device, 1) == [(7, struct.pack('<i', 6))]
+    assert device.rx_frames == 3
+    assert device.tx_frames == 1
+
+
+def test_telemetry_rate_and_size_mix():
+    now = [0]
+    link, device = emulated_link(device_kwargs={'clock': lambda: now[0], 'seed': 1})
+    device.telemetry(1000, sizes={16: 3, 200: 1})
+
+    packets = []
+    for _ in range(100):
+        now[0] += 1000000
+        packets += receive(link, device, 1, tries=1)
+
+    assert len(packets) == 101
+    assert all(packet_id == TELEMETRY_ID for packet_id, _ in packets)
+    assert [TELEMETRY_HEADER.unpack_from(p)[0] for _, p in packets] == list(range(101))
+
+    sizes = [len(p) for _, p in packets]
+    assert set(sizes) == {16, 200}
+    assert sizes.count(16) > sizes.count(200)
+
+
+def test_rx_buffer_overrun():
+    link, device = emulated_link()
+    link.tx_buff[:50] = bytes(50)
+
+    # Two 56 byte frames between device loop iterations overflow the 64 byte buffer
+    link.send(50)
+    link.send(50)
+    device.poll()
+    assert device.overruns == 2 * 56 - 64
+    assert device.rx_frames == 1
+
+    # The truncated frame swallows the next one, then the parser resyncs
+    link.send(50)
+    device.poll()
+    link.send(50)
+    device.poll()
+    assert device.rx_frames == 2
+    assert device.overruns == 48
+    assert device.decoder.crc_errors + device.decoder.stop_byte_errors == 1
+
+
+def test_unlimited_rx_buffer():
+    link, device = emulated_link(device_kwargs={'rx_buffer_size': None})
+    link.tx_buff[:50] = bytes(50)
+
+    for _ in range(10):
+        link.send(50)
+    device.poll()
+    assert device.overruns == 0
+    assert device.rx_frames == 10
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='pseudo-terminals are only tested on Linux')
+def test_pty():
+    from pySerialTransfer.emulator import DeviceEmulator, PtyPort
+
+    port = PtyPort()
+    device = DeviceEmulator(port)
+    device.start(loop_interval=0.0005)
+
+    link = SerialTransfer(port.slave_name, restrict_ports=False)
+    try:
+        link.tx_buff[:4] = [1, 2, 3, 4]
+        link.send(4, packet_id=2)
+
+        deadline = time.monotonic() + 2
+        while not link.available() and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+        assert link.status == Status.NEW_DATA
+        assert (link.id_byte, link.rx_buff[:4]) == (2, [1, 2, 3, 4])
+    finally:
+        device.stop()
+        link.close()
+        port.close()
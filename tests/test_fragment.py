@@ -0,0 +1,130 @@
+import random
+from unittest.mock import patch
+
+import pytest
+
+from pySerialTransfer.emulator import pipe
+from pySerialTransfer.fragment import (
+    COMPRESSED_FRAG_PAYLOAD,
+    FRAG_HEADER,
+    FRAG_PAYLOAD,
+    MAX_MESSAGE,
+    MessageTooLong,
+    Reassembler,
+    send_fragments,
+)
+from pySerialTransfer.pySerialTransfer import SerialTransfer
+
+
+@pytest.fixture
+def link():
+    with patch('serial.Serial'):
+        link = SerialTransfer('COM3', restrict_ports=False)
+    link.sent = []
+    link.send = lambda message_len, packet_id=0: link.sent.append(
+        (packet_id, bytes(link.tx_buff[:message_len]))) or True
+    return link
+
+
+def test_fragments_fill_frames(link):
+    data = bytes(range(256)) * 4
+    assert send_fragments(link, data, packet_id=4, msg_seq=9)
+    assert len(link.sent) == 5
+    assert all(len(payload) == FRAG_HEADER.size + FRAG_PAYLOAD for _, payload in link.sent[:-1])
+    assert FRAG_HEADER.unpack(link.sent[0][1][:3]) == (9, 0, 5)
+
+
+@pytest.mark.parametrize('size', [0, 1, FRAG_PAYLOAD, FRAG_PAYLOAD + 1, 5000, MAX_MESSAGE])
+def test_round_trip_out_of_order(link, size):
+    data = bytes(random.Random(size).getrandbits(8) for _ in range(size))
+    link.send_message(data, packet_id=2)
+    fragments = link.sent[:]
+    random.Random(1).shuffle(fragments)
+
+    reasm = Reassembler()
+    results = [reasm.feed(packet_id, payload) for packet_id, payload in fragments]
+    assert results[-1] == data
+    assert all(r is None for r in results[:-1])
+    assert reasm.completed == 1
+
+
+def test_compressed_stride_out_of_order(link):
+    link.enable_compression(2)
+    data = bytes(range(256)) * 3
+    link.send_message(data, packet_id=2)
+    assert all(len(payload) == FRAG_HEADER.size + COMPRESSED_FRAG_PAYLOAD for _, payload in link.sent[:-1])
+
+    reasm = Reassembler()
+    results = [reasm.feed(packet_id, payload) for packet_id, payload in reversed(link.sent)]
+    assert results[-1] == data
+    assert reasm.invalid == 0
+
+
+def test_message_too_long(link):
+    with pytest.raises(MessageTooLong):
+        send_fragments(link, bytes(MAX_MESSAGE + 1))
+
+
+def test_missing_fragment_times_out(link):
+    now = [0.0]
+    reasm = Reassembler(timeout=1.0, clock=lambda: now[0])
+    send_fragments(link, bytes(600), msg_seq=1)
+    send_fragments(link, b'next', msg_seq=2)
+
+    reasm.feed(*link.sent[0])
+    reasm.feed(*link.sent[1])  # last fragment of message 1 never arrives
+    now[0] = 2.0
+    assert reasm.feed(*link.sent[3]) == b'next'
+    assert reasm.timed_out == 1
+
+
+def test_duplicates_and_interleaved_messages(link):
+    send_fragments(link, b'a' * 300, packet_id=1, msg_seq=1)
+    send_fragments(link, b'b' * 300, packet_id=2, msg_seq=1)
+    a0, a1, b0, b1 = link.sent
+
+    reasm = Reassembler()
+    assert reasm.feed(*a0) is None
+    assert reasm.feed(*b0) is None
+    assert reasm.feed(*a0) is None
+    assert reasm.feed(*b1) == b'b' * 300
+    assert reasm.feed(*a1) == b'a' * 300
+
+
+def test_invalid_fragments():
+    reasm = Reassembler(max_message=100)
+    assert reasm.feed(0, b'\x00') is None
+    assert reasm.feed(0, FRAG_HEADER.pack(0, 3, 2)) is None
+    assert reasm.feed(0, FRAG_HEADER.pack(0, 0, 2) + b'short') is None
+    assert reasm.invalid == 3
+
+
+def test_rx_from_link(link):
+    link.send_message(b'hello')
+    link.rx_buff = list(link.sent[0][1])
+    link.bytes_read = len(link.sent[0][1])
+    link.id_byte = 0
+    assert Reassembler().rx(link) == b'hello'
+
+
+def test_incompressible_message_on_compressed_id():
+    """Test that fragments that don't compress still fit in a packet with the compression header"""
+    host_end, device_end = pipe()
+    tx = SerialTransfer('pipe', restrict_ports=False, debug=False)
+    rx = SerialTransfer('pipe', restrict_ports=False, debug=False)
+    tx.connection = host_end
+    rx.connection = device_end
+    tx.enable_compression(5)
+    rx.enable_compression(5)
+
+    rng = random.Random(7)
+    data = bytes(rng.getrandbits(8) for _ in range(COMPRESSED_FRAG_PAYLOAD * 3 + 10))
+    assert tx.send_message(data, packet_id=5)
+
+    reasm = Reassembler()
+    message = None
+    while message is None and rx.available():
+        message = reasm.rx(rx)
+
+    assert message == data
+    assert tx.compressors[5].skipped == 4
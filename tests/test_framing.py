@@ -0,0 +1,84 @@
+import pytest
+
+from pySerialTransfer.framing import (CRC_ERROR, PAYLOAD_ERROR, STOP_BYTE_ERROR, Frame, FrameDecoder, FrameEncoder,
+                                      FrameError, stuff, unstuff)
+from pySerialTransfer.pySerialTransfer import State
+
+
+GOOD = bytes([0x7E, 0, 0xFF, 0x04, 0x01, 0x02, 0x03, 0x04, 0xC8, 0x81])
+
+
+def test_encode_matches_reference_frame():
+    """Test that the encoder produces the frames documented for the Arduino library"""
+    assert FrameEncoder().encode(b'\x01\x02\x03\x04') == GOOD
+
+
+@pytest.mark.parametrize('block', [b'', b'\x01', b'\x7E', b'\x7E\x7E', b'\x01\x7E\x02\x7E\x7E\x03', bytes(range(254))])
+def test_stuff_round_trip(block):
+    stuffed = bytearray(block)
+    overhead = stuff(stuffed)
+    assert 0x7E not in stuffed
+    assert unstuff(stuffed, overhead)
+    assert stuffed == block
+
+
+@pytest.mark.parametrize('crc_len, extended, size', [
+    (8, False, 1), (8, False, 254), (16, False, 100), (32, False, 200), (8, True, 255), (8, True, 5000),
+])
+@pytest.mark.parametrize('chunk', [1, 7, 4096])
+def test_round_trip_any_chunking(crc_len, extended, size, chunk):
+    """Test that frames are decoded however the stream is split into chunks"""
+    encoder = FrameEncoder(crc_len, extended)
+    decoder = FrameDecoder(crc_len, extended)
+    payloads = [bytes((i * 31 + n) & 0xFF for i in range(size)) for n in range(3)]
+    stream = b'\x00garbage' + b''.join(encoder.encode(p, n) for n, p in enumerate(payloads))
+
+    frames = []
+    for i in range(0, len(stream), chunk):
+        frames += decoder.feed(stream[i:i + chunk], timestamp=i)
+
+    assert [(f.id, f.payload) for f in frames] == list(enumerate(payloads))
+    assert decoder.frames == 3
+
+
+def test_timestamp_of_chunk_with_start_byte():
+    decoder = FrameDecoder()
+    assert decoder.feed(GOOD[:3], timestamp=10) == []
+    assert decoder.feed(GOOD[3:], timestamp=20) == [Frame(0, b'\x01\x02\x03\x04', 10)]
+
+
+@pytest.mark.parametrize('frame, code', [
+    ([0x7E, 0, 0xFF, 0x04, 0x01, 0x02, 0x03, 0x04, 0xFF, 0x81], CRC_ERROR),
+    ([0x7E, 0, 0xFF, 0x04, 0x01, 0x02, 0x03, 0x04, 0xC8, 0x7E], STOP_BYTE_ERROR),
+    ([0x7E, 0, 0xFF, 0xFF, 0x01, 0x02, 0x03, 0x04, 0xC8, 0x81], PAYLOAD_ERROR),
+])
+def test_errors(frame, code):
+    """Test that corrupt frames are counted, optionally reported, and don't block the next frame"""
+    quiet = FrameDecoder()
+    assert quiet.feed(bytes(frame) + GOOD, timestamp=0) == [Frame(0, b'\x01\x02\x03\x04', 0)]
+
+    loud = FrameDecoder(report_errors=True)
+    assert loud.feed(bytes(frame) + GOOD, timestamp=0) == [FrameError(code, 0, 0), Frame(0, b'\x01\x02\x03\x04', 0)]
+    assert (loud.crc_errors, loud.stop_byte_errors, loud.payload_errors) == (
+        code == CRC_ERROR, code == STOP_BYTE_ERROR, code == PAYLOAD_ERROR)
+
+
+def test_encode_too_long():
+    with pytest.raises(ValueError):
+        FrameEncoder().encode(bytes(255))
+    with pytest.raises(ValueError):
+        FrameEncoder(extended=True).encode(bytes(0x10000))
+
+
+def test_every_decoder_state_is_a_link_state():
+    """Test that feeding an extended frame byte by byte only passes through states SerialTransfer.state knows"""
+    frame = FrameEncoder(extended=True).encode(bytes(range(256)) * 2)
+    decoder = FrameDecoder(extended=True)
+    states = set()
+
+    for byte in frame:
+        decoder.feed(bytes([byte]))
+        states.add(State(decoder.state))
+
+    assert decoder.frames == 1
+    assert State.FIND_EXT_LEN in states
@@ -0,0 +1,86 @@
+import struct
+
+import pytest
+
+from pySerialTransfer.pySerialTransfer import Status
+from pySerialTransfer.emulator import emulated_link
+from pySerialTransfer.monitor import IdStats, LinkMonitor, main
+
+
+def test_per_id_rates_errors_and_jitter():
+    now = [0.0]
+    link, device = emulated_link()
+    monitor = LinkMonitor(link, baud=115200, clock=lambda: now[0])
+
+    for i in range(10):
+        device.send(bytes(8), packet_id=1)
+        device.send(bytes(20), packet_id=2)
+    device.port.write(bytes([0x7E, 0, 0xFF, 0x01, 0x09, 0x00, 0x81]))
+
+    assert monitor.poll() == 20
+    assert monitor.ids[1].packets == 10
+    assert monitor.ids[2].bytes == 200
+    assert monitor.errors[Status.CRC_ERROR] == 1
+    assert monitor.wire_bytes == 10 * (8 + 6) + 10 * (20 + 6)
+
+    now[0] = 2.0
+    report = monitor.render()
+    rows = {line.split()[0]: line.split()[1:4] for line in report.splitlines()[1:3]}
+    assert rows == {'1': ['5.0', '40', '10'], '2': ['5.0', '100', '10']}
+    assert 'CRC_ERROR 1 (0.5/s)' in report
+    assert '200 B/s on the wire' in report
+    assert 'rx frames queued 0' in report
+
+    # Rates only count packets since the previous report
+    now[0] = 3.0
+    assert monitor.render().splitlines()[1].split()[:3] == ['1', '0.0', '0']
+
+
+def test_rx_path_stats():
+    link, device = emulated_link()
+    link.enable_rx_stats()
+    monitor = LinkMonitor(link)
+
+    device.port.write(bytes([0x7E, 0, 0xFF, 0x01, 0x09, 0x00, 0x81]))
+    monitor.poll()
+
+    assert 'rx path: corrupt frames by cause overrun 0, line 0, unknown 1, rx bytes high water 7' in monitor.render()
+
+
+def test_jitter():
+    stats = IdStats()
+    for timestamp in (1, 1001, 2001, 3001):
+        stats.add(1, timestamp)
+    assert stats.gap_mean == 1000
+    assert stats.jitter == 0
+
+    stats.add(1, 5001)
+    assert stats.gap_mean == 1250
+    assert stats.jitter == 500
+
+
+def test_tail_hex_and_schema():
+    link, device = emulated_link()
+    hex_monitor = LinkMonitor(link, tail=2)
+    device.send(b'\x01\x02', packet_id=1)
+    device.send(b'\x03', packet_id=1)
+    device.send(b'\x04', packet_id=1)
+    hex_monitor.poll()
+    report = hex_monitor.render()
+    assert '01 02' not in report
+    assert '[  1] 03' in report and '[  1] 04' in report
+
+    schema_monitor = LinkMonitor(link, tail=5, tail_format='<hf', tail_id=2)
+    device.send(struct.pack('<hf', -3, 1.5), packet_id=2)
+    device.send(b'\x00', packet_id=2)
+    device.send(b'\x00', packet_id=1)
+    schema_monitor.poll()
+    report = schema_monitor.render()
+    assert '-3 1.5' in report
+    assert '<1 bytes, expected 6>' in report
+    assert report.count('[  ') == 2
+
+
+def test_main_requires_port(capsys):
+    with pytest.raises(SystemExit):
+        main([])
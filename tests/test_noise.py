@@ -0,0 +1,76 @@
+import pytest
+
+from pySerialTransfer.emulator import pipe
+from pySerialTransfer.noise import NoisyChannel, run_scenario
+
+
+def corrupted(data, **noise):
+    host_end, device_end = pipe()
+    channel = NoisyChannel(host_end, **noise)
+    device_end.write(data)
+    return channel.read(channel.in_waiting), channel
+
+
+def test_errors_are_deterministic():
+    data = bytes(range(256)) * 20
+    noise = {'seed': 3, 'bit_error_rate': 1e-3, 'drop_rate': 1e-3, 'insert_rate': 1e-3, 'burst_rate': 1e-3}
+
+    first, channel = corrupted(data, **noise)
+    assert first != data
+    assert corrupted(data, **noise)[0] == first
+    assert corrupted(data, **dict(noise, seed=4))[0] != first
+    assert channel.flipped and channel.dropped and channel.inserted and channel.bursts
+
+
+def test_drops_and_spurious_bytes():
+    data = bytes(10000)
+
+    dropped, channel = corrupted(data, seed=1, drop_rate=0.01)
+    assert len(dropped) == len(data) - channel.dropped > 0
+
+    spurious, channel = corrupted(data, seed=1, spurious_rate=0.01)
+    assert len(spurious) == len(data) + channel.spurious
+    assert set(spurious) == {0, 0x7E, 0x81}
+
+
+def test_latency_never_reorders():
+    now = [0.0]
+    host_end, device_end = pipe()
+    channel = NoisyChannel(host_end, seed=0, latency=1.0, jitter=1.0, clock=lambda: now[0])
+
+    device_end.write(b'ab')
+    assert channel.in_waiting == 0
+    now[0] = 0.5
+    device_end.write(b'cd')
+    assert channel.in_waiting == 0
+
+    now[0] = 3.0
+    assert channel.in_waiting == 4
+    assert channel.read(4) == b'abcd'
+
+
+def test_clean_scenario():
+    result = run_scenario('clean', packets=200)
+    assert (result.sent, result.received, result.lost, result.false_accepts) == (200, 200, 0, 0)
+    assert result.goodput > 0
+    assert result.parser_cpu > 0
+
+
+@pytest.mark.parametrize('noise', [
+    {'bit_error_rate': 1e-4},
+    {'drop_rate': 1e-3},
+    {'spurious_rate': 1e-3},
+    {'latency': 0.01, 'jitter': 0.01},
+])
+def test_parser_resyncs(noise):
+    result = run_scenario(packets=300, seed=2, **noise)
+    assert result == run_scenario(packets=300, seed=2, **noise)._replace(parser_cpu=result.parser_cpu)
+    assert result.received > 250
+    assert result.loss_rate == result.lost / 300
+
+
+def test_false_accepts_are_reported():
+    """The ID and overhead bytes are outside the CRC, so heavy noise lets some corrupt frames through"""
+    result = run_scenario(packets=500, bit_error_rate=1e-3)
+    assert result.false_accepts > 0
+    assert result.false_accept_rate == result.false_accepts / (result.received + result.false_accepts)
@@ -0,0 +1,155 @@
+import os
+
+import pytest
+
+from pySerialTransfer.pySerialTransfer import SerialTransfer, Status
+from pySerialTransfer.container import CONTAINER_ID, RECORD_HEADER
+from pySerialTransfer.emulator import pipe
+from pySerialTransfer.overrun import (CAUSE_LINE, CAUSE_OVERRUN, CAUSE_UNKNOWN, POLICY_BLOCK, POLICY_DROP_NEWEST,
+                                      POLICY_DROP_OLDEST, InvalidPolicy, RxStats, SerialCounters, read_serial_counters)
+
+
+def make_link():
+    host_end, device_end = pipe()
+    link = SerialTransfer('pipe', restrict_ports=False, debug=False)
+    link.connection = host_end
+    return link, device_end
+
+
+def frames(link, count, start=0):
+    return b''.join(link.encoder.encode(bytes([i, 0x7E, i]), i) for i in range(start, start + count))
+
+
+def receive(link):
+    packets = []
+    while True:
+        link.available()
+        if link.status == Status.NEW_DATA:
+            packets.append(link.id_byte)
+        elif link.status in (Status.NO_DATA, Status.CONTINUE):
+            return packets
+
+
+def counters(overrun=0, buf_overrun=0, frame=0, parity=0):
+    return SerialCounters(0, 0, frame, overrun, parity, 0, buf_overrun)
+
+
+def test_ports_without_counters():
+    host_end, _ = pipe()
+    assert read_serial_counters(host_end) is None
+
+    if hasattr(os, 'openpty'):
+        master, slave = os.openpty()
+
+        class Port:
+            def fileno(self):
+                return slave
+
+        try:
+            assert read_serial_counters(Port()) is None
+        finally:
+            os.close(master)
+            os.close(slave)
+
+    assert not RxStats(host_end).kernel_counters
+
+    with pytest.raises(InvalidPolicy):
+        RxStats(policy='drop-random')
+
+
+def test_errors_are_classified_by_kernel_counters():
+    readings = iter([counters(), counters(overrun=2), counters(overrun=2, parity=1), counters(overrun=2, parity=1),
+                     counters(overrun=2, parity=1, buf_overrun=1)])
+    stats = RxStats(connection=object(), read_counters=lambda connection: next(readings))
+
+    assert stats.kernel_counters
+    assert [stats.classify_error() for _ in range(4)] == [CAUSE_OVERRUN, CAUSE_LINE, CAUSE_UNKNOWN, CAUSE_OVERRUN]
+    assert stats.errors == {CAUSE_OVERRUN: 2, CAUSE_LINE: 1, CAUSE_UNKNOWN: 1}
+    assert stats.kernel == counters(overrun=2, parity=1, buf_overrun=1)
+
+
+def test_full_os_buffer_marks_errors_as_overruns():
+    link, device = make_link()
+    stats = link.enable_rx_stats(os_buffer_size=64)
+
+    data = frames(link, 8)
+    device.write(data[:40] + data[45:])  # bytes lost while the buffer was full
+    assert receive(link) == [0, 1, 2, 3, 6, 7]
+    assert stats.errors[CAUSE_OVERRUN] == 1
+    assert stats.waiting_high_water == len(data) - 5
+
+    # Noise on a quiet link isn't blamed on the buffer
+    for _ in range(2):
+        device.write(frames(link, 1))
+        receive(link)
+    damaged = bytearray(frames(link, 1))
+    damaged[5] ^= 0xFF
+    device.write(damaged)
+    receive(link)
+
+    assert stats.errors == {CAUSE_OVERRUN: 1, CAUSE_LINE: 0, CAUSE_UNKNOWN: 1}
+    assert stats.last_cause == CAUSE_UNKNOWN
+
+
+def test_queue_is_bounded_by_reading_less():
+    """Test that frames the application keeps up with are never dropped, whatever the policy"""
+    for policy in (POLICY_DROP_OLDEST, POLICY_DROP_NEWEST, POLICY_BLOCK):
+        link, device = make_link()
+        stats = link.enable_rx_stats(max_queue=2, policy=policy)
+
+        device.write(frames(link, 5))
+        assert receive(link) == [0, 1, 2, 3, 4]
+        assert stats.queue_dropped == 0
+        assert stats.queue_blocked > 0
+        assert stats.queue_high_water <= 3
+
+
+def test_drop_oldest():
+    link, device = make_link()
+    stats = link.enable_rx_stats(max_queue=3, os_buffer_size=64)
+
+    device.write(frames(link, 10))
+    assert receive(link) == [7, 8, 9]
+    assert (stats.queue_dropped, stats.queue_high_water) == (7, 3)
+
+
+def test_drop_newest():
+    link, device = make_link()
+    stats = link.enable_rx_stats(max_queue=3, policy=POLICY_DROP_NEWEST, os_buffer_size=64)
+
+    device.write(frames(link, 10))
+    assert receive(link) == [0, 1, 2]
+    assert stats.queue_dropped == 7
+
+
+def test_block_leaves_bytes_in_the_os_buffer():
+    link, device = make_link()
+    stats = link.enable_rx_stats(max_queue=3, policy=POLICY_BLOCK)
+
+    device.write(frames(link, 40))
+    link.available()
+    assert link.status == Status.NEW_DATA
+    assert link.connection.in_waiting > 0
+
+    assert [0] + receive(link) == list(range(40))
+    assert stats.queue_dropped == 0
+    assert stats.queue_blocked > 0
+    assert stats.queue_high_water <= 4
+
+
+def test_container_records_are_bounded():
+    link, device = make_link()
+    link.enable_containers()
+    stats = link.enable_rx_stats(max_queue=3, os_buffer_size=16)
+
+    payload = b''.join(RECORD_HEADER.pack(i, 1) + bytes([i]) for i in range(10))
+    device.write(link.encoder.encode(payload, CONTAINER_ID))
+    assert receive(link) == [0, 7, 8, 9]
+    assert (stats.queue_dropped, stats.queue_high_water) == (6, 3)
+
+    # Records of a container read while the application keeps up all
+    # arrive, none are dropped
+    stats.os_buffer_size = 64
+    device.write(link.encoder.encode(payload, CONTAINER_ID))
+    assert receive(link) == list(range(10))
+    assert stats.queue_dropped == 6
@@ -0,0 +1,84 @@
+import struct
+
+from pySerialTransfer import pipeline as pl
+from pySerialTransfer.pySerialTransfer import Packet
+
+
+def make_batches():
+    return [
+        [Packet(1, struct.pack('<hf', 1, 0.5)), Packet(2, struct.pack('<hf', 2, 1.5))],
+        [Packet(3, b'')],
+        [Packet(1, struct.pack('<hf', 3, 2.5))],
+    ]
+
+
+def test_filter_and_decode():
+    out = list(pl.pipe(make_batches(), pl.filter_ids({1, 2}), pl.decode('<hf')))
+    assert out == [[(1, 0.5), (2, 1.5)], [(3, 2.5)]]
+
+
+def test_decode_with_names():
+    out = list(pl.pipe(make_batches(), pl.filter_ids([1]), pl.decode('<hf', names=('n', 'x'))))
+    assert out == [[{'n': 1, 'x': 0.5}], [{'n': 3, 'x': 2.5}]]
+
+
+def test_window():
+    out = list(pl.pipe([[1, 2, 3], [4], [5, 6, 7, 8, 9]], pl.window(4)))
+    assert out == [[1, 2, 3, 4], [5, 6, 7, 8], [9]]
+
+
+def test_map_items():
+    assert list(pl.pipe([[1, 2], [3]], pl.map_items(lambda x: x * 2))) == [[2, 4], [6]]
+
+
+def test_aggregate_by_time_window():
+    times = iter([0.0, 0.5, 1.2, 1.4, 2.5])
+    out = list(pl.pipe([[1], [2], [3], [4], [5, 6]], pl.aggregate(1.0, sum, clock=lambda: next(times))))
+    assert out == [[3], [7], [11]]
+
+
+def test_aggregate_closes_windows_on_heartbeats():
+    """Test that empty batches close a finished window without waiting for more items"""
+    times = iter([0.0, 0.5, 1.2, 1.5, 3.0, 4.5])
+    out = pl.pipe([[1], [2], [], [], [4], []], pl.aggregate(1.0, sum, clock=lambda: next(times)))
+    assert next(out) == [3]
+    assert next(out) == [4]
+
+
+def test_heartbeats_pass_through_stages():
+    stages = (pl.filter_ids({1}), pl.decode('<hf'), pl.map_items(str))
+    assert list(pl.pipe([[], [Packet(2, b'')], []], *stages)) == [[], []]
+
+    seen = []
+    assert pl.pipe([[], [1], []], pl.sink(seen.append)) == 1
+    assert seen == [[1]]
+
+
+def test_decode_rejects_short_payloads():
+    stage = pl.decode('<hf')
+    batches = [[Packet(1, b'\x01'), Packet(1, struct.pack('<hf', 1, 0.5))], [Packet(1, b'')], [Packet(1, b'\x00' * 7)]]
+
+    assert list(stage(batches)) == [[(1, 0.5)], [(0, 0.0)]]
+    assert stage.rejected == 2
+
+
+def test_stages_are_lazy():
+    """Test that no batch is pulled from the source before the consumer asks for one"""
+    pulled = []
+
+    def source():
+        for i in range(3):
+            pulled.append(i)
+            yield [i]
+
+    out = pl.pipe(source(), pl.map_items(str))
+    assert pulled == []
+    assert next(out) == ['0']
+    assert pulled == [0]
+
+
+def test_sink_consumes_everything():
+    seen = []
+    count = pl.pipe(make_batches(), pl.filter_ids({1}), pl.sink(seen.append))
+    assert count == 2
+    assert len(seen) == 2
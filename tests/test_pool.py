@@ -0,0 +1,183 @@
+import threading
+import time
+
+import pytest
+
+from pySerialTransfer.pool import CMD_STOP, MSG_PACKETS, LinkPool, UnknownPort, _worker_main
+from pySerialTransfer.pySerialTransfer import MAX_PACKET_SIZE
+
+
+class CountingLink:
+    """Stands in for SerialTransfer: produces `count` packets whose payload names the port, echoes sends back"""
+
+    def __init__(self, port, count=5):
+        self.port = port
+        self.remaining = count
+        self.echo = []
+        self.rx_buff = [0] * MAX_PACKET_SIZE
+        self.tx_buff = [0] * MAX_PACKET_SIZE
+        self.id_byte = 0
+        self.bytes_read = 0
+
+    def open(self):
+        return True
+
+    def close(self):
+        pass
+
+    def available(self):
+        if self.echo:
+            self.id_byte, payload = self.echo.pop(0)
+        elif self.remaining:
+            self.remaining -= 1
+            self.id_byte, payload = 1, self.port.encode()
+        else:
+            return 0
+
+        self.rx_buff[:len(payload)] = payload
+        self.bytes_read = len(payload)
+        return self.bytes_read
+
+    def tx_struct_obj(self, val_bytes, start_pos=0):
+        self.tx_buff[start_pos:start_pos + len(val_bytes)] = val_bytes
+        return start_pos + len(val_bytes)
+
+    def send(self, message_len, packet_id=0):
+        self.echo.append((packet_id, bytes(self.tx_buff[:message_len])))
+        return True
+
+
+class FaultyLink(CountingLink):
+    """CountingLink that fails to open, read or send depending on the port name"""
+
+    def open(self):
+        if self.port == 'no-open':
+            raise OSError('could not open port')
+        return True
+
+    def available(self):
+        if self.port == 'no-read':
+            raise OSError('device disconnected')
+        return super().available()
+
+    def send(self, message_len, packet_id=0):
+        if self.port == 'no-send':
+            raise OSError('write timeout')
+        if self.port == 'send-false':
+            return False
+        return super().send(message_len, packet_id)
+
+
+class FakeConn:
+    """Worker end of the pipe: records what the worker sends, stops it after a few loop iterations"""
+
+    def __init__(self, rounds):
+        self.rounds = rounds
+        self.sent = []
+
+    def poll(self):
+        self.rounds -= 1
+        return self.rounds < 0
+
+    def recv(self):
+        return (CMD_STOP,)
+
+    def send(self, msg):
+        self.sent.append(msg)
+
+
+def collect(pool, count, timeout=10):
+    packets = []
+    deadline = time.monotonic() + timeout
+
+    while len(packets) < count and time.monotonic() < deadline:
+        packets.extend(pool.poll(0.1))
+    return packets
+
+
+def test_ports_are_spread_across_workers():
+    pool = LinkPool(['a', 'b', 'c', 'd', 'e'], workers=2, link_factory=CountingLink)
+    assert pool.workers == 2
+    assert pool.assignment == {'a': 0, 'b': 1, 'c': 0, 'd': 1, 'e': 0}
+    assert LinkPool(['a'], workers=8, link_factory=CountingLink).workers == 1
+
+
+def test_packets_from_all_ports():
+    ports = ['p{}'.format(i) for i in range(4)]
+
+    with LinkPool(ports, workers=2, link_factory=CountingLink, count=5) as pool:
+        packets = collect(pool, 20)
+
+    assert len(packets) == 20
+    for port in ports:
+        assert [p.payload for p in packets if p.port == port] == [port.encode()] * 5
+    assert all(p.timestamp > 0 for p in packets)
+
+
+def test_send_is_routed_to_owning_worker():
+    with LinkPool(['a', 'b'], workers=2, link_factory=CountingLink, count=0) as pool:
+        pool.send('b', b'ping', packet_id=7)
+        packets = collect(pool, 1)
+
+        with pytest.raises(UnknownPort):
+            pool.send('z', b'')
+
+    assert [tuple(p[:3]) for p in packets] == [('b', 7, b'ping')]
+
+
+def test_batches_never_exceed_batch_size():
+    """Test that a full batch is sent before the worker reads the next port"""
+    conn = FakeConn(rounds=3)
+    _worker_main(conn, ['a', 'b', 'c'], CountingLink, {'count': 10}, 4, 1.0, 0)
+
+    batches = [msg[1] for msg in conn.sent if msg[0] == MSG_PACKETS]
+    assert all(len(batch) == 4 for batch in batches)
+    assert len(batches) == 7  # 30 packets, the last 2 wait for batch_interval
+
+
+def test_send_does_not_wait_for_poll():
+    """Test that sending while nobody polls can't deadlock against a worker blocked on a full pipe"""
+    payload = bytes(200)
+
+    with LinkPool(['a'], workers=1, link_factory=CountingLink, count=0, batch_size=8) as pool:
+        done = threading.Event()
+
+        def send_all():
+            for i in range(3000):
+                pool.send('a', payload, packet_id=1)
+            done.set()
+
+        threading.Thread(target=send_all, daemon=True).start()
+        assert done.wait(10)
+
+        packets = collect(pool, 3000, timeout=30)
+
+    assert len(packets) == 3000
+
+
+def test_port_errors_do_not_stop_the_worker():
+    """Test that failing ports are reported while the other ports of the same worker keep working"""
+    ports = ['no-open', 'no-read', 'no-send', 'send-false', 'ok']
+
+    with LinkPool(ports, workers=1, link_factory=FaultyLink, count=0) as pool:
+        pool.send('no-open', b'lost')
+        pool.send('no-send', b'lost')
+        pool.send('send-false', b'lost')
+        pool.send('ok', b'ping', packet_id=7)
+        packets = collect(pool, 1)
+
+        deadline = time.monotonic() + 10
+        while len(pool.errors) < 5 and time.monotonic() < deadline:
+            packets.extend(pool.poll(0.1))
+
+        assert sorted(port for port, _ in pool.errors) == ['no-open', 'no-open', 'no-read', 'no-send', 'send-false']
+        assert pool.failed == {'no-open', 'no-read'}
+
+        with pytest.raises(UnknownPort):
+            pool.send('no-read', b'')
+
+        pool.send('no-send', b'still open')
+        pool.send('ok', b'pong', packet_id=8)
+        packets.extend(collect(pool, 1))
+
+    assert [tuple(p[:3]) for p in packets] == [('ok', 7, b'ping'), ('ok', 8, b'pong')]
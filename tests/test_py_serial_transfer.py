@@ -1,3 +1,5 @@
+import random
+import struct
 from unittest.mock import patch, MagicMock, PropertyMock
 
 import pytest
@@ -8,6 +10,7 @@ from pySerialTransfer.pySerialTransfer import (
     InvalidSerialPort,
     SerialTransfer,
     State,
+    Status,
     BYTE_FORMATS, 
     MAX_PACKET_SIZE, 
     START_BYTE,
@@ -448,4 +451,419 @@ def test_tick_with_invalid_data_debug_false(caplog, incoming_byte_values, expect
     assert result is False
     assert len(caplog.records) == 0
 
-    
\ No newline at end of file
+    
+
+@pytest.mark.parametrize('val', [
+    {'mode': 'run', 'temp': 23.5, 'ok': True},
+    [1, 'two', 3.5, None],
+])
+def test_tx_rx_obj_binary_codec(val):
+    """Test that dicts and heterogeneous lists round trip through the binary codec"""
+    st = SerialTransfer('COM3', obj_codec='binary')
+    size = st.tx_obj(val, start_pos=2)
+    st.rx_buff = st.tx_buff
+    assert st.rx_obj(type(val), start_pos=2) == val
+    assert size < 2 + len(str(val))
+
+
+def test_tx_obj_codec_override():
+    """Test that the codec argument overrides the link default for a single call"""
+    st = SerialTransfer('COM3')
+    size = st.tx_obj({'key': 'value'}, codec='binary')
+    assert size == 11
+    st.rx_buff = st.tx_buff
+    assert st.rx_obj(dict, codec='binary') == {'key': 'value'}
+
+
+def test_rx_obj_binary_codec_malformed():
+    st = SerialTransfer('COM3', obj_codec='binary')
+    st.rx_buff = [0xC1] + [' '] * (MAX_PACKET_SIZE - 1)
+    assert st.rx_obj(dict) is None
+
+
+def loopback(tx: SerialTransfer, rx: SerialTransfer) -> int:
+    """Feed everything written by tx into rx and return the result of rx.available()"""
+    written = b''.join(bytes(call[0][0]) for call in tx.connection.write.call_args_list)
+    make_incoming_byte_stream(incoming_byte_values=list(written), connection=rx.connection)
+    return rx.available()
+
+
+def test_compressed_packet_round_trip():
+    """Test that compressed packets shrink on the wire and are transparently decompressed"""
+    text = 'Lorem ipsum dolor sit amet, consectetuer adipiscing elit. Aenean commodo ligula eget dolor. ' * 2
+    tx = SerialTransfer('COM3')
+    rx = SerialTransfer('COM3')
+    tx.enable_compression(3, zdict=text[:60].encode())
+    rx.enable_compression(3, zdict=text[:60].encode())
+    
+    size = tx.tx_obj(text)
+    tx.send(size, packet_id=3)
+    assert len(tx.connection.write.call_args[0][0]) < size
+    
+    assert loopback(tx, rx) == size
+    assert rx.rx_obj(str, obj_byte_size=size) == text
+
+
+def test_uncompressed_ids_are_unchanged():
+    st = SerialTransfer('COM3')
+    st.enable_compression(3)
+    st.tx_buff[:5] = [1, 2, 3, 4, 5]
+    st.send(5, packet_id=0)
+    assert st.connection.write.call_args[0][0] == bytearray([0x7E, 0, 0xFF, 5, 1, 2, 3, 4, 5, 0x80, 0x81])
+
+
+def test_corrupt_compressed_payload_is_payload_error():
+    st = SerialTransfer('COM3')
+    st.enable_compression(0)
+    make_incoming_byte_stream(incoming_byte_values=[0x7E, 0, 0xFF, 0x04, 0x01, 0x02, 0x03, 0x04, 0xC8, 0x81],
+                              connection=st.connection)
+    assert st.available() == 0
+    assert st.status == Status.PAYLOAD_ERROR
+
+
+def test_oversized_compressed_payload_is_not_sent():
+    """Test that a payload that doesn't fit in a packet with its compression header fails instead of being cut,
+    while fragmented messages on the ID still go through"""
+    st = SerialTransfer('COM3')
+    st.enable_compression(5)
+    rng = random.Random(5)
+    st.tx_buff[:MAX_PACKET_SIZE] = [rng.getrandbits(8) for _ in range(MAX_PACKET_SIZE)]
+    assert st.send(MAX_PACKET_SIZE, packet_id=5) is False
+    assert not st.connection.write.called
+
+    # Fragments leave room for the header, so they are sent uncompressed
+    assert st.send_message(bytes(rng.getrandbits(8) for _ in range(600)), packet_id=5)
+    assert st.connection.write.call_count == 3
+
+
+def test_full_compressible_payload_round_trip():
+    tx = SerialTransfer('COM3')
+    rx = SerialTransfer('COM3')
+    tx.enable_compression(5)
+    rx.enable_compression(5)
+    tx.tx_buff[:MAX_PACKET_SIZE] = [7] * MAX_PACKET_SIZE
+    assert tx.send(MAX_PACKET_SIZE, packet_id=5)
+
+    assert loopback(tx, rx) == MAX_PACKET_SIZE
+    assert rx.rx_buff[:MAX_PACKET_SIZE] == [7] * MAX_PACKET_SIZE
+
+
+@pytest.mark.parametrize('crc_len', [8, 16, 32])
+def test_crc_len_frame_round_trip(crc_len):
+    """Test that frames carry crc_len // 8 CRC bytes and are accepted by a receiver with the same width"""
+    tx = SerialTransfer('COM3', crc_len=crc_len)
+    rx = SerialTransfer('COM3', crc_len=crc_len)
+    tx.tx_buff[:5] = [1, 2, 3, 4, 5]
+    tx.send(5)
+    assert len(tx.connection.write.call_args[0][0]) == 4 + 5 + crc_len // 8 + 1
+    assert loopback(tx, rx) == 5
+    assert rx.rx_buff[:5] == [1, 2, 3, 4, 5]
+
+
+def test_corrupt_wide_crc_is_crc_error():
+    tx = SerialTransfer('COM3', crc_len=16)
+    rx = SerialTransfer('COM3', crc_len=16)
+    tx.tx_buff[:5] = [1, 2, 3, 4, 5]
+    tx.send(5)
+    frame = tx.connection.write.call_args[0][0]
+    frame[-2] ^= 0x01
+    make_incoming_byte_stream(incoming_byte_values=list(frame), connection=rx.connection)
+    assert rx.available() == 0
+    assert rx.status == Status.CRC_ERROR
+
+
+def test_send_hands_frames_to_scheduler():
+    """Test that send() queues frames on an attached scheduler instead of writing them"""
+    st = SerialTransfer('COM3')
+    st.tx_scheduler = MagicMock()
+    st.tx_buff[:5] = [1, 2, 3, 4, 5]
+    assert st.send(5, priority=0)
+    st.tx_scheduler.submit.assert_called_once_with(bytearray([0x7E, 0, 0xFF, 5, 1, 2, 3, 4, 5, 0x80, 0x81]), 0)
+    st.connection.write.assert_not_called()
+
+
+def make_stream_connection(data: bytes, connection: MagicMock) -> None:
+    """Back the connection mock with a byte stream: in_waiting reports the bytes left and read() consumes them"""
+    stream = bytearray(data)
+
+    def read(size=1):
+        chunk = bytes(stream[:size])
+        del stream[:size]
+        return chunk
+
+    type(connection).in_waiting = PropertyMock(side_effect=lambda: len(stream))
+    connection.read.side_effect = read
+
+
+def test_packet_batches():
+    """Test that every packet parsed without waiting is returned in one batch, skipping corrupt frames"""
+    good = [0x7E, 0, 0xFF, 0x04, 0x01, 0x02, 0x03, 0x04, 0xC8, 0x81]
+    bad_crc = [0x7E, 0, 0xFF, 0x04, 0x01, 0x02, 0x03, 0x04, 0x00, 0x81]
+    st = SerialTransfer('COM3')
+    make_stream_connection(bytes(good + bad_crc + good), st.connection)
+
+    batches = list(st.packet_batches(idle_sleep=0, timeout=0))
+    assert [[p[:2] for p in batch] for batch in batches] == [[(0, b'\x01\x02\x03\x04')] * 2]
+    assert all(p.timestamp > 0 for p in batches[0])
+
+
+def test_packets_max_batch():
+    good = [0x7E, 5, 0xFF, 0x01, 0x09, 0x82, 0x81]
+    st = SerialTransfer('COM3')
+    make_stream_connection(bytes(good * 5), st.connection)
+
+    assert [len(b) for b in st.packet_batches(max_batch=2, idle_sleep=0, timeout=0)] == [2, 2, 1]
+    make_stream_connection(bytes(good * 3), st.connection)
+    assert [p[:2] for p in st.packets(idle_sleep=0, timeout=0)] == [(5, b'\x09')] * 3
+
+
+def test_packet_batches_idle_batches():
+    """Test that an empty heartbeat batch is yielded whenever no data is available"""
+    good = [0x7E, 5, 0xFF, 0x01, 0x09, 0x82, 0x81]
+    st = SerialTransfer('COM3')
+    make_stream_connection(bytes(good), st.connection)
+
+    batches = st.packet_batches(idle_sleep=0, idle_batches=True)
+    assert [p[:2] for p in next(batches)] == [(5, b'\x09')]
+    assert next(batches) == []
+    assert next(batches) == []
+
+
+def test_rx_timestamp_is_taken_at_start_byte():
+    st = SerialTransfer('COM3')
+    incoming_byte_values = [0x7E, 0, 0xFF, 0x04, 0x01, 0x02, 0x03, 0x04, 0xC8, 0x81]
+    make_incoming_byte_stream(incoming_byte_values=incoming_byte_values, connection=st.connection)
+
+    with patch('time.monotonic_ns', side_effect=[111, 222, 333]):
+        assert st.available() == 4
+    assert st.rx_timestamp == 111
+
+
+def test_tx_struct_obj_past_end_of_buffer():
+    """Test that tx_struct_obj refuses values that don't fit instead of raising IndexError"""
+    st = SerialTransfer('COM3')
+    assert st.tx_struct_obj(bytes(10), MAX_PACKET_SIZE - 5) is None
+    assert st.tx_struct_obj(bytes(5), MAX_PACKET_SIZE - 5) == MAX_PACKET_SIZE
+
+
+@pytest.mark.parametrize('size', [255, 508, 1000, 0xFFFF])
+def test_extended_frame_round_trip(size):
+    """Test that payloads larger than a standard frame are sent as extended frames and received intact"""
+    payload = bytes((i * 7) & 0xFF for i in range(size))
+    tx = SerialTransfer('COM3', extended_frames=True)
+    rx = SerialTransfer('COM3', extended_frames=True)
+    tx.tx_buff[:size] = payload
+
+    frame = tx.build_frame(size, packet_id=9)
+    assert frame[:6] == bytes([0x7E, 9, 0xFF, 0xFF, size >> 8, size & 0xFF])
+    assert len(frame) == 6 + size + -(-size // 254) + 4 + 1
+
+    make_stream_connection(bytes(frame), rx.connection)
+    assert rx.available() == size
+    assert rx.status == Status.NEW_DATA
+    assert rx.id_byte == 9
+    assert bytes(rx.rx_buff[:size]) == payload
+
+
+def test_extended_frames_keep_standard_frames():
+    """Test that small payloads still use standard frames when extended frames are enabled"""
+    tx = SerialTransfer('COM3', extended_frames=True)
+    plain = SerialTransfer('COM3')
+    tx.tx_buff[:4] = [1, 2, 3, 4]
+    plain.tx_buff[:4] = [1, 2, 3, 4]
+    assert tx.build_frame(4) == plain.build_frame(4)
+
+    make_stream_connection(bytes(tx.build_frame(4)), tx.connection)
+    assert tx.available() == 4
+    assert tx.rx_buff[:4] == [1, 2, 3, 4]
+
+
+def test_extended_frame_crc_error():
+    """Test that a corrupted extended frame is rejected"""
+    tx = SerialTransfer('COM3', extended_frames=True)
+    rx = SerialTransfer('COM3', extended_frames=True)
+    tx.tx_buff[:300] = bytes(300)
+    frame = tx.build_frame(300)
+    frame[100] ^= 0x01
+
+    make_stream_connection(bytes(frame), rx.connection)
+    assert rx.available() == 0
+    assert rx.status == Status.CRC_ERROR
+
+
+def test_extended_frame_rejected_when_disabled():
+    """Test that a receiver without extended frames enabled reports a payload error"""
+    tx = SerialTransfer('COM3', extended_frames=True)
+    rx = SerialTransfer('COM3')
+    tx.tx_buff[:300] = bytes(300)
+
+    make_stream_connection(bytes(tx.build_frame(300)), rx.connection)
+    rx.available()
+    assert rx.status == Status.PAYLOAD_ERROR
+
+
+def test_prepare_frame():
+    """Test that a prepared frame matches the frame send() writes and is written in one call"""
+    st = SerialTransfer('COM3')
+    prepared = st.prepare_frame(b'\x01\x7E\x03', packet_id=4)
+    assert prepared.id == 4
+    assert prepared.payload == b'\x01\x7E\x03'
+
+    st.tx_buff[:3] = [1, 0x7E, 3]
+    assert prepared.frame == bytes(st.build_frame(3, packet_id=4))
+
+    st.connection.write.reset_mock()
+    assert st.send_frame(prepared)
+    st.connection.write.assert_called_once_with(prepared.frame)
+
+    with pytest.raises(ValueError):
+        st.prepare_frame(bytes(300))
+
+
+def test_frame_cache():
+    """Test that repeated payloads are served from the frame cache with bounded size"""
+    st = SerialTransfer('COM3')
+    st.enable_frame_cache(size=2)
+
+    def send(payload, packet_id=0):
+        st.tx_buff[:len(payload)] = payload
+        assert st.send(len(payload), packet_id)
+        return bytes(st.connection.write.call_args[0][0])
+
+    first = send([1, 2, 3])
+    assert send([1, 2, 3]) == first
+    assert (st.frame_cache_hits, st.frame_cache_misses) == (1, 1)
+
+    other_id = send([1, 2, 3], packet_id=1)
+    assert other_id != first
+    assert st.frame_cache_misses == 2
+
+    send([4, 5])
+    assert len(st.frame_cache) == 2
+    assert (0, b'\x01\x02\x03') not in st.frame_cache
+
+    reference = SerialTransfer('COM3')
+    reference.tx_buff[:3] = [1, 2, 3]
+    assert send([1, 2, 3]) == first == bytes(reference.build_frame(3))
+
+    st.disable_frame_cache()
+    assert st.frame_cache is None
+    assert send([1, 2, 3]) == first
+
+
+def test_frame_cache_follows_compression():
+    """Test that toggling compression doesn't serve frames encoded the other way from the cache"""
+    tx = SerialTransfer('COM3')
+    rx = SerialTransfer('COM3')
+    tx.enable_frame_cache()
+    payload = [ord('a')] * 100
+
+    for compressed in (False, True, False):
+        if compressed:
+            tx.enable_compression(3)
+            rx.enable_compression(3)
+        else:
+            tx.disable_compression(3)
+            rx.disable_compression(3)
+
+        tx.connection.write.reset_mock()
+        tx.tx_buff[:100] = payload
+        assert tx.send(100, packet_id=3)
+        assert (len(tx.connection.write.call_args[0][0]) < 100) == compressed
+
+        assert loopback(tx, rx) == 100
+        assert rx.rx_buff[:100] == payload
+
+
+@pytest.mark.parametrize('codec', ['json', 'binary'])
+def test_decode_cache(codec):
+    """Test that byte-identical payloads return the same immutable decoded object"""
+    tx = SerialTransfer('COM3', obj_codec=codec)
+    rx = SerialTransfer('COM3', obj_codec=codec)
+    cache = rx.enable_decode_cache(size=4)
+    status = {'temp': 21, 'ok': True}
+
+    size = tx.tx_obj(status)
+    tx.send(size)
+    assert loopback(tx, rx) == size
+
+    first = rx.rx_obj(dict, obj_byte_size=size)
+    assert first == status
+    with pytest.raises(TypeError):
+        first['temp'] = 0
+
+    tx.connection.write.reset_mock()
+    tx.tx_obj(status)
+    tx.send(size)
+    loopback(tx, rx)
+    assert rx.rx_obj(dict, obj_byte_size=size) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    tx.connection.write.reset_mock()
+    size = tx.tx_obj({'temp': 22, 'ok': True})
+    tx.send(size)
+    loopback(tx, rx)
+    assert rx.rx_obj(dict, obj_byte_size=size) == {'temp': 22, 'ok': True}
+    assert cache.misses == 2
+
+    rx.disable_decode_cache()
+    assert isinstance(rx.rx_obj(dict, obj_byte_size=size), dict)
+
+
+def test_available_reports_buffered_frames_in_order():
+    """Test that frames decoded from one bulk read are reported by consecutive available() calls"""
+    good = [0x7E, 5, 0xFF, 0x01, 0x09, 0x82, 0x81]
+    bad_crc = [0x7E, 0, 0xFF, 0x04, 0x01, 0x02, 0x03, 0x04, 0x00, 0x81]
+    st = SerialTransfer('COM3')
+    make_stream_connection(bytes(good + bad_crc + good), st.connection)
+
+    assert st.available() == 1
+    assert st.connection.in_waiting == 0
+    assert st.available() == 0
+    assert st.status == Status.CRC_ERROR
+    assert st.available() == 1
+    assert (st.id_byte, st.rx_buff[0]) == (5, 9)
+    assert st.available() == 0
+    assert st.status == Status.NO_DATA
+    assert st.state == State.FIND_START_BYTE
+
+
+def test_tx_records_rx_records_round_trip():
+    """Test that a batch of records packed by tx_records() is decoded by rx_records() in one call"""
+    tx = SerialTransfer('COM3', restrict_ports=False)
+    rx = SerialTransfer('COM3', restrict_ports=False)
+    records = [(i, -i, i / 4) for i in range(18)]
+
+    end = tx.tx_records(records, 'Ihf', start_pos=2)
+    assert end == 2 + 18 * 10
+    assert tx.tx_records([1, 2, 3], '>H', start_pos=end) == end + 6
+
+    rx.rx_buff[:end + 6] = tx.tx_buff[:end + 6]
+    rx.bytes_read = end + 7
+
+    assert rx.rx_records('Ihf', count=18, start_pos=2) == records
+    assert rx.rx_records(struct.Struct('<Ihf'), count=2, start_pos=12) == records[1:3]
+    assert rx.rx_records('>H', start_pos=end) == [(1,), (2,), (3,)]
+    assert rx.rx_records('>H', count=4, start_pos=end) is None
+    assert tx.tx_records(records * 2, 'Ihf') is None
+
+
+def test_rx_records_numpy():
+    """Test that rx_records() decodes records into a NumPy structured array"""
+    np = pytest.importorskip('numpy')
+    dtype = np.dtype([('seq', '<u4'), ('temp', '<i2'), ('val', '<f4')])
+    tx = SerialTransfer('COM3', restrict_ports=False)
+    rx = SerialTransfer('COM3', restrict_ports=False)
+
+    array = np.zeros(5, dtype)
+    array['seq'] = np.arange(5)
+    array['val'] = np.arange(5) / 2
+    assert tx.tx_records(array) == 50
+
+    rx.rx_buff[:50] = tx.tx_buff[:50]
+    rx.bytes_read = 50
+
+    decoded = rx.rx_records(dtype)
+    assert decoded['seq'].tolist() == [0, 1, 2, 3, 4]
+    assert decoded['val'].tolist() == [0, 0.5, 1, 1.5, 2]
+    assert rx.rx_records('Ihf') == [(i, 0, i / 2) for i in range(5)]
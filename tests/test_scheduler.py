@@ -0,0 +1,121 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from pySerialTransfer.scheduler import PRIORITY_BULK, PRIORITY_URGENT, TxScheduler
+
+
+def make_link(baudrate=1000000):
+    link = MagicMock()
+    link.connection.baudrate = baudrate
+    link.open.return_value = True
+    link.tx_scheduler = None
+    return link
+
+
+def written(link):
+    return [bytes(call[0][0]) for call in link.connection.write.call_args_list]
+
+
+def test_start_attaches_and_stop_detaches():
+    link = make_link()
+    sched = TxScheduler(link)
+    sched.start()
+    assert link.tx_scheduler is sched
+    sched.stop()
+    assert link.tx_scheduler is None
+
+
+def test_urgent_frames_jump_ahead():
+    """Test that urgent frames queued behind bulk traffic are written at the next frame boundary"""
+    link = make_link()
+    writing = threading.Event()
+    gate = threading.Event()
+    link.connection.write.side_effect = lambda frame: writing.set() or gate.wait(1)
+    sched = TxScheduler(link)
+    sched.start()
+
+    for i in range(5):
+        sched.submit(bytes([PRIORITY_BULK, i]), PRIORITY_BULK)
+    assert writing.wait(1)  # first bulk frame is now being written
+    sched.submit(b'\x00urgent', PRIORITY_URGENT)
+    gate.set()
+    assert sched.flush(1)
+    sched.stop()
+
+    frames = written(link)
+    assert frames[0] == bytes([PRIORITY_BULK, 0])
+    assert frames[1] == b'\x00urgent'
+    assert len(frames) == 6
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_output_is_paced_to_baud():
+    """Test that the token bucket limits output to baud / 10 bytes per second"""
+    link = make_link(baudrate=10000)  # 1000 bytes/s
+    clock = FakeClock()
+    sched = TxScheduler(link, burst=100, clock=clock, sleep=clock.sleep)
+    sched.start()
+
+    for _ in range(4):
+        sched.submit(bytes(100))
+    assert sched.flush(2)
+    sched.stop()
+
+    assert clock.now == pytest.approx(0.3)  # first 100 bytes go out of the full bucket
+    assert sched.stats[sched.default_priority].max_latency == pytest.approx(0.3)
+
+
+def test_flush_without_writer_reports_queued_frames():
+    link = make_link()
+    sched = TxScheduler(link)
+    assert sched.flush(0)
+
+    sched.submit(b'a')
+    assert not sched.flush(1)
+    assert not written(link)
+
+
+def test_invalid_priority():
+    sched = TxScheduler(make_link(), levels=2)
+
+    for priority in (-1, 2):
+        with pytest.raises(ValueError):
+            sched.submit(b'a', priority)
+
+    with pytest.raises(ValueError):
+        TxScheduler(make_link(), levels=1)
+
+
+def test_queue_stats_and_drops():
+    link = make_link()
+    sched = TxScheduler(link, max_depth=2)
+
+    assert sched.submit(b'a')
+    assert sched.submit(b'b')
+    assert not sched.submit(b'c')
+
+    stats = sched.stats[sched.default_priority]
+    assert stats.depth == 2
+    assert stats.dropped == 1
+
+    sched.start()
+    assert sched.flush(1)
+    sched.stop()
+
+    assert stats.depth == 0
+    assert stats.sent == 2
+    assert stats.bytes_sent == 2
+    assert stats.max_depth == 2
+    assert stats.max_latency >= stats.avg_latency > 0
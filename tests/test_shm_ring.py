@@ -0,0 +1,151 @@
+import multiprocessing
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+import pytest
+
+from pySerialTransfer.shm_ring import InvalidRing, PacketRingPublisher, PacketRingSubscriber
+
+
+@pytest.fixture
+def publisher():
+    pub = PacketRingPublisher(slots=8, slot_size=16)
+    yield pub
+    pub.close()
+
+
+def test_publish_and_read(publisher):
+    sub = PacketRingSubscriber(publisher.name)
+    assert sub.read() is None
+
+    publisher.publish(3, b'hello', timestamp=1234)
+    packet = sub.read()
+    assert (packet.seq, packet.id, packet.timestamp) == (0, 3, 1234)
+    assert isinstance(packet.payload, memoryview)
+    assert bytes(packet.payload) == b'hello'
+    assert sub.read() is None
+
+    del packet
+    sub.close()
+
+
+def test_independent_cursors(publisher):
+    """Test that every subscriber sees every packet"""
+    subs = [PacketRingSubscriber(publisher.name) for _ in range(3)]
+
+    for i in range(5):
+        publisher.publish(i, bytes([i]))
+
+    for sub in subs:
+        batch = sub.read_batch()
+        assert [p.id for p in batch] == [0, 1, 2, 3, 4]
+        assert sub.received == 5
+        del batch
+        sub.close()
+
+
+def test_overrun_detection(publisher):
+    """Test that a subscriber that falls more than a ring behind skips to the oldest intact packet"""
+    sub = PacketRingSubscriber(publisher.name)
+
+    for i in range(20):
+        publisher.publish(i, bytes([i]))
+
+    assert sub.pending() == 20
+    batch = sub.read_batch()
+    assert [p.id for p in batch] == list(range(12, 20))
+    assert sub.overruns == 12
+    del batch
+    sub.close()
+
+
+def test_is_valid_after_lap(publisher):
+    sub = PacketRingSubscriber(publisher.name)
+    publisher.publish(1, b'a')
+    packet = sub.read()
+    assert sub.is_valid(packet)
+
+    for i in range(8):
+        publisher.publish(2, b'b')
+    assert not sub.is_valid(packet)
+    del packet
+    sub.close()
+
+
+def test_from_start_and_truncation(publisher):
+    publisher.publish(1, bytes(32))
+    sub = PacketRingSubscriber(publisher.name, from_start=True)
+    packet = sub.read()
+    assert len(packet.payload) == 16
+    del packet
+    sub.close()
+
+
+def test_publish_link(publisher):
+    class Link:
+        id_byte = 7
+        bytes_read = 3
+        rx_buff = [1, 2, 3, ' ', ' ']
+
+    sub = PacketRingSubscriber(publisher.name)
+    publisher.publish_link(Link)
+    packet = sub.read()
+    assert packet.id == 7
+    assert bytes(packet.payload) == b'\x01\x02\x03'
+    del packet
+    sub.close()
+
+
+def test_invalid_ring():
+    shm = shared_memory.SharedMemory(create=True, size=64)
+
+    try:
+        with pytest.raises(InvalidRing):
+            PacketRingSubscriber(shm.name)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+@pytest.mark.skipif(sys.version_info >= (3, 13), reason='attached with track=False')
+def test_attach_only_skips_its_own_registration(publisher, monkeypatch):
+    """Test that a block created by another thread while a subscriber attaches is still registered"""
+    registered = []
+    record = lambda name, rtype: registered.append(name)
+    monkeypatch.setattr(resource_tracker, 'register', record)
+
+    real_shared_memory = shared_memory.SharedMemory
+    others = []
+
+    def attach_during_create(name=None, create=False, size=0):
+        if not create:
+            others.append(real_shared_memory(create=True, size=16))
+        return real_shared_memory(name, create, size)
+
+    monkeypatch.setattr(shared_memory, 'SharedMemory', attach_during_create)
+    PacketRingSubscriber(publisher.name).close()
+    assert resource_tracker.register is record
+    monkeypatch.undo()
+
+    assert registered == [others[0]._name]
+    resource_tracker.register(others[0]._name, 'shared_memory')
+    others[0].close()
+    others[0].unlink()
+
+
+def _subscriber_process(name, conn):
+    sub = PacketRingSubscriber(name, from_start=True)
+    conn.send([(p.id, bytes(p.payload)) for p in sub.read_batch()])
+    sub.close()
+
+
+def test_cross_process(publisher):
+    for i in range(3):
+        publisher.publish(i, bytes([i] * 4))
+
+    ctx = multiprocessing.get_context('spawn')
+    parent, child = ctx.Pipe()
+    proc = ctx.Process(target=_subscriber_process, args=(publisher.name, child))
+    proc.start()
+    assert parent.recv() == [(i, bytes([i] * 4)) for i in range(3)]
+    proc.join(10)
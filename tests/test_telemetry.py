@@ -0,0 +1,135 @@
+import struct
+from array import array
+
+import pytest
+
+from pySerialTransfer.telemetry import InvalidSchema, TelemetryRing, TelemetrySink, parse_format
+from pySerialTransfer.emulator import emulated_link
+from pySerialTransfer.pySerialTransfer import Packet
+
+
+FMT = '<Ih2f4s'
+NAMES = ('seq', 'temp', 'xy', 'tag')
+
+
+def record(i):
+    return struct.pack(FMT, i, -i, i / 2, i * 2.0, b'ab%02d' % (i % 100))
+
+
+def test_parse_format():
+    rec, fields = parse_format('Ih2x3f', ('a', 'b', 'c'))
+
+    assert rec.format == '<Ih2x3f'
+    assert fields == [('a', 'I', 1, 0), ('b', 'h', 1, 4), ('c', 'f', 3, 8)]
+
+    for fmt in ('@Ih', '<I?z', '<'):
+        with pytest.raises(InvalidSchema):
+            parse_format(fmt)
+    with pytest.raises(InvalidSchema):
+        parse_format('<Ih', ('a',))
+
+
+def test_fallback_columns():
+    ring = TelemetryRing(FMT, capacity=8, names=NAMES, use_numpy=False)
+    assert ring.latest()['seq'] == array('I')
+
+    for i in range(5):
+        assert ring.append(record(i), timestamp=100 + i) == 1
+
+    latest = ring.latest(3)
+    assert latest['seq'] == array('I', [2, 3, 4])
+    assert latest['temp'] == array('h', [-2, -3, -4])
+    assert latest['xy'] == [(1.0, 4.0), (1.5, 6.0), (2.0, 8.0)]
+    assert latest['tag'] == [b'ab02', b'ab03', b'ab04']
+    assert ring.latest_timestamps(2) == array('q', [103, 104])
+
+
+def test_ring_wraps_and_keeps_the_latest_records():
+    ring = TelemetryRing('<H', capacity=5, use_numpy=False)
+
+    # Payloads holding several records (and a trailing partial record)
+    assert ring.append(struct.pack('<3H', 0, 1, 2) + b'\x00', 7) == 3
+    assert ring.append(struct.pack('<4H', 3, 4, 5, 6), 8) == 4
+    assert ring.append(b'\x01') == 0
+
+    assert len(ring) == 5
+    assert ring.column('f0') == array('H', [2, 3, 4, 5, 6])
+    assert ring.column('f0', 2) == array('H', [5, 6])
+    assert ring.latest_timestamps() == array('q', [7, 8, 8, 8, 8])
+    assert ring.rejected == 1
+
+    ring.clear()
+    assert len(ring) == 0
+
+
+def test_numpy_rows():
+    np = pytest.importorskip('numpy')
+    ring = TelemetryRing(FMT, capacity=4, names=NAMES)
+
+    for i in range(6):
+        ring.append(record(i), timestamp=i)
+
+    rows = ring.latest()
+    assert rows.dtype.itemsize == struct.calcsize(FMT)
+    assert rows['seq'].tolist() == [2, 3, 4, 5]
+    assert rows['temp'].tolist() == [-2, -3, -4, -5]
+    assert rows['xy'][:, 1].tolist() == [4.0, 6.0, 8.0, 10.0]
+    assert rows['tag'].tolist() == [b'ab02', b'ab03', b'ab04', b'ab05']
+    assert ring.latest_timestamps(2).tolist() == [4, 5]
+
+    # Results are copies, later records don't change them
+    ring.append(record(9))
+    assert rows['seq'].tolist() == [2, 3, 4, 5]
+    assert float(ring.column('temp', 3).mean()) == pytest.approx(-(4 + 5 + 9) / 3)
+
+
+def test_numpy_dtype_schema():
+    np = pytest.importorskip('numpy')
+    dtype = np.dtype([('x', '>i4'), ('y', '>f8')])
+    ring = TelemetryRing(dtype, capacity=3)
+
+    ring.append(struct.pack('>id', 7, 0.25))
+    assert ring.latest()['y'].tolist() == [0.25]
+
+
+def test_sink_stores_received_packets():
+    link, device = emulated_link(device_kwargs={'echo': False})
+    sink = TelemetrySink()
+    ring = sink.register(3, '<Hh', names=('seq', 'value'), use_numpy=False)
+
+    for i in range(10):
+        device.send(struct.pack('<Hh', i, -i), 3)
+    device.send(b'other', 4)
+
+    while link.available():
+        sink.rx(link)
+
+    assert ring.column('seq') == array('H', range(10))
+    assert ring.column('value', 2) == array('h', [-8, -9])
+    assert sink.ignored == 1
+    assert min(ring.latest_timestamps()) > 0
+
+    assert sink.consume([Packet(3, struct.pack('<Hh', 10, -10), 1), Packet(5, b'', 1)]) == 1
+    assert ring.column('seq', 1) == array('H', [10])
+
+
+def test_sink_reads_pooled_payloads():
+    """Test that a link with a packet pool is read from its pooled buffer, not the RX buffer"""
+    link, device = emulated_link(device_kwargs={'echo': False})
+    link.enable_packet_pool(count=4)
+    sink = TelemetrySink()
+    ring = sink.register(3, '<Hh', names=('seq', 'value'), use_numpy=False)
+
+    for i in range(6):
+        device.send(struct.pack('<Hh', i, -i), 3)
+
+    while link.available():
+        link.rx_buff[:link.bytes_read] = [0] * link.bytes_read
+        assert sink.rx(link) == 1
+
+    assert ring.column('seq') == array('H', range(6))
+
+
+def test_ring_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        TelemetryRing('<H', capacity=0)
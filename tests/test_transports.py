@@ -0,0 +1,220 @@
+import os
+import socket
+import tempfile
+import time
+
+import pytest
+import serial
+
+from pySerialTransfer.pySerialTransfer import SerialTransfer, Status
+from pySerialTransfer.framing import FrameDecoder, FrameEncoder
+from pySerialTransfer.transports import TcpTransport, UdpTransport, is_url, transport_for_url
+
+
+def poll(link, tries=200):
+    for _ in range(tries):
+        if link.available():
+            return link.bytes_read
+        if link.status not in (Status.NO_DATA, Status.CONTINUE):
+            return 0
+        time.sleep(0.005)
+    return 0
+
+
+def echo_over(link, peer_recv, peer_send):
+    """Send a frame to the peer, let it echo the frame back and receive it"""
+    link.tx_buff[:3] = [1, 0x7E, 3]
+    assert link.send(3, packet_id=2)
+    # Polling sends anything held back by write coalescing
+    link.available()
+
+    decoder = FrameDecoder()
+    frames = []
+    while not frames:
+        frames = decoder.feed(peer_recv(), 0)
+    assert (frames[0].id, frames[0].payload) == (2, b'\x01\x7E\x03')
+
+    peer_send(FrameEncoder().encode(frames[0].payload, 3))
+    assert poll(link) == 3
+    assert link.id_byte == 3
+    assert link.rx_buff[:3] == [1, 0x7E, 3]
+
+
+def test_is_url():
+    assert is_url('socket://localhost:4000')
+    assert not is_url('COM3')
+    assert not is_url('/dev/ttyUSB0')
+    assert not is_url(3)
+
+
+def test_tcp_round_trip():
+    server = socket.create_server(('127.0.0.1', 0))
+    link = SerialTransfer('socket://127.0.0.1:{}'.format(server.getsockname()[1]))
+    assert isinstance(link.connection, TcpTransport)
+    assert link.open()
+    conn, _ = server.accept()
+    conn.settimeout(1)
+
+    assert link.connection.sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+    echo_over(link, lambda: conn.recv(1024), conn.sendall)
+
+    link.close()
+    conn.close()
+    server.close()
+
+
+def test_tcp_coalesce_and_reconnect():
+    server = socket.create_server(('127.0.0.1', 0))
+    link = SerialTransfer('socket://127.0.0.1:{}?coalesce=64'.format(server.getsockname()[1]))
+    assert link.open()
+    conn, _ = server.accept()
+    conn.settimeout(1)
+
+    link.tx_buff[:4] = [1, 2, 3, 4]
+    link.send(4)
+    link.send(4)
+    assert len(link.connection.pending) == 20
+
+    # Polling for received data sends the coalesced frames
+    link.available()
+    assert not link.connection.pending
+    data = b''
+    while len(data) < 20:
+        data += conn.recv(1024)
+    assert len(FrameDecoder().feed(data, 0)) == 2
+
+    conn.close()
+    link.connection.fill(1)
+    assert not link.connection.is_open
+
+    assert link.open()
+    conn, _ = server.accept()
+    conn.settimeout(1)
+    echo_over(link, lambda: conn.recv(1024), conn.sendall)
+
+    link.close()
+    conn.close()
+    server.close()
+
+
+def test_tcp_coalesce_delay():
+    """Test that coalesced writes are sent once their delay runs out even if the link isn't polled"""
+    server = socket.create_server(('127.0.0.1', 0))
+    link = SerialTransfer('socket://127.0.0.1:{}?coalesce=1460&delay=0.01'.format(server.getsockname()[1]))
+    assert link.open()
+    conn, _ = server.accept()
+    conn.settimeout(1)
+
+    link.tx_buff[:4] = [1, 2, 3, 4]
+    link.send(4)
+    assert len(link.connection.pending) == 10
+
+    data = b''
+    while len(data) < 10:
+        data += conn.recv(1024)
+    assert FrameDecoder().feed(data, 0)[0].payload == b'\x01\x02\x03\x04'
+    assert not link.connection.pending
+
+    link.close()
+    assert link.connection.flusher is None
+    conn.close()
+    server.close()
+
+
+def test_scheduler_over_socket():
+    """Test that socket links keep their baud rate for pacing, and schedule unpaced without one"""
+    from pySerialTransfer.scheduler import TxScheduler
+
+    server = socket.create_server(('127.0.0.1', 0))
+    url = 'socket://127.0.0.1:{}'.format(server.getsockname()[1])
+    assert transport_for_url(url, baud=9600).baudrate == 9600
+    assert TxScheduler(SerialTransfer(url, baud=9600)).rate == 960
+
+    connection = transport_for_url(url)
+    connection.baudrate = None
+    link = SerialTransfer(url)
+    link.connection = connection
+    scheduler = TxScheduler(link)
+    assert scheduler.rate is None
+
+    scheduler.start()
+    assert link.open()
+    conn, _ = server.accept()
+    conn.settimeout(1)
+    link.tx_buff[:2] = [5, 6]
+    assert link.send(2)
+
+    data = b''
+    while len(data) < 8:
+        data += conn.recv(1024)
+    assert FrameDecoder().feed(data, 0)[0].payload == b'\x05\x06'
+
+    scheduler.stop()
+    link.close()
+    conn.close()
+    server.close()
+
+
+def test_udp_round_trip():
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(('127.0.0.1', 0))
+    server.settimeout(1)
+    link = SerialTransfer('udp://127.0.0.1:{}'.format(server.getsockname()[1]))
+    assert isinstance(link.connection, UdpTransport)
+    assert link.open()
+
+    peer = []
+
+    def recv():
+        data, address = server.recvfrom(2048)
+        peer.append(address)
+        return data
+
+    echo_over(link, recv, lambda data: server.sendto(data, peer[0]))
+
+    link.close()
+    server.close()
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='Unix domain sockets not supported')
+def test_unix_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'link.sock')
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(1)
+
+        link = SerialTransfer('unix://' + path)
+        assert link.open()
+        conn, _ = server.accept()
+        conn.settimeout(1)
+        echo_over(link, lambda: conn.recv(1024), conn.sendall)
+
+        link.close()
+        conn.close()
+        server.close()
+
+
+def test_connection_refused_is_serial_exception():
+    server = socket.create_server(('127.0.0.1', 0))
+    port = server.getsockname()[1]
+    server.close()
+
+    transport = transport_for_url('socket://127.0.0.1:{}'.format(port))
+    with pytest.raises(serial.SerialException):
+        transport.open()
+    assert not transport.is_open
+
+
+def test_other_schemes_use_pyserial():
+    connection = transport_for_url('loop://', baud=9600, timeout=0.1)
+    assert isinstance(connection, serial.SerialBase)
+    assert connection.baudrate == 9600
+    assert not connection.is_open
+
+    link = SerialTransfer('loop://')
+    link.tx_buff[:2] = [5, 6]
+    link.send(2)
+    assert poll(link) == 2
+    assert link.rx_buff[:2] == [5, 6]
+    link.close()